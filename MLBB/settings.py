@@ -1,3 +1,5 @@
+import sys
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -36,6 +38,50 @@ SECRET_KEY = config('SECRET_KEY')
 
 MLBB_URL = config('MLBB_URL')
 
+# Upstream MLBB API client (connection pool, retries and timeouts)
+MLBB_UPSTREAM_POOL_SIZE = config('MLBB_UPSTREAM_POOL_SIZE', default=20, cast=int)
+MLBB_UPSTREAM_MAX_RETRIES = config('MLBB_UPSTREAM_MAX_RETRIES', default=2, cast=int)
+MLBB_UPSTREAM_BACKOFF = config('MLBB_UPSTREAM_BACKOFF', default=0.3, cast=float)
+
+# (connect, read) timeouts in seconds, keyed by upstream collection id
+MLBB_UPSTREAM_TIMEOUTS = {
+    'default': (3.05, 10),
+    '2756564': (3.05, 15),  # hero list/detail payloads are the largest
+}
+
+# Upstream response cache TTLs in seconds, keyed by upstream collection id.
+# Stale entries keep being served for MLBB_UPSTREAM_STALE_TTL seconds past
+# their TTL while a background refresh replaces them.
+MLBB_UPSTREAM_CACHE_TTLS = {
+    'default': 10 * 60,
+    '2756564': 6 * 60 * 60,  # hero list, position, detail and relation
+    '2674711': 6 * 60 * 60,  # skill combos
+    '2674709': 60 * 60,      # hero rate, past 7 days
+    '2687909': 60 * 60,      # hero rate, past 15 days
+    '2690860': 60 * 60,      # hero rate, past 30 days
+    '2756567': 5 * 60,       # rank data, 1 day
+    '2756568': 10 * 60,      # rank data, 3 days
+    '2756569': 15 * 60,      # rank data, 7 days (also counters/compatibility)
+    '2756565': 30 * 60,      # rank data, 15 days
+    '2756570': 30 * 60,      # rank data, 30 days
+}
+MLBB_UPSTREAM_STALE_TTL = config('MLBB_UPSTREAM_STALE_TTL', default=60 * 60, cast=int)
+
+# Single-flight coalescing of identical upstream calls. The distributed mode
+# also coordinates across processes through the cache backend, which only
+# helps once that backend is shared between workers.
+MLBB_SINGLE_FLIGHT_DISTRIBUTED = config('MLBB_SINGLE_FLIGHT_DISTRIBUTED', default=False, cast=bool)
+MLBB_SINGLE_FLIGHT_WAIT = config('MLBB_SINGLE_FLIGHT_WAIT', default=10.0, cast=float)
+
+# Hero bundle fan-out: worker threads shared by all bundle requests and
+# per-part timeouts in seconds
+MLBB_BUNDLE_WORKERS = config('MLBB_BUNDLE_WORKERS', default=12, cast=int)
+MLBB_BUNDLE_TIMEOUTS = {
+    'default': 12,
+    'skill_combo': 8,
+    'rate': 8,
+}
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=False, cast=bool)
 
@@ -45,6 +91,65 @@ if DEBUG:
 else:
     PROD_URL = config('PROD_URL')
 
+# How the web services reach MLBB data: 'inprocess' calls the upstream client
+# directly, 'http' goes through our own public API at PROD_URL
+MLBB_WEB_TRANSPORT = config('MLBB_WEB_TRANSPORT', default='inprocess')
+
+# MLBBAPIService cache TTLs in seconds, keyed by cache key family (the longest
+# matching key prefix). Past its TTL an entry keeps being served for
+# MLBB_WEB_STALE_TTL seconds while one background refresh replaces it; failed
+# or empty fetches are cached for MLBB_WEB_NEGATIVE_TTL seconds.
+MLBB_WEB_CACHE_TTLS = {
+    'default': 5 * 60,
+    'mlbb_hero_list': 30 * 60,
+    'mlbb_hero_metadata': 6 * 60 * 60,
+    'mlbb_hero_detail': 6 * 60 * 60,
+    'mlbb_hero_position': 60 * 60,
+    'mlbb_hero_rank': 5 * 60,
+    'mlbb_hero_counter': 30 * 60,
+    'mlbb_hero_compatibility': 30 * 60,
+    # Rendered models of the hero rank, position and detail pages
+    'mlbb_page_hero_rank': 5 * 60,
+    'mlbb_page_hero_position': 60 * 60,
+    'mlbb_page_hero_detail': 30 * 60,
+}
+MLBB_WEB_STALE_TTL = config('MLBB_WEB_STALE_TTL', default=60 * 60, cast=int)
+MLBB_WEB_NEGATIVE_TTL = config('MLBB_WEB_NEGATIVE_TTL', default=30, cast=int)
+
+# Seconds before the precomputed hero counter/synergy matrices are rebuilt
+MLBB_MATRIX_REFRESH = config('MLBB_MATRIX_REFRESH', default=30 * 60, cast=int)
+
+# Seconds a computed recommendation list is reused for the same draft state
+MLBB_RECOMMENDATION_CACHE_TTL = config('MLBB_RECOMMENDATION_CACHE_TTL', default=5 * 60, cast=int)
+
+# Weight of the projected enemy next-pick value in ban scores; 0 disables it
+MLBB_BAN_THREAT_WEIGHT = config('MLBB_BAN_THREAT_WEIGHT', default=0.0, cast=float)
+
+# Draft score points per unit of lane fit a pick adds to its team's best lane
+# assignment (a hero filling an open main lane adds 1.0); 0 disables the bias
+MLBB_LANE_BIAS_WEIGHT = config('MLBB_LANE_BIAS_WEIGHT', default=3.0, cast=float)
+
+# Recommendations precomputed in the background after each draft action: the
+# new state plus the states after this many likely replies (0 disables it),
+# on a thread pool of this size
+MLBB_PRECOMPUTE_TOP_K = config('MLBB_PRECOMPUTE_TOP_K', default=3, cast=int)
+MLBB_PRECOMPUTE_WORKERS = config('MLBB_PRECOMPUTE_WORKERS', default=2, cast=int)
+
+# Lookahead draft search (?depth=N): candidates tried per ply, deepest allowed
+# search, seconds of search per request, and worker processes for the root
+# moves (0 or 1 searches in the request thread)
+MLBB_SOLVER_TOP_K = config('MLBB_SOLVER_TOP_K', default=6, cast=int)
+MLBB_SOLVER_MAX_DEPTH = config('MLBB_SOLVER_MAX_DEPTH', default=6, cast=int)
+MLBB_SOLVER_TIME_BUDGET = config('MLBB_SOLVER_TIME_BUDGET', default=0.5, cast=float)
+MLBB_SOLVER_WORKERS = config('MLBB_SOLVER_WORKERS', default=0, cast=int)
+
+# Live draft updates streamed to viewers over Server-Sent Events (ASGI only).
+# The in-process backend reaches viewers connected to the same worker; the
+# cache backend fans out through the cache, once that is shared by workers.
+# Idle streams send a keep-alive comment every MLBB_DRAFT_EVENTS_KEEPALIVE seconds.
+MLBB_DRAFT_EVENTS_BACKEND = config('MLBB_DRAFT_EVENTS_BACKEND', default='apps.mlbb_web.events.InProcessEventBackend')
+MLBB_DRAFT_EVENTS_KEEPALIVE = config('MLBB_DRAFT_EVENTS_KEEPALIVE', default=15.0, cast=float)
+
 if DEBUG:
     ALLOWED_HOSTS = []
 else:
@@ -133,6 +238,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Tests use a file database like production so concurrent writers wait
+        # on SQLite's file lock instead of failing on in-memory table locks
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -189,9 +297,46 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Caching
 # https://docs.djangoproject.com/en/4.2/topics/cache/
 
+# The default cache is the tier shared by workers. 'locmem' keeps it per
+# process, 'file' shares it between the workers of one host and 'redis'
+# between every instance (needs the redis package and a redis:// location).
+MLBB_CACHE_BACKEND = config('MLBB_CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'mlbb-draft-cache'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(Path(tempfile.gettempdir()) / 'mlbb-cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+if 'test' in sys.argv[1:2]:
+    # Tests never share cache state with a running site
+    MLBB_CACHE_BACKEND = 'locmem'
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[MLBB_CACHE_BACKEND]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'mlbb-draft-cache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('MLBB_CACHE_LOCATION', default=CACHE_LOCATION),
     }
 }
+if MLBB_CACHE_BACKEND != 'redis':
+    # Django culls locmem/file caches past 300 entries by default, fewer than
+    # the per-hero counter and compatibility entries alone
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('MLBB_CACHE_MAX_ENTRIES', default=5000, cast=int)}
+
+# Per-process LRU in front of the shared cache for MLBB data: at most this
+# many entries, each kept for at most this many seconds
+MLBB_LOCAL_CACHE_MAX_ENTRIES = config('MLBB_LOCAL_CACHE_MAX_ENTRIES', default=256, cast=int)
+MLBB_LOCAL_CACHE_TTL = config('MLBB_LOCAL_CACHE_TTL', default=30, cast=int)
+
+# Cold-start snapshot of MLBB data written by `manage.py warm_cache --snapshot`.
+# Keys missing from the cache are served from it (stale entries refresh in
+# the background); an empty value or a missing file turns it off.
+MLBB_CACHE_SNAPSHOT = config('MLBB_CACHE_SNAPSHOT', default=str(BASE_DIR / 'mlbb_cache.snapshot'))
+if 'test' in sys.argv[1:2]:
+    MLBB_CACHE_SNAPSHOT = ''
+
+# Cache metrics are counted per process and added to the shared cache at most
+# every this many seconds (see /api/cache-metrics/ and `manage.py cache_metrics`)
+MLBB_CACHE_METRICS_FLUSH = config('MLBB_CACHE_METRICS_FLUSH', default=10.0, cast=float)
+# Payload sizes are measured, by pickling the value, on one fill in every this
+# many per key family; 0 turns the measurement off
+MLBB_CACHE_METRICS_SIZE_EVERY = config('MLBB_CACHE_METRICS_SIZE_EVERY', default=20, cast=int)
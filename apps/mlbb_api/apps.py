@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MlbbApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.mlbb_api'
+
+    def ready(self):
+        from apps.mlbb_api.endpoints import endpoints
+        from apps.mlbb_api.snapshot import cache_snapshot
+        endpoints.try_resolve()
+        # Only maps the file and reads its index; entries are decoded on first use
+        cache_snapshot.load()
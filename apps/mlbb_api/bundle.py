@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from apps.mlbb_api.cache import upstream_cache
+from apps.mlbb_api.endpoints import UpstreamEndpoint, UpstreamQueries
+
+
+logger = logging.getLogger(__name__)
+
+
+class HeroBundleFetcher:
+    """Fetches several upstream collections for one hero concurrently.
+
+    Every part is submitted to a shared thread pool at once, so the bundle
+    takes as long as its slowest part rather than the sum of all parts. Each
+    part has its own timeout; parts that fail or time out are reported in
+    ``errors`` while the rest of the bundle is still returned.
+    """
+    PARTS: Dict[str, Callable[..., Tuple[UpstreamEndpoint, Dict]]] = {
+        'detail': UpstreamQueries.hero_detail,
+        'detail_stats': UpstreamQueries.hero_detail_stats,
+        'counter': UpstreamQueries.hero_counter,
+        'compatibility': UpstreamQueries.hero_compatibility,
+        'skill_combo': UpstreamQueries.hero_skill_combo,
+        'rate': UpstreamQueries.hero_rate,
+    }
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, timeouts: Optional[Dict[str, float]] = None):
+        self.timeouts = timeouts if timeouts is not None else settings.MLBB_BUNDLE_TIMEOUTS
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.MLBB_BUNDLE_WORKERS, thread_name_prefix='hero-bundle'
+                    )
+        return cls._executor
+
+    def get_timeout(self, part: str) -> float:
+        return self.timeouts.get(part, self.timeouts['default'])
+
+    @staticmethod
+    def _fetch_part(query: Callable[..., Tuple[UpstreamEndpoint, Dict]], hero_id: int,
+                    headers: Dict[str, str]):
+        endpoint, payload = query(hero_id)
+        return upstream_cache.post(endpoint, payload, headers)
+
+    def fetch(self, hero_id: int, headers: Dict[str, str], parts: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Return ``{'hero_id', 'parts', 'errors'}`` for the requested parts."""
+        names = [name for name in (parts or self.PARTS) if name in self.PARTS]
+        started = time.monotonic()
+        futures = {
+            name: self.executor().submit(self._fetch_part, self.PARTS[name], hero_id, headers)
+            for name in names
+        }
+
+        bundle = {'hero_id': hero_id, 'parts': {}, 'errors': {}}
+        for name, future in futures.items():
+            remaining = started + self.get_timeout(name) - time.monotonic()
+            try:
+                response = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                bundle['errors'][name] = {'status': 504, 'details': 'Timed out'}
+                continue
+            except Exception as e:
+                logger.error(f"Hero bundle part {name} for hero {hero_id} failed: {str(e)}")
+                bundle['errors'][name] = {'status': 500, 'details': 'Failed to fetch data'}
+                continue
+
+            if response.ok:
+                bundle['parts'][name] = response.data
+            else:
+                bundle['errors'][name] = {'status': response.status_code, 'details': response.text}
+        return bundle
+
+
+hero_bundle_fetcher = HeroBundleFetcher()
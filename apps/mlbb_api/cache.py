@@ -0,0 +1,320 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from apps.mlbb_api.client import UpstreamResponse, upstream_client
+from apps.mlbb_api.metrics import CacheMetrics, cache_metrics
+from apps.mlbb_api.singleflight import SingleFlight, single_flight
+from apps.mlbb_api.snapshot import cache_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """Small in-process LRU cache with a per-entry TTL.
+
+    Holds at most ``max_entries`` values, evicting the least recently used,
+    and forgets each one after ``ttl`` seconds. Values are kept as the very
+    objects that were stored, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.MLBB_LOCAL_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else settings.MLBB_LOCAL_CACHE_TTL
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT) -> None:
+        ttl = self.ttl if timeout in (DEFAULT_TIMEOUT, None) else min(self.ttl, timeout)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TieredCache:
+    """A per-process ``LocalLRUCache`` in front of the shared cache backend.
+
+    Reads try the local tier, then the shared one, copying shared hits into
+    the local tier; writes go to both. Local copies expire after at most
+    ``MLBB_LOCAL_CACHE_TTL`` seconds, which bounds how long a worker keeps
+    serving a value another worker has replaced.
+
+    Keys missing from both tiers are looked up in the read-only ``fallback``
+    (the cold-start snapshot), whose hits are copied into the local tier
+    only, so the shared tier keeps holding nothing older than it stored.
+    """
+
+    def __init__(self, local: Optional[LocalLRUCache] = None, shared=None, fallback=None):
+        self.local = local if local is not None else LocalLRUCache()
+        self.shared = shared if shared is not None else cache
+        self.fallback = fallback
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING and self.fallback is not None:
+            value = self.fallback.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing)
+            if self.fallback is not None:
+                for key in missing:
+                    if key not in shared:
+                        value = self.fallback.get(key, _MISSING)
+                        if value is not _MISSING:
+                            shared[key] = value
+            for key, value in shared.items():
+                self.local.set(key, value)
+            found.update(shared)
+        return found
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT) -> None:
+        self.shared.set(key, value, timeout)
+        self.local.set(key, value, timeout)
+
+    def add(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT) -> bool:
+        """Atomic add on the shared tier only, so it can serve as a lock between workers."""
+        return self.shared.add(key, value, timeout)
+
+    def set_many(self, data: Dict[str, Any], timeout: Any = DEFAULT_TIMEOUT) -> None:
+        self.shared.set_many(data, timeout)
+        for key, value in data.items():
+            self.local.set(key, value, timeout)
+
+    def delete(self, key: str) -> None:
+        self.shared.delete(key)
+        self.local.delete(key)
+
+
+class StaleWhileRevalidateCache:
+    """Cache whose entries outlive their TTL by a stale window.
+
+    Each entry stores the time it stops being fresh. A fresh entry is returned
+    as is; a stale one is returned immediately while a single background
+    refresh replaces it; a missing one is filled synchronously, with
+    concurrent misses for the same key coalesced into one fill. A refresh
+    that fails leaves the stale entry in place and holds the refresh lock
+    until it times out, so a failing source is retried once per
+    ``REFRESH_LOCK_TIMEOUT`` rather than on every call.
+
+    With a ``family`` function mapping keys to key families, hits, stale
+    serves, misses and fills are recorded in ``metrics`` per family.
+    """
+    REFRESH_LOCK_TIMEOUT = 30
+
+    def __init__(self, backend=None, flight: Optional[SingleFlight] = None,
+                 family: Optional[Callable[[str], str]] = None, metrics: Optional[CacheMetrics] = None):
+        self.backend = backend if backend is not None else cache
+        self.flight = flight if flight is not None else single_flight
+        self.family = family
+        self.metrics = metrics if metrics is not None else cache_metrics
+
+    def get_or_fill(self, key: str, fill: Callable[[], Tuple[Any, bool]],
+                    ttl: int, stale_ttl: int, negative_ttl: int = 0) -> Any:
+        """Return the cached value for ``key``, calling ``fill`` when needed.
+
+        ``fill`` returns ``(value, cacheable)``. Values that are not cacheable
+        are handed back to the caller without being stored, or with a
+        ``negative_ttl`` stored for that many seconds, without a stale window.
+        """
+        entry = self.backend.get(key)
+        if entry is not None:
+            if entry['fresh_until'] < time.time():
+                self._record(key, 'stale')
+                self._refresh_in_background(key, fill, ttl, stale_ttl)
+            else:
+                self._record(key, 'hit')
+            return entry['value']
+        self._record(key, 'miss')
+        return self.flight.do(key, lambda: self._fill(key, fill, ttl, stale_ttl, negative_ttl)[0],
+                              recheck=lambda: self._peek(key))
+
+    def get_or_refill(self, key: str, fill: Callable[[], Tuple[Any, bool]], ttl: int, stale_ttl: int) -> Any:
+        """Like ``get_or_fill``, but a stale or missing entry is filled right away.
+
+        A fill that fails stores nothing, so a stale entry stays in place and
+        is returned instead of the failed value.
+        """
+        entry = self.backend.get(key)
+        if self.is_fresh(entry):
+            return entry['value']
+        value, cacheable = self._fill(key, fill, ttl, stale_ttl)
+        if not cacheable and entry is not None:
+            return entry['value']
+        return value
+
+    def refill(self, key: str, fill: Callable[[], Tuple[Any, bool]], ttl: int, stale_ttl: int) -> Any:
+        """Call ``fill`` whatever is cached for ``key``; only a cacheable value replaces the entry."""
+        return self._fill(key, fill, ttl, stale_ttl)[0]
+
+    @staticmethod
+    def is_fresh(entry: Optional[Dict]) -> bool:
+        return entry is not None and entry['fresh_until'] >= time.time()
+
+    def get_entries(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Raw entries (``value`` and ``fresh_until``) of the ``keys`` that are cached."""
+        return self.backend.get_many(keys)
+
+    def set(self, key: str, value: Any, ttl: int, stale_ttl: int) -> None:
+        self.backend.set(key, {'value': value, 'fresh_until': time.time() + ttl}, ttl + stale_ttl)
+
+    def set_many(self, values: Dict[str, Any], ttl: int, stale_ttl: int) -> None:
+        fresh_until = time.time() + ttl
+        self.backend.set_many({key: {'value': value, 'fresh_until': fresh_until}
+                               for key, value in values.items()}, ttl + stale_ttl)
+
+    def _record(self, key: str, event: str) -> None:
+        if self.family is not None:
+            getattr(self.metrics, event)(self.family(key))
+
+    def _peek(self, key: str) -> Any:
+        entry = self.backend.get(key)
+        return entry['value'] if entry is not None else None
+
+    def _fill(self, key: str, fill: Callable[[], Tuple[Any, bool]], ttl: int, stale_ttl: int,
+              negative_ttl: int = 0) -> Tuple[Any, bool]:
+        started = time.monotonic()
+        value, cacheable = fill()
+        if self.family is not None:
+            self.metrics.fill(self.family(key), time.monotonic() - started, value, cacheable)
+        if cacheable:
+            self.set(key, value, ttl, stale_ttl)
+        elif negative_ttl > 0:
+            self.set(key, value, negative_ttl, 0)
+        return value, cacheable
+
+    def claim_refresh(self, key: str) -> bool:
+        """Take the lock on refreshing ``key``; False if another caller holds it."""
+        # cache.add is atomic on every backend, so only one caller wins the lock.
+        return self.backend.add(f'{key}:refresh', True, self.REFRESH_LOCK_TIMEOUT)
+
+    def release_refresh(self, key: str) -> None:
+        self.backend.delete(f'{key}:refresh')
+
+    def _refresh_in_background(self, key: str, fill: Callable[[], Tuple[Any, bool]],
+                               ttl: int, stale_ttl: int) -> None:
+        if not self.claim_refresh(key):
+            return
+
+        def refresh():
+            refreshed = False
+            try:
+                # Never negative-cached: the stale value beats a failure
+                _, refreshed = self._fill(key, fill, ttl, stale_ttl)
+            except Exception as e:
+                logger.error(f"Background refresh of {key} failed: {str(e)}")
+            finally:
+                if refreshed:
+                    self.release_refresh(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+class UpstreamResponseCache:
+    """Caches successful upstream responses per collection, payload and language."""
+    KEY_PREFIX = 'mlbb_upstream'
+
+    def __init__(self, client=None, ttls: Optional[Dict[str, int]] = None,
+                 stale_ttl: Optional[int] = None, backend=None):
+        self.client = client if client is not None else upstream_client
+        self.ttls = ttls if ttls is not None else settings.MLBB_UPSTREAM_CACHE_TTLS
+        self.stale_ttl = stale_ttl if stale_ttl is not None else settings.MLBB_UPSTREAM_STALE_TTL
+        self.store = StaleWhileRevalidateCache(backend, family=self.cache_family)
+
+    @staticmethod
+    def canonical_payload(payload: Dict) -> str:
+        return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+    def make_key(self, collection_id: str, payload: Dict, lang: str) -> str:
+        digest = hashlib.sha1(self.canonical_payload(payload).encode()).hexdigest()
+        return f'{self.KEY_PREFIX}_{collection_id}_{lang}_{digest}'
+
+    def cache_family(self, cache_key: str) -> str:
+        """Keys are grouped per collection, the unit ``MLBB_UPSTREAM_CACHE_TTLS`` is set by."""
+        return cache_key.rsplit('_', 2)[0]
+
+    def get_ttl(self, collection_id: str) -> int:
+        return self.ttls.get(str(collection_id), self.ttls['default'])
+
+    def post(self, endpoint, payload: Dict, headers: Optional[Dict[str, str]] = None) -> UpstreamResponse:
+        collection_id = endpoint.collection_id
+        lang = (headers or {}).get('x-lang', 'en')
+
+        def fill():
+            response = self.client.post(endpoint, payload, headers)
+            return response, response.ok
+
+        return self.store.get_or_fill(
+            self.make_key(collection_id, payload, lang), fill, self.get_ttl(collection_id), self.stale_ttl
+        )
+
+    def fetch(self, endpoint, payload: Dict, headers: Optional[Dict[str, str]] = None) -> UpstreamResponse:
+        """Call upstream even if a response is cached, and cache the new one if it succeeds.
+
+        For callers that cache the data themselves: a cached response may
+        already be stale or a failure, and they would keep it for a full TTL
+        of their own.
+        """
+        collection_id = endpoint.collection_id
+        lang = (headers or {}).get('x-lang', 'en')
+
+        def fill():
+            response = self.client.post(endpoint, payload, headers)
+            return response, response.ok
+
+        return self.store.refill(
+            self.make_key(collection_id, payload, lang), fill, self.get_ttl(collection_id), self.stale_ttl
+        )
+
+
+tiered_cache = TieredCache(fallback=cache_snapshot)
+upstream_cache = UpstreamResponseCache()
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamResponse:
+    """Status code and decoded body of a single upstream call."""
+    def __init__(self, status_code: int, data: Any = None, text: str = ''):
+        self.status_code = status_code
+        self.data = data
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+
+class UpstreamClient:
+    """Pooled, keep-alive HTTP client shared by every upstream-backed view.
+
+    One ``requests.Session`` is kept per process so TCP and TLS connections to
+    ``MLBB_URL`` are reused. Every call carries a (connect, read) timeout looked
+    up per collection id, and transient failures are retried a bounded number
+    of times with jittered exponential backoff.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.pool_size = pool_size if pool_size is not None else settings.MLBB_UPSTREAM_POOL_SIZE
+        self.max_retries = max_retries if max_retries is not None else settings.MLBB_UPSTREAM_MAX_RETRIES
+        self.backoff_factor = backoff_factor if backoff_factor is not None else settings.MLBB_UPSTREAM_BACKOFF
+        self.timeouts = timeouts if timeouts is not None else settings.MLBB_UPSTREAM_TIMEOUTS
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> requests.Session:
+        # The upstream collection endpoints are read-only queries, so POST is
+        # safe to retry alongside GET.
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get_timeout(self, collection_id: str) -> Tuple[float, float]:
+        return self.timeouts.get(str(collection_id), self.timeouts['default'])
+
+    @staticmethod
+    def _timed_out(error: requests.RequestException) -> bool:
+        # Read timeouts that used up the retries reach us as a ConnectionError
+        # wrapping urllib3's MaxRetryError rather than as requests.Timeout
+        if isinstance(error, requests.Timeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, ReadTimeoutError)
+
+    def post(self, endpoint, payload: Dict, headers: Optional[Dict[str, str]] = None) -> UpstreamResponse:
+        """POST ``payload`` to an ``UpstreamEndpoint`` and time the round trip."""
+        started = time.perf_counter()
+        response = self._post(endpoint, payload, headers)
+        logger.debug(
+            f"Upstream {endpoint.name} ({endpoint.collection_id}) returned {response.status_code} "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return response
+
+    def _post(self, endpoint, payload: Dict, headers: Optional[Dict[str, str]]) -> UpstreamResponse:
+        collection_id = endpoint.collection_id
+        try:
+            response = self.session.post(
+                endpoint.url, json=payload, headers=headers, timeout=self.get_timeout(collection_id)
+            )
+        except requests.RequestException as e:
+            if self._timed_out(e):
+                logger.error(f"Upstream collection {collection_id} timed out: {str(e)}")
+                return UpstreamResponse(504, text='Upstream request timed out')
+            logger.error(f"Upstream collection {collection_id} failed: {str(e)}")
+            return UpstreamResponse(502, text='Upstream request failed')
+
+        if response.status_code != 200:
+            return UpstreamResponse(response.status_code, text=response.text)
+        try:
+            return UpstreamResponse(200, data=response.json())
+        except ValueError:
+            logger.error(f"Upstream collection {collection_id} returned invalid JSON")
+            return UpstreamResponse(502, text=response.text)
+
+
+upstream_client = UpstreamClient()
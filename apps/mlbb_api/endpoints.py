@@ -0,0 +1,389 @@
+import logging
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from apps.mlbb_api.utils import BasePathProvider
+
+
+logger = logging.getLogger(__name__)
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only copy of a JSON-like structure."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Return a mutable copy of a structure built by ``freeze``."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class UpstreamEndpoint:
+    """An upstream collection query: its precompiled URL and payload template."""
+    def __init__(self, name: str, collection_id: str, template: Dict):
+        self.name = name
+        self.collection_id = collection_id
+        self.template = freeze(template)
+        self.url: Optional[str] = None
+
+    def payload(self, **overrides) -> Dict:
+        """Return a fresh payload from the template with ``overrides`` applied."""
+        payload = thaw(self.template)
+        payload.update(overrides)
+        return payload
+
+    def __repr__(self):
+        return f'<UpstreamEndpoint {self.name} ({self.collection_id})>'
+
+
+class UpstreamEndpointRegistry:
+    """Holds every upstream endpoint, keyed by name.
+
+    The base path is Fernet-encrypted, so it is decrypted once, when the app
+    is ready, and every endpoint URL is compiled from it at that point. If
+    the key cannot be decrypted at startup, resolution is retried on first
+    use so the failure surfaces on the request as it did before.
+    """
+    def __init__(self):
+        self._endpoints: Dict[str, UpstreamEndpoint] = {}
+        self._base_url: Optional[str] = None
+        self.resolved = False
+
+    def register(self, name: str, collection_id: str, template: Dict) -> UpstreamEndpoint:
+        endpoint = UpstreamEndpoint(name, collection_id, template)
+        self._endpoints[name] = endpoint
+        if self.resolved:
+            endpoint.url = f'{self._base_url}/{collection_id}'
+        return endpoint
+
+    def resolve(self) -> None:
+        self._base_url = f'{settings.MLBB_URL}{BasePathProvider.get_base_path()}'
+        for endpoint in self._endpoints.values():
+            endpoint.url = f'{self._base_url}/{endpoint.collection_id}'
+        self.resolved = True
+
+    def try_resolve(self) -> None:
+        try:
+            self.resolve()
+        except Exception as e:
+            logger.warning(
+                f"Could not resolve upstream base path at startup ({e.__class__.__name__}); "
+                "retrying on first use"
+            )
+
+    def __getitem__(self, name: str) -> UpstreamEndpoint:
+        if not self.resolved:
+            self.resolve()
+        return self._endpoints[name]
+
+    def __iter__(self):
+        return iter(self._endpoints.values())
+
+
+endpoints = UpstreamEndpointRegistry()
+
+_SORT_BY_HERO_ID = [{"data": {"field": "hero_id", "order": "desc"}, "type": "sequence"}]
+
+endpoints.register('hero_list_new', '2756564', {
+    "pageSize": 10000,
+    "sorts": _SORT_BY_HERO_ID,
+    "pageIndex": 1,
+    "fields": [
+        "hero_id",
+        "hero.data.head",
+        "hero.data.name",
+        "hero.data.smallmap",
+    ]
+})
+
+_RANK_TEMPLATE = {
+    "pageSize": 20,
+    "filters": [
+        {"field": "bigrank", "operator": "eq", "value": "101"},
+        {"field": "match_type", "operator": "eq", "value": "0"}
+    ],
+    "sorts": [],
+    "pageIndex": 1,
+    "fields": [
+        "main_hero",
+        "main_hero_appearance_rate",
+        "main_hero_ban_rate",
+        "main_hero_channel",
+        "main_hero_win_rate",
+        "main_heroid",
+        "data.sub_hero.hero",
+        "data.sub_hero.hero_channel",
+        "data.sub_hero.increase_win_rate",
+        "data.sub_hero.heroid"
+    ]
+}
+for _days, _collection_id in (('1', '2756567'), ('3', '2756568'), ('7', '2756569'),
+                              ('15', '2756565'), ('30', '2756570')):
+    endpoints.register(f'hero_rank_{_days}', _collection_id, _RANK_TEMPLATE)
+
+endpoints.register('hero_position', '2756564', {
+    "pageSize": 21,
+    "filters": [],
+    "sorts": _SORT_BY_HERO_ID,
+    "pageIndex": 1,
+    "fields": ["id", "hero_id", "hero.data.name", "hero.data.smallmap", "hero.data.sortid", "hero.data.roadsort"],
+    "object": []
+})
+
+endpoints.register('hero_metadata', '2756564', {
+    "pageSize": 10000,
+    "filters": [],
+    "sorts": _SORT_BY_HERO_ID,
+    "pageIndex": 1,
+    "fields": ["hero_id", "hero.data.name", "hero.data.sortid", "hero.data.roadsort", "hero.data.difficulty"],
+    "object": []
+})
+
+endpoints.register('hero_detail', '2756564', {
+    "pageSize": 20,
+    "filters": [],
+    "sorts": [],
+    "pageIndex": 1,
+    "object": []
+})
+
+endpoints.register('hero_detail_stats', '2756567', {
+    "pageSize": 20,
+    "filters": [],
+    "sorts": [],
+    "pageIndex": 1
+})
+
+endpoints.register('hero_skill_combo', '2674711', {
+    "pageSize": 20,
+    "filters": [],
+    "sorts": [],
+    "pageIndex": 1,
+    "object": [2684183]
+})
+
+_RATE_TEMPLATE = {
+    "pageSize": 20,
+    "filters": [],
+    "sorts": [],
+    "pageIndex": 1
+}
+for _days, _collection_id in (('7', '2674709'), ('15', '2687909'), ('30', '2690860')):
+    endpoints.register(f'hero_rate_{_days}', _collection_id, _RATE_TEMPLATE)
+
+endpoints.register('hero_relation', '2756564', {
+    "pageSize": 20,
+    "filters": [],
+    "sorts": [],
+    "pageIndex": 1,
+    "fields": ["hero.data.name"],
+    "object": []
+})
+
+_MATCHUP_TEMPLATE = {
+    "pageSize": 20,
+    "filters": [],
+    "sorts": [],
+    "pageIndex": 1
+}
+endpoints.register('hero_counter', '2756569', _MATCHUP_TEMPLATE)
+endpoints.register('hero_compatibility', '2756569', _MATCHUP_TEMPLATE)
+
+
+class UpstreamQueries:
+    """Specializes the endpoint templates into ready-to-send payloads."""
+    RANK_VALUES = {
+        'all': "101",
+        'epic': "5",
+        'legend': "6",
+        'mythic': "7",
+        'honor': "8",
+        'glory': "9"
+    }
+    RANK_DAYS = ('1', '3', '7', '15', '30')
+    RANK_SORT_FIELDS = {
+        'pick_rate': 'main_hero_appearance_rate',
+        'ban_rate': 'main_hero_ban_rate',
+        'win_rate': 'main_hero_win_rate'
+    }
+    ROLES = {
+        'all': [1, 2, 3, 4, 5, 6],
+        'tank': [1],
+        'fighter': [2],
+        'ass': [3],
+        'mage': [4],
+        'mm': [5],
+        'supp': [6]
+    }
+    LANES = {
+        'all': [1, 2, 3, 4, 5],
+        'exp': [1],
+        'mid': [2],
+        'roam': [3],
+        'jungle': [4],
+        'gold': [5]
+    }
+    RATE_DAYS = ('7', '15', '30')
+    BATCH_MAX_IDS = 50
+
+    @staticmethod
+    def _eq(field: str, value: Any) -> Dict:
+        return {"field": field, "operator": "eq", "value": value}
+
+    @staticmethod
+    def _has_any_of(field: str, values: List[int]) -> Dict:
+        return {"field": field, "operator": "hasAnyOf", "value": values}
+
+    @classmethod
+    def batch_ids(cls, hero_ids: Iterable[int]) -> List[int]:
+        """Sorted, de-duplicated ids so equal batches share one cache entry."""
+        ids = sorted(set(int(hero_id) for hero_id in hero_ids))
+        if not ids or len(ids) > cls.BATCH_MAX_IDS:
+            raise ValueError(f'Between 1 and {cls.BATCH_MAX_IDS} hero ids are required')
+        return ids
+
+    @staticmethod
+    def hero_list_new() -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_list_new']
+        return endpoint, endpoint.payload()
+
+    @classmethod
+    def hero_rank(cls, days: str = '1', rank: str = 'all', size: int = 20, index: int = 1,
+                  sort_field: str = 'win_rate', sort_order: str = 'desc') -> Tuple[UpstreamEndpoint, Dict]:
+        days = days if days in cls.RANK_DAYS else '1'
+        endpoint = endpoints[f'hero_rank_{days}']
+        sort_field = cls.RANK_SORT_FIELDS.get(sort_field, 'main_hero_win_rate')
+        return endpoint, endpoint.payload(
+            pageSize=int(size),
+            pageIndex=int(index),
+            filters=[
+                cls._eq("bigrank", cls.RANK_VALUES.get(rank, cls.RANK_VALUES['all'])),
+                cls._eq("match_type", "0")
+            ],
+            sorts=[{"data": {"field": sort_field, "order": sort_order}, "type": "sequence"}]
+        )
+
+    @classmethod
+    def hero_position(cls, role: str = 'all', lane: str = 'all', size: int = 21,
+                      index: int = 1) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_position']
+        return endpoint, endpoint.payload(
+            pageSize=int(size),
+            pageIndex=int(index),
+            filters=[
+                {"field": "<hero.data.sortid>", "operator": "hasAnyOf", "value": cls.ROLES.get(role, cls.ROLES['all'])},
+                {"field": "<hero.data.roadsort>", "operator": "hasAnyOf", "value": cls.LANES.get(lane, cls.LANES['all'])}
+            ]
+        )
+
+    @staticmethod
+    def hero_metadata() -> Tuple[UpstreamEndpoint, Dict]:
+        """Name, roles, lanes and difficulty of every hero in one call."""
+        endpoint = endpoints['hero_metadata']
+        return endpoint, endpoint.payload()
+
+    @classmethod
+    def hero_detail(cls, hero_id: int) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_detail']
+        return endpoint, endpoint.payload(filters=[cls._eq("hero_id", hero_id)])
+
+    @classmethod
+    def hero_detail_stats(cls, main_heroid: int) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_detail_stats']
+        return endpoint, endpoint.payload(filters=[
+            cls._eq("main_heroid", main_heroid),
+            cls._eq("bigrank", "101"),
+            cls._eq("match_type", "1")
+        ])
+
+    @classmethod
+    def hero_skill_combo(cls, hero_id: int) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_skill_combo']
+        return endpoint, endpoint.payload(filters=[cls._eq("hero_id", hero_id)])
+
+    @classmethod
+    def hero_rate(cls, main_heroid: int, days: str = '7') -> Tuple[UpstreamEndpoint, Dict]:
+        days = days if days in cls.RATE_DAYS else '7'
+        endpoint = endpoints[f'hero_rate_{days}']
+        return endpoint, endpoint.payload(filters=[
+            cls._eq("main_heroid", main_heroid),
+            cls._eq("bigrank", "8"),
+            cls._eq("match_type", "1")
+        ])
+
+    @classmethod
+    def hero_relation(cls, hero_id: int) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_relation']
+        return endpoint, endpoint.payload(filters=[cls._eq("hero_id", hero_id)])
+
+    @classmethod
+    def hero_counter(cls, main_heroid: int) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_counter']
+        return endpoint, endpoint.payload(filters=[
+            cls._eq("match_type", "0"),
+            cls._eq("main_heroid", main_heroid),
+            cls._eq("bigrank", "7")
+        ])
+
+    @classmethod
+    def hero_compatibility(cls, main_heroid: int) -> Tuple[UpstreamEndpoint, Dict]:
+        endpoint = endpoints['hero_compatibility']
+        return endpoint, endpoint.payload(filters=[
+            cls._eq("match_type", "1"),
+            cls._eq("main_heroid", main_heroid),
+            cls._eq("bigrank", "7")
+        ])
+
+    @classmethod
+    def hero_detail_batch(cls, hero_ids: Iterable[int]) -> Tuple[UpstreamEndpoint, Dict]:
+        ids = cls.batch_ids(hero_ids)
+        endpoint = endpoints['hero_detail']
+        return endpoint, endpoint.payload(pageSize=len(ids), filters=[cls._has_any_of("hero_id", ids)])
+
+    @classmethod
+    def hero_counter_batch(cls, main_heroids: Iterable[int]) -> Tuple[UpstreamEndpoint, Dict]:
+        ids = cls.batch_ids(main_heroids)
+        endpoint = endpoints['hero_counter']
+        return endpoint, endpoint.payload(pageSize=len(ids), filters=[
+            cls._eq("match_type", "0"),
+            cls._has_any_of("main_heroid", ids),
+            cls._eq("bigrank", "7")
+        ])
+
+    @classmethod
+    def hero_compatibility_batch(cls, main_heroids: Iterable[int]) -> Tuple[UpstreamEndpoint, Dict]:
+        ids = cls.batch_ids(main_heroids)
+        endpoint = endpoints['hero_compatibility']
+        return endpoint, endpoint.payload(pageSize=len(ids), filters=[
+            cls._eq("match_type", "1"),
+            cls._has_any_of("main_heroid", ids),
+            cls._eq("bigrank", "7")
+        ])
+
+
+def split_by_hero(data: Dict, field: str, hero_ids: Iterable[int]) -> Dict[int, Dict]:
+    """Split a batch response into one single-hero response per requested id.
+
+    Each value has the same ``{'data': {'records': [...]}}`` shape the
+    single-hero endpoint returns, with an empty record list for heroes the
+    upstream had no data for.
+    """
+    split = {int(hero_id): {'data': {'records': []}} for hero_id in hero_ids}
+    for record in (data.get('data') or {}).get('records') or []:
+        try:
+            hero_id = int(record.get('data', {}).get(field))
+        except (TypeError, ValueError):
+            continue
+        if hero_id in split:
+            split[hero_id]['data']['records'].append(record)
+    return split
@@ -0,0 +1,55 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.mlbb_api.metrics import cache_metrics
+
+
+class Command(BaseCommand):
+    help = ('Summarize cache hits, stale serves, misses, fill latency and payload size per key family, '
+            'as totalled in the shared cache by every worker using it.')
+
+    COLUMNS = ('family', 'lookups', 'hit%', 'stale', 'misses', 'fills', 'failed', 'avg ms', 'p95 ms', 'avg KiB')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the raw summary as JSON')
+        parser.add_argument('--reset', action='store_true', help='Clear the totals after printing them')
+
+    def handle(self, *args, **options):
+        summary = cache_metrics.summary()
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+        elif not summary:
+            self.stdout.write('No cache metrics recorded yet.')
+        else:
+            self.stdout.write(self.format_table(summary))
+
+        if settings.MLBB_CACHE_BACKEND == 'locmem':
+            self.stderr.write('MLBB_CACHE_BACKEND is locmem, so only this process is counted; '
+                              'read /api/cache-metrics/ on the running site instead.')
+        if options['reset']:
+            cache_metrics.reset()
+            self.stdout.write(self.style.SUCCESS('Cache metrics reset.'))
+
+    def format_table(self, summary) -> str:
+        rows = [self.COLUMNS]
+        for family, stats in sorted(summary.items()):
+            rows.append((
+                family,
+                stats['hits'] + stats['stale'] + stats['misses'],
+                '-' if stats['hit_ratio'] is None else f"{stats['hit_ratio'] * 100:.1f}",
+                stats['stale'],
+                stats['misses'],
+                stats['fills'],
+                stats['fill_failures'],
+                '-' if stats['avg_fill_ms'] is None else stats['avg_fill_ms'],
+                stats['p95_fill_ms'] or '-',
+                '-' if stats['avg_payload_bytes'] is None else f"{stats['avg_payload_bytes'] / 1024:.1f}",
+            ))
+        widths = [max(len(str(row[column])) for row in rows) for column in range(len(self.COLUMNS))]
+        return '\n'.join(
+            '  '.join(str(value).ljust(width) if column == 0 else str(value).rjust(width)
+                      for column, (value, width) in enumerate(zip(row, widths)))
+            for row in rows
+        )
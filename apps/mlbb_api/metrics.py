@@ -0,0 +1,157 @@
+import logging
+import pickle
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMetrics:
+    """Hit, miss, stale-serve, fill latency and payload size counters per key family.
+
+    Events are counted in process and added to counters in the shared cache
+    at most every ``MLBB_CACHE_METRICS_FLUSH`` seconds, so every worker that
+    shares the cache reports into the same totals. Batched prefetches count
+    a hit, stale serve or miss per key and one fill per upstream batch.
+
+    Pickling a value to size it costs about as much as storing it, so only
+    one successful fill in every ``MLBB_CACHE_METRICS_SIZE_EVERY`` per family
+    is measured, and the average payload size is taken over those.
+    """
+    KEY_PREFIX = 'mlbb_cache_metrics'
+    COUNTERS = ('hits', 'stale', 'misses', 'fills', 'fill_failures', 'fill_ms', 'payload_bytes',
+                'sized_fills')
+    # Upper bounds, in milliseconds, of the fill latency histogram buckets
+    LATENCY_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, backend=None, flush_interval: Optional[float] = None, size_every: Optional[int] = None):
+        self.backend = backend if backend is not None else cache
+        self.flush_interval = flush_interval
+        self.size_every = size_every
+        self._pending: Dict[str, Counter] = {}
+        self._fills: Counter = Counter()
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def bucket_names(cls):
+        return [f'fill_le_{bound}' for bound in cls.LATENCY_BUCKETS] + ['fill_le_inf']
+
+    def hit(self, family: str) -> None:
+        self.record(family, hits=1)
+
+    def stale(self, family: str) -> None:
+        self.record(family, stale=1)
+
+    def miss(self, family: str) -> None:
+        self.record(family, misses=1)
+
+    def fill(self, family: str, seconds: float, value: Any, ok: bool) -> None:
+        """Record one fetch of ``value`` that took ``seconds``; ``ok`` if it was worth caching."""
+        elapsed_ms = seconds * 1000
+        bucket = next((f'fill_le_{bound}' for bound in self.LATENCY_BUCKETS if elapsed_ms <= bound), 'fill_le_inf')
+        counts = {'fills' if ok else 'fill_failures': 1, 'fill_ms': round(elapsed_ms), bucket: 1}
+        if ok and self._should_size(family):
+            counts.update(payload_bytes=self.payload_size(value), sized_fills=1)
+        self.record(family, **counts)
+
+    def _should_size(self, family: str) -> bool:
+        """True for the first successful fill of ``family`` in every ``size_every``."""
+        every = self.size_every if self.size_every is not None else settings.MLBB_CACHE_METRICS_SIZE_EVERY
+        if every <= 0:
+            return False
+        with self._lock:
+            seen = self._fills[family]
+            self._fills[family] += 1
+        return seen % every == 0
+
+    @staticmethod
+    def payload_size(value: Any) -> int:
+        """Size of ``value`` as the cache backends store it, pickled."""
+        try:
+            return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return 0
+
+    def record(self, family: str, **counts: int) -> None:
+        with self._lock:
+            self._pending.setdefault(family, Counter()).update(counts)
+            interval = self.flush_interval if self.flush_interval is not None else settings.MLBB_CACHE_METRICS_FLUSH
+            due = time.monotonic() - self._flushed_at >= interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add the counts recorded in this process to the shared totals."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            families = self.backend.get(self.families_key(), [])
+            if not set(pending) <= set(families):
+                self.backend.set(self.families_key(), sorted(set(families) | set(pending)), None)
+            for family, counts in pending.items():
+                for name, count in counts.items():
+                    if count:
+                        key = self.counter_key(family, name)
+                        self.backend.add(key, 0, None)
+                        self.backend.incr(key, count)
+        except Exception as e:
+            logger.error(f"Flushing cache metrics failed: {str(e)}")
+
+    def families_key(self) -> str:
+        return f'{self.KEY_PREFIX}:families'
+
+    def counter_key(self, family: str, name: str) -> str:
+        return f'{self.KEY_PREFIX}:{family}:{name}'
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Shared totals per family, with hit ratio, average fill latency and payload size."""
+        self.flush()
+        families = self.backend.get(self.families_key(), [])
+        names = list(self.COUNTERS) + self.bucket_names()
+        keys = [self.counter_key(family, name) for family in families for name in names]
+        stored = self.backend.get_many(keys)
+
+        summary = {}
+        for family in families:
+            counts = {name: stored.get(self.counter_key(family, name), 0) for name in names}
+            lookups = counts['hits'] + counts['stale'] + counts['misses']
+            attempts = counts['fills'] + counts['fill_failures']
+            summary[family] = {
+                **{name: counts[name] for name in self.COUNTERS},
+                'hit_ratio': round((counts['hits'] + counts['stale']) / lookups, 3) if lookups else None,
+                'avg_fill_ms': round(counts['fill_ms'] / attempts, 1) if attempts else None,
+                'p95_fill_ms': self._percentile(counts, attempts, 0.95),
+                'avg_payload_bytes': (round(counts['payload_bytes'] / counts['sized_fills'])
+                                      if counts['sized_fills'] else None),
+            }
+        return summary
+
+    def _percentile(self, counts: Dict[str, int], total: int, fraction: float) -> Optional[str]:
+        """Bound of the latency bucket holding the given fraction of fills, e.g. ``'<=250'``."""
+        seen = 0
+        for bound, name in zip(self.LATENCY_BUCKETS, self.bucket_names()):
+            seen += counts[name]
+            if total and seen >= total * fraction:
+                return f'<={bound}'
+        return f'>{self.LATENCY_BUCKETS[-1]}' if total else None
+
+    def reset(self) -> None:
+        """Drop the shared totals and anything not yet flushed."""
+        with self._lock:
+            self._pending = {}
+        families = self.backend.get(self.families_key(), [])
+        names = list(self.COUNTERS) + self.bucket_names()
+        self.backend.delete_many([self.counter_key(family, name) for family in families for name in names])
+        self.backend.delete(self.families_key())
+
+
+cache_metrics = CacheMetrics()
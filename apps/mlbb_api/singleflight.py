@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class _Call:
+    """An in-flight call that followers wait on."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into a single execution.
+
+    Within a process, the first caller for a key runs ``fn`` and every caller
+    that arrives while it is running blocks and receives the same result (or
+    exception). When ``distributed`` is enabled, the leader also takes a lock
+    in the cache backend; leaders in other processes then poll ``recheck``
+    for the value the lock holder stores instead of calling upstream
+    themselves, and fall back to ``fn`` once ``wait_timeout`` elapses.
+    """
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, distributed: Optional[bool] = None, wait_timeout: Optional[float] = None,
+                 backend=None):
+        self.distributed = distributed if distributed is not None else settings.MLBB_SINGLE_FLIGHT_DISTRIBUTED
+        self.wait_timeout = wait_timeout if wait_timeout is not None else settings.MLBB_SINGLE_FLIGHT_WAIT
+        self.backend = backend if backend is not None else cache
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], recheck: Optional[Callable[[], Any]] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, recheck)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def _run(self, key: str, fn: Callable[[], Any], recheck: Optional[Callable[[], Any]]) -> Any:
+        if not self.distributed or recheck is None:
+            return fn()
+
+        lock_key = f'{key}:inflight'
+        if self.backend.add(lock_key, True, int(self.wait_timeout) + 1):
+            try:
+                return fn()
+            finally:
+                self.backend.delete(lock_key)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            released = self.backend.get(lock_key) is None
+            value = recheck()
+            if value is not None:
+                return value
+            if released:
+                break
+        return fn()
+
+
+single_flight = SingleFlight()
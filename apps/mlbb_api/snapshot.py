@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheSnapshot:
+    """Read-only, memory-mapped file of cache entries for cold starts.
+
+    Layout: ``MAGIC``, the byte length of a JSON index as a little-endian
+    uint32, the index (``version``, ``built_at`` and ``entries``, mapping
+    each key to the offset and length of its data), then each entry as
+    zlib-compressed JSON. ``load`` only maps the file and parses the index;
+    an entry is decompressed the first time it is read, so a new instance
+    pays for the keys it actually uses.
+    """
+    MAGIC = b'MLBBSNP1'
+    HEADER = struct.Struct('<I')
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.version: Optional[str] = None
+        self.built_at: Optional[float] = None
+        self._entries: Dict[str, list] = {}
+        self._data_start = 0
+        self._map: Optional[mmap.mmap] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Map the snapshot file if there is one; returns whether it is usable."""
+        with self._lock:
+            if self._loaded:
+                return self._map is not None
+            self._loaded = True
+            path = self.path if self.path is not None else settings.MLBB_CACHE_SNAPSHOT
+            if not path or not os.path.exists(path):
+                return False
+            try:
+                with open(path, 'rb') as snapshot_file:
+                    mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+                if mapped[:len(self.MAGIC)] != self.MAGIC:
+                    raise ValueError('not a snapshot file or an unsupported format')
+                index_start = len(self.MAGIC) + self.HEADER.size
+                (index_length,) = self.HEADER.unpack_from(mapped, len(self.MAGIC))
+                index = json.loads(mapped[index_start:index_start + index_length])
+            except Exception as e:
+                logger.error(f"Could not load cache snapshot {path}: {str(e)}")
+                return False
+            self.version, self.built_at = index['version'], index['built_at']
+            self._entries = index['entries']
+            self._data_start = index_start + index_length
+            self._map = mapped
+            return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if not self._loaded:
+            self.load()
+        location = self._entries.get(key)
+        if location is None:
+            return default
+        offset, length = location
+        start = self._data_start + offset
+        return json.loads(zlib.decompress(self._map[start:start + length]))
+
+    def __contains__(self, key: str) -> bool:
+        if not self._loaded:
+            self.load()
+        return key in self._entries
+
+    def __len__(self) -> int:
+        if not self._loaded:
+            self.load()
+        return len(self._entries)
+
+    @classmethod
+    def write(cls, path: str, entries: Dict[str, Any]) -> str:
+        """Write ``entries`` (JSON-serializable values) to ``path`` atomically; returns the version."""
+        blobs = []
+        locations = {}
+        offset = 0
+        digest = hashlib.sha1()
+        for key in sorted(entries):
+            blob = zlib.compress(json.dumps(entries[key], separators=(',', ':')).encode(), 6)
+            locations[key] = [offset, len(blob)]
+            offset += len(blob)
+            blobs.append(blob)
+            digest.update(key.encode())
+            digest.update(blob)
+
+        version = digest.hexdigest()[:12]
+        index = json.dumps({'version': version, 'built_at': time.time(), 'entries': locations},
+                           separators=(',', ':')).encode()
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as snapshot_file:
+            snapshot_file.write(cls.MAGIC + cls.HEADER.pack(len(index)) + index)
+            for blob in blobs:
+                snapshot_file.write(blob)
+        os.chmod(snapshot_file.name, 0o644)
+        # Instances that already mapped the old file keep reading it
+        os.replace(snapshot_file.name, path)
+        return version
+
+
+cache_snapshot = CacheSnapshot()
@@ -6,6 +6,7 @@ from . import views
 
 urlpatterns = [
     path('', views.MlbbApiEndpoints.as_view(), name='root_redirect'),
+    path('cache-metrics/', views.CacheMetricsView.as_view(), name='cache_metrics'),
 ]
 
 # Add other API endpoints only if available
@@ -24,6 +25,10 @@ if settings.IS_AVAILABLE:
         path('hero-relation/<int:hero_id>/', views.HeroRelationView.as_view(), name='hero_relation'),
         path('hero-counter/<int:main_heroid>/', views.HeroCounterView.as_view(), name='hero_counter'),
         path('hero-compatibility/<int:main_heroid>/', views.HeroCompatibilityView.as_view(), name='hero_compatibility'),
+        path('hero-bundle/<int:hero_id>/', views.HeroBundleView.as_view(), name='hero_bundle'),
+        path('hero-detail/', views.HeroDetailBatchView.as_view(), name='hero_detail_batch'),
+        path('hero-counter/', views.HeroCounterBatchView.as_view(), name='hero_counter_batch'),
+        path('hero-compatibility/', views.HeroCompatibilityBatchView.as_view(), name='hero_compatibility_batch'),
 
         path('win-rate/', views.WinRateView.as_view(), name='win_rate'),
     ])
\ No newline at end of file
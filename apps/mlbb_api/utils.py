@@ -31,8 +31,12 @@ class BasePathProvider:
         b'gAAAAABoeVABaPKjWkRGpRV7c7bmRASNq4aZcN_cLGeeWU0OSNFtWLahn4mn9AYq4PqpkJKjA8rx4-Jk2oqjfLTB7l3u9tC_ufGi1x5IcdWrinV26tcdotw='
     )
     _SECRET_KEY = settings.SECRET_KEY
+    _base_path = None
 
     @classmethod
     def get_base_path(cls):
-        crypto = CryptoManager(cls._SECRET_KEY)
-        return crypto.decrypt(cls.RONEHA_DEV_KEY)
+        # Decrypting derives a key and runs Fernet, so do it once per process.
+        if cls._base_path is None:
+            crypto = CryptoManager(cls._SECRET_KEY)
+            cls._base_path = crypto.decrypt(cls.RONEHA_DEV_KEY)
+        return cls._base_path
@@ -3,14 +3,14 @@ from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
-import requests
+from rest_framework.permissions import AllowAny, IsAdminUser
 from typing import Any, Dict
-from apps.mlbb_api.utils import BasePathProvider
+from apps.mlbb_api.bundle import hero_bundle_fetcher
+from apps.mlbb_api.cache import upstream_cache
+from apps.mlbb_api.endpoints import UpstreamEndpoint, UpstreamQueries, split_by_hero
+from apps.mlbb_api.metrics import cache_metrics
 
 
-MLBB_URL = settings.MLBB_URL
-
 class APIAvailabilityMixin:
     """Mixin to check API availability for class-based views."""
     def dispatch(self, request, *args, **kwargs):
@@ -37,6 +37,36 @@ class ErrorResponseMixin:
     def error_response(message: str, details: Any = None, status_code: int = 400) -> Response:
         return Response({'error': message, 'details': details}, status=status_code)
 
+class UpstreamProxyMixin(ErrorResponseMixin):
+    """Relays an upstream collection query through the shared response cache."""
+    def upstream_response(self, endpoint: UpstreamEndpoint, payload: Dict, lang: str) -> Response:
+        headers = MLBBHeaderBuilder.get_lang_header(lang)
+        response = upstream_cache.post(endpoint, payload, headers)
+        if response.ok:
+            return Response(response.data)
+        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+
+class BatchUpstreamMixin(UpstreamProxyMixin):
+    """Answers ``?ids=1,5,23`` with one hasAnyOf upstream query split per hero."""
+    batch_query = None
+    batch_key_field = None
+
+    def get(self, request):
+        try:
+            hero_ids = UpstreamQueries.batch_ids(request.GET.get('ids', '').split(','))
+        except ValueError:
+            return self.error_response(
+                'Invalid ids',
+                f'Provide 1 to {UpstreamQueries.BATCH_MAX_IDS} comma-separated hero ids, e.g. ?ids=1,5,23'
+            )
+        lang = request.GET.get('lang', 'en')
+
+        endpoint, payload = self.batch_query(hero_ids)
+        response = upstream_cache.post(endpoint, payload, MLBBHeaderBuilder.get_lang_header(lang))
+        if not response.ok:
+            return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        return Response({'heroes': split_by_hero(response.data, self.batch_key_field, hero_ids)})
+
 class MlbbApiEndpoints(APIView):
     permission_classes = [AllowAny]
 
@@ -129,7 +159,11 @@ def _get_available_endpoints(request) -> Dict[str, str]:
             'hero_rate': f'{base_url}hero-rate/{{main_heroid}}/',
             'hero_relation': f'{base_url}hero-relation/{{hero_id}}/',
             'hero_counter': f'{base_url}hero-counter/{{main_heroid}}/',
-            'hero_compatibility': f'{base_url}hero-compatibility/{{main_heroid}}/'
+            'hero_compatibility': f'{base_url}hero-compatibility/{{main_heroid}}/',
+            'hero_bundle': f'{base_url}hero-bundle/{{hero_id}}/',
+            'hero_detail_batch': f'{base_url}hero-detail/?ids={{hero_ids}}',
+            'hero_counter_batch': f'{base_url}hero-counter/?ids={{hero_ids}}',
+            'hero_compatibility_batch': f'{base_url}hero-compatibility/?ids={{hero_ids}}'
         }
     return {'documentation': f'{base_url}'}
 
@@ -183,82 +217,18 @@ class HeroListView(APIAvailabilityMixin, APIView):
             return Response(HEROES_RU)
         return Response(HEROES_EN)
 
-class HeroListNewView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroListNewView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        base_path = BasePathProvider.get_base_path()
-        url_hero_list_new = f"{MLBB_URL}{base_path}/2756564"
-
         lang = request.GET.get('lang', 'en')
+        endpoint, payload = UpstreamQueries.hero_list_new()
+        return self.upstream_response(endpoint, payload, lang)
 
-        payload = {
-            "pageSize": 10000,
-            "sorts": [
-                {
-                    "data": {
-                        "field": "hero_id",
-                        "order": "desc"
-                    },
-                    "type": "sequence"
-                }
-            ],
-            "pageIndex": 1,
-            "fields": [
-                "hero_id",
-                "hero.data.head",
-                "hero.data.name",
-                "hero.data.smallmap",
-            ]
-        }
-
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url_hero_list_new, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
-
-class HeroRankView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroRankView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        base_path = BasePathProvider.get_base_path()
-        url_1_day = f"{MLBB_URL}{base_path}/2756567"
-        url_3_days = f"{MLBB_URL}{base_path}/2756568"
-        url_7_days = f"{MLBB_URL}{base_path}/2756569"
-        url_15_days = f"{MLBB_URL}{base_path}/2756565"
-        url_30_days = f"{MLBB_URL}{base_path}/2756570"
-
-        def create_rank_payload(rank_value):
-            return {
-                "pageSize": 20,
-                "filters": [
-                    {"field": "bigrank", "operator": "eq", "value": rank_value},
-                    {"field": "match_type", "operator": "eq", "value": "0"}
-                ],
-                "sorts": [],
-                "pageIndex": 1,
-                "fields": [
-                    "main_hero",
-                    "main_hero_appearance_rate",
-                    "main_hero_ban_rate",
-                    "main_hero_channel",
-                    "main_hero_win_rate",
-                    "main_heroid",
-                    "data.sub_hero.hero",
-                    "data.sub_hero.hero_channel",
-                    "data.sub_hero.increase_win_rate",
-                    "data.sub_hero.heroid"
-                ]
-            }
-
-        all_rank = create_rank_payload("101")
-        epic_rank = create_rank_payload("5")
-        legend_rank = create_rank_payload("6")
-        mythic_rank = create_rank_payload("7")
-        honor_rank = create_rank_payload("8")
-        glory_rank = create_rank_payload("9")
-
         days = request.GET.get('days', '1')
         rank = request.GET.get('rank', 'all')
         page_size = request.GET.get('size', '20')
@@ -267,266 +237,113 @@ class HeroRankView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
         sort_order = request.GET.get('sort_order', 'desc')
         lang = request.GET.get('lang', 'en')
 
-        sort_field_map = {
-            'pick_rate': 'main_hero_appearance_rate',
-            'ban_rate': 'main_hero_ban_rate',
-            'win_rate': 'main_hero_win_rate'
-        }
-
-        url_map = {
-            '1': url_1_day,
-            '3': url_3_days,
-            '7': url_7_days,
-            '15': url_15_days,
-            '30': url_30_days
-        }
-
-        rank_map = {
-            'all': all_rank,
-            'epic': epic_rank,
-            'legend': legend_rank,
-            'mythic': mythic_rank,
-            'honor': honor_rank,
-            'glory': glory_rank
-        }
+        endpoint, payload = UpstreamQueries.hero_rank(days, rank, page_size, page_index, sort_field, sort_order)
+        return self.upstream_response(endpoint, payload, lang)
 
-        sort_field = sort_field_map.get(sort_field, 'main_hero_win_rate')
-        url = url_map.get(days, url_1_day)
-        payload = rank_map.get(rank, all_rank)
-
-        payload['pageSize'] = int(page_size)
-        payload['pageIndex'] = int(page_index)
-        payload['sorts'] = [
-            {"data": {"field": sort_field, "order": sort_order}, "type": "sequence"}
-        ]
-
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
-
-class HeroPositionView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroPositionView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        base_path = BasePathProvider.get_base_path()
-        url_role_lane = f"{MLBB_URL}{base_path}/2756564"
-
-        role_map = {
-            'all': [1, 2, 3, 4, 5, 6],
-            'tank': [1],
-            'fighter': [2],
-            'ass': [3],
-            'mage': [4],
-            'mm': [5],
-            'supp': [6]
-        }
-        lane_map = {
-            'all': [1, 2, 3, 4, 5],
-            'exp': [1],
-            'mid': [2],
-            'roam': [3],
-            'jungle': [4],
-            'gold': [5]
-        }
-
         role = request.GET.get('role', 'all')
         lane = request.GET.get('lane', 'all')
         page_size = request.GET.get('size', '21')
         page_index = request.GET.get('index', '1')
         lang = request.GET.get('lang', 'en')
 
-        payload = {
-            "pageSize": int(page_size),
-            "filters": [
-                {"field": "<hero.data.sortid>", "operator": "hasAnyOf", "value": role_map.get(role, [1, 2, 3, 4, 5, 6])},
-                {"field": "<hero.data.roadsort>", "operator": "hasAnyOf", "value": lane_map.get(lane, [1, 2, 3, 4, 5])}
-            ],
-            "sorts": [
-                {"data": {"field": "hero_id", "order": "desc"}, "type": "sequence"}
-            ],
-            "pageIndex": int(page_index),
-            "fields": ["id", "hero_id", "hero.data.name", "hero.data.smallmap", "hero.data.sortid", "hero.data.roadsort"],
-            "object": []
-        }
+        endpoint, payload = UpstreamQueries.hero_position(role, lane, page_size, page_index)
+        return self.upstream_response(endpoint, payload, lang)
 
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url_role_lane, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
-
-class HeroDetailView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroDetailView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, hero_id):
-        base_path = BasePathProvider.get_base_path()
-        url = f"{MLBB_URL}{base_path}/2756564"
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "hero_id", "operator": "eq", "value": hero_id}
-            ],
-            "sorts": [],
-            "pageIndex": 1,
-            "object": []
-        }
         lang = request.GET.get('lang', 'en')
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        endpoint, payload = UpstreamQueries.hero_detail(hero_id)
+        return self.upstream_response(endpoint, payload, lang)
 
-class HeroDetailStatsView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroDetailStatsView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, main_heroid):
-        base_path = BasePathProvider.get_base_path()
-        url = f"{MLBB_URL}{base_path}/2756567"
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "main_heroid", "operator": "eq", "value": main_heroid},
-                {"field": "bigrank", "operator": "eq", "value": "101"},
-                {"field": "match_type", "operator": "eq", "value": "1"}
-            ],
-            "sorts": [],
-            "pageIndex": 1
-        }
         lang = request.GET.get('lang', 'en')
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        endpoint, payload = UpstreamQueries.hero_detail_stats(main_heroid)
+        return self.upstream_response(endpoint, payload, lang)
 
-class HeroSkillComboView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroSkillComboView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, hero_id):
-        base_path = BasePathProvider.get_base_path()
-        url = f"{MLBB_URL}{base_path}/2674711"
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "hero_id", "operator": "eq", "value": hero_id}
-            ],
-            "sorts": [],
-            "pageIndex": 1,
-            "object": [2684183]
-        }
         lang = request.GET.get('lang', 'en')
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        endpoint, payload = UpstreamQueries.hero_skill_combo(hero_id)
+        return self.upstream_response(endpoint, payload, lang)
 
-class HeroRateView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroRateView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, main_heroid):
-        base_path = BasePathProvider.get_base_path()
-        url_past_7_days  = f"{MLBB_URL}{base_path}/2674709"
-        url_past_15_days = f"{MLBB_URL}{base_path}/2687909"
-        url_past_30_days = f"{MLBB_URL}{base_path}/2690860"
-
         days = request.GET.get('past-days', '7')
         lang = request.GET.get('lang', 'en')
+        endpoint, payload = UpstreamQueries.hero_rate(main_heroid, days)
+        return self.upstream_response(endpoint, payload, lang)
 
-        url_map = {
-            '7': url_past_7_days,
-            '15': url_past_15_days,
-            '30': url_past_30_days
-        }
-        url = url_map.get(days, url_past_7_days)
-
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "main_heroid", "operator": "eq", "value": main_heroid},
-                {"field": "bigrank", "operator": "eq", "value": "8"},
-                {"field": "match_type", "operator": "eq", "value": "1"}
-            ],
-            "sorts": [],
-            "pageIndex": 1
-        }
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
-
-class HeroRelationView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroRelationView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, hero_id):
-        base_path = BasePathProvider.get_base_path()
-        url = f"{MLBB_URL}{base_path}/2756564"
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "hero_id", "operator": "eq", "value": hero_id}
-            ],
-            "sorts": [],
-            "pageIndex": 1,
-            "fields": ["hero.data.name"],
-            "object": []
-        }
         lang = request.GET.get('lang', 'en')
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        endpoint, payload = UpstreamQueries.hero_relation(hero_id)
+        return self.upstream_response(endpoint, payload, lang)
 
-class HeroCounterView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroCounterView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, main_heroid):
-        base_path = BasePathProvider.get_base_path()
-        url = f"{MLBB_URL}{base_path}/2756569"
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "match_type", "operator": "eq", "value": "0"},
-                {"field": "main_heroid", "operator": "eq", "value": main_heroid},
-                {"field": "bigrank", "operator": "eq", "value": "7"}
-            ],
-            "sorts": [],
-            "pageIndex": 1
-        }
         lang = request.GET.get('lang', 'en')
-        headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        endpoint, payload = UpstreamQueries.hero_counter(main_heroid)
+        return self.upstream_response(endpoint, payload, lang)
 
-class HeroCompatibilityView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+class HeroCompatibilityView(APIAvailabilityMixin, UpstreamProxyMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, main_heroid):
-        base_path = BasePathProvider.get_base_path()
-        url = f"{MLBB_URL}{base_path}/2756569"
-        payload = {
-            "pageSize": 20,
-            "filters": [
-                {"field": "match_type", "operator": "eq", "value": "1"},
-                {"field": "main_heroid", "operator": "eq", "value": main_heroid},
-                {"field": "bigrank", "operator": "eq", "value": "7"}
-            ],
-            "sorts": [],
-            "pageIndex": 1
-        }
         lang = request.GET.get('lang', 'en')
+        endpoint, payload = UpstreamQueries.hero_compatibility(main_heroid)
+        return self.upstream_response(endpoint, payload, lang)
+
+class HeroBundleView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, hero_id):
+        lang = request.GET.get('lang', 'en')
+        parts = request.GET.get('parts')
+        parts = [part.strip() for part in parts.split(',')] if parts else None
+        unknown = [part for part in parts or [] if part not in hero_bundle_fetcher.PARTS]
+        if unknown:
+            return self.error_response(
+                f"Unknown parts: {', '.join(unknown)}",
+                f"Choose from {', '.join(hero_bundle_fetcher.PARTS)}, e.g. ?parts=detail,counter"
+            )
+
         headers = MLBBHeaderBuilder.get_lang_header(lang)
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return Response(response.json())
-        return self.error_response('Failed to fetch data', response.text, status_code=response.status_code)
+        bundle = hero_bundle_fetcher.fetch(hero_id, headers, parts)
+        if not bundle['parts']:
+            return self.error_response('Failed to fetch data', bundle['errors'], status_code=status.HTTP_502_BAD_GATEWAY)
+        return Response(bundle)
+
+class HeroDetailBatchView(APIAvailabilityMixin, BatchUpstreamMixin, APIView):
+    permission_classes = [AllowAny]
+    batch_query = UpstreamQueries.hero_detail_batch
+    batch_key_field = 'hero_id'
+
+class HeroCounterBatchView(APIAvailabilityMixin, BatchUpstreamMixin, APIView):
+    permission_classes = [AllowAny]
+    batch_query = UpstreamQueries.hero_counter_batch
+    batch_key_field = 'main_heroid'
+
+class HeroCompatibilityBatchView(APIAvailabilityMixin, BatchUpstreamMixin, APIView):
+    permission_classes = [AllowAny]
+    batch_query = UpstreamQueries.hero_compatibility_batch
+    batch_key_field = 'main_heroid'
 
 class WinRateView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
     permission_classes = [AllowAny]
@@ -647,3 +464,11 @@ class WinRateView(APIAvailabilityMixin, ErrorResponseMixin, APIView):
                 f"you need {required_matches_int} consecutive wins without any losses."
             )
         }, status=status.HTTP_200_OK)
+
+
+class CacheMetricsView(APIView):
+    """Cache hits, misses, stale serves, fill latency and payload size per key family."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'families': cache_metrics.summary()})
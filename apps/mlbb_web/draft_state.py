@@ -0,0 +1,175 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import models
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
+
+from apps.mlbb_api.views import HEROES_EN
+
+from .models import DraftSession, HeroBan, HeroPick
+
+
+class HeroMask:
+    """Fixed-width hero sets stored as int bitmasks, bit ``n`` being hero id ``n``."""
+
+    @staticmethod
+    def from_ids(hero_ids: Iterable[int]) -> int:
+        mask = 0
+        for hero_id in hero_ids:
+            mask |= 1 << hero_id
+        return mask
+
+    @staticmethod
+    def contains(mask: int, hero_id: int) -> bool:
+        return hero_id >= 0 and bool(mask >> hero_id & 1)
+
+    @staticmethod
+    def ids(mask: int) -> List[int]:
+        hero_ids = []
+        while mask:
+            low = mask & -mask
+            hero_ids.append(low.bit_length() - 1)
+            mask ^= low
+        return hero_ids
+
+    @staticmethod
+    def to_hex(mask: int) -> str:
+        return format(mask, 'x')
+
+
+ALL_HEROES_MASK = HeroMask.from_ids(HEROES_EN)
+
+
+class DraftState:
+    """Picks and bans of one draft session as ordered id tuples plus bitmasks.
+
+    The tuples keep pick/ban order (scoring adds terms in that order); the
+    masks answer "is this hero taken" in O(1) and give a hashable, canonical
+    form of the state. Instances are immutable.
+    """
+    SIDES = ('blue', 'red')
+
+    def __init__(self, blue_picks: Iterable[int] = (), red_picks: Iterable[int] = (),
+                 blue_bans: Iterable[int] = (), red_bans: Iterable[int] = ()):
+        self.picks = {'blue': tuple(blue_picks), 'red': tuple(red_picks)}
+        self.bans = {'blue': tuple(blue_bans), 'red': tuple(red_bans)}
+        self.pick_masks = {side: HeroMask.from_ids(ids) for side, ids in self.picks.items()}
+        self.ban_masks = {side: HeroMask.from_ids(ids) for side, ids in self.bans.items()}
+        self.picked_mask = self.pick_masks['blue'] | self.pick_masks['red']
+        self.banned_mask = self.ban_masks['blue'] | self.ban_masks['red']
+        self.taken_mask = self.picked_mask | self.banned_mask
+
+    @classmethod
+    def from_draft(cls, draft) -> 'DraftState':
+        """Load the state of ``draft`` with a single query over picks and bans."""
+        picks = {side: [] for side in cls.SIDES}
+        bans = {side: [] for side in cls.SIDES}
+        pick_rows = (HeroPick.objects.filter(team__draft_session=draft)
+                     .annotate(kind=models.Value('pick', output_field=models.CharField()))
+                     .values_list('kind', 'team__side', 'hero_id', 'pick_order').order_by())
+        ban_rows = (HeroBan.objects.filter(team__draft_session=draft)
+                    .annotate(kind=models.Value('ban', output_field=models.CharField()))
+                    .values_list('kind', 'team__side', 'hero_id', 'ban_order').order_by())
+        for action, side, hero_id, _ in pick_rows.union(ban_rows, all=True).order_by('pick_order'):
+            (picks if action == 'pick' else bans)[side].append(hero_id)
+        return cls(picks['blue'], picks['red'], bans['blue'], bans['red'])
+
+    @staticmethod
+    def other_side(side: str) -> str:
+        return 'red' if side == 'blue' else 'blue'
+
+    @property
+    def all_bans(self) -> List[int]:
+        return list(self.bans['blue'] + self.bans['red'])
+
+    @property
+    def available_mask(self) -> int:
+        return ALL_HEROES_MASK & ~self.taken_mask
+
+    def is_taken(self, hero_id: int) -> bool:
+        return HeroMask.contains(self.taken_mask, hero_id)
+
+    def teams(self, side: str) -> Tuple[List[int], List[int]]:
+        """``(ally_picks, enemy_picks)`` as seen from ``side``."""
+        return list(self.picks[side]), list(self.picks[self.other_side(side)])
+
+    def with_action(self, side: str, action: str, hero_id: int) -> 'DraftState':
+        """New state with ``side`` having picked or banned ``hero_id``."""
+        picks = {s: list(ids) for s, ids in self.picks.items()}
+        bans = {s: list(ids) for s, ids in self.bans.items()}
+        (picks if action == 'pick' else bans)[side].append(hero_id)
+        return DraftState(picks['blue'], picks['red'], bans['blue'], bans['red'])
+
+    def key(self) -> Tuple[int, int, int, int]:
+        """Canonical, order-independent form of the state."""
+        return (self.pick_masks['blue'], self.pick_masks['red'],
+                self.ban_masks['blue'], self.ban_masks['red'])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DraftState) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def to_dict(self) -> Dict[str, str]:
+        """Hex-encoded masks for the client."""
+        return {
+            'blue_picks': HeroMask.to_hex(self.pick_masks['blue']),
+            'red_picks': HeroMask.to_hex(self.pick_masks['red']),
+            'blue_bans': HeroMask.to_hex(self.ban_masks['blue']),
+            'red_bans': HeroMask.to_hex(self.ban_masks['red']),
+            'taken': HeroMask.to_hex(self.taken_mask),
+            'available': HeroMask.to_hex(self.available_mask),
+        }
+
+
+class LoadedDraft:
+    """A draft session with its teams, picks and bans loaded up front.
+
+    Teams, picks and bans are prefetched onto the session: with ``load``
+    that is four queries however far the draft is. ``team.picks.all()`` and
+    ``team.bans.all()``, in views and templates alike, then read from memory,
+    and ``state`` is built from the same rows.
+    """
+
+    def __init__(self, draft: DraftSession):
+        prefetch_related_objects([draft], 'teams__picks', 'teams__bans')
+        self.draft = draft
+        self.teams = {team.side: team for team in draft.teams.all()}
+        self.picks = {side: list(team.picks.all()) for side, team in self.teams.items()}
+        self.bans = {side: list(team.bans.all()) for side, team in self.teams.items()}
+        self.state = DraftState(*(
+            [row.hero_id for row in rows.get(side, [])]
+            for rows in (self.picks, self.bans) for side in DraftState.SIDES
+        ))
+
+    @classmethod
+    def load(cls, draft_id: int) -> 'LoadedDraft':
+        """Load draft ``draft_id`` or raise ``Http404``."""
+        return cls(get_object_or_404(DraftSession, id=draft_id))
+
+    @property
+    def current_action(self) -> str:
+        draft = self.draft
+        if draft.is_completed or draft.current_turn_index >= len(draft.turn_order):
+            return 'completed'
+        return draft.turn_order[draft.current_turn_index]
+
+    def actions(self, since: int = 0) -> List[Tuple[int, str, str, models.Model]]:
+        """``(turn index, side, 'pick' or 'ban', row)`` for every action from turn ``since`` on."""
+        turn_indexes = {}
+        seen = Counter()
+        for index, turn in enumerate(self.draft.turn_order):
+            seen[turn] += 1
+            turn_indexes[turn, seen[turn]] = index
+
+        actions = []
+        for action, rows_by_side in (('pick', self.picks), ('ban', self.bans)):
+            for side, rows in rows_by_side.items():
+                for row in rows:
+                    order = row.pick_order if action == 'pick' else row.ban_order
+                    index = turn_indexes.get((f'{side}_{action}', order))
+                    if index is not None and index >= since:
+                        actions.append((index, side, action, row))
+        return sorted(actions, key=lambda entry: entry[0])
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class DraftEvent:
+    """One named event about a draft, e.g. an action or fresh recommendations."""
+
+    def __init__(self, draft_id: int, name: str, data: Dict, event_id: Optional[int] = None):
+        self.draft_id = draft_id
+        self.name = name
+        self.data = data
+        self.event_id = event_id
+
+    def to_sse(self) -> str:
+        lines = [] if self.event_id is None else [f'id: {self.event_id}']
+        lines += [f'event: {self.name}', f'data: {json.dumps(self.data)}']
+        return '\n'.join(lines) + '\n\n'
+
+
+class InProcessSubscription:
+    def __init__(self, backend: 'InProcessEventBackend', draft_id: int):
+        self.backend = backend
+        self.draft_id = draft_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def deliver(self, event: DraftEvent) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            # The viewer's event loop is gone
+            self.close()
+
+    async def get(self, timeout: float) -> List[DraftEvent]:
+        """Events published since the last call, waiting up to ``timeout`` seconds for one."""
+        try:
+            events = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    def close(self) -> None:
+        self.backend.unsubscribe(self)
+
+
+class InProcessEventBackend:
+    """Fans events out to the subscribers connected to this process.
+
+    ``publish`` may be called from any thread; each subscriber's queue is fed
+    on its own event loop.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[InProcessSubscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, event: DraftEvent) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.draft_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def subscribe(self, draft_id: int) -> InProcessSubscription:
+        subscription = InProcessSubscription(self, draft_id)
+        with self._lock:
+            self._subscriptions.setdefault(draft_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: InProcessSubscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.draft_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.draft_id]
+
+
+class CacheSubscription:
+    def __init__(self, backend: 'CacheEventBackend', draft_id: int):
+        self.backend = backend
+        self.draft_id = draft_id
+        self.last_seq: Optional[int] = None
+
+    async def get(self, timeout: float) -> List[DraftEvent]:
+        """Events published since the last call, polling up to ``timeout`` seconds for one."""
+        deadline = time.monotonic() + timeout
+        latest_key = self.backend.latest_key(self.draft_id)
+        if self.last_seq is None:
+            self.last_seq = await cache.aget(latest_key, 0)
+        while True:
+            next_key = self.backend.event_key(self.draft_id, self.last_seq + 1)
+            polled = await cache.aget_many([latest_key, next_key])
+            # The next event counts even when a slower publish left the hint behind it
+            seq = max(polled.get(latest_key, 0), self.last_seq + 1 if next_key in polled else 0)
+            if seq > self.last_seq:
+                keys = [self.backend.event_key(self.draft_id, n) for n in range(self.last_seq + 1, seq + 1)]
+                stored = await cache.aget_many(keys)
+                self.last_seq = seq
+                # Events that already expired are skipped; the client resyncs over HTTP
+                return [stored[key] for key in keys if key in stored]
+            if time.monotonic() >= deadline:
+                return []
+            await asyncio.sleep(self.backend.POLL_INTERVAL)
+
+    def close(self) -> None:
+        pass
+
+
+class CacheEventBackend:
+    """Fans events out through the cache so every worker sharing it sees them.
+
+    Each event is stored under its ``event_id``, the draft version the
+    action's compare-and-swap update gave it, so no cache counter has to be
+    incremented atomically. A per-draft hint holds the newest id published;
+    subscribers poll it and the id after the last one they read.
+    """
+    KEY_PREFIX = 'mlbb_draft_events'
+    POLL_INTERVAL = 0.25
+    EVENT_TTL = 5 * 60
+
+    def latest_key(self, draft_id: int) -> str:
+        return f'{self.KEY_PREFIX}:{draft_id}'
+
+    def event_key(self, draft_id: int, seq: int) -> str:
+        return f'{self.KEY_PREFIX}:{draft_id}:{seq}'
+
+    def publish(self, event: DraftEvent) -> None:
+        if event.event_id is None:
+            raise ValueError('Cache-backed events need an event_id, the draft version they follow')
+        cache.set(self.event_key(event.draft_id, event.event_id), event, self.EVENT_TTL)
+        # Racing publishers may leave an older id here; subscribers still find the newer event
+        cache.set(self.latest_key(event.draft_id), event.event_id, self.EVENT_TTL)
+
+    def subscribe(self, draft_id: int) -> CacheSubscription:
+        return CacheSubscription(self, draft_id)
+
+
+class DraftEvents:
+    """Publishes draft events through the ``MLBB_DRAFT_EVENTS_BACKEND`` backend."""
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = import_string(settings.MLBB_DRAFT_EVENTS_BACKEND)()
+        return self._backend
+
+    def publish(self, draft_id: int, name: str, data: Dict, event_id: Optional[int] = None) -> None:
+        try:
+            self.backend.publish(DraftEvent(draft_id, name, data, event_id))
+        except Exception as e:
+            logger.error(f"Publishing {name} event for draft {draft_id} failed: {str(e)}")
+
+    def subscribe(self, draft_id: int):
+        """Subscribe from within the viewer's event loop."""
+        return self.backend.subscribe(draft_id)
+
+
+draft_events = DraftEvents()
@@ -0,0 +1,126 @@
+from typing import Dict, List, Optional, Tuple
+
+from apps.mlbb_api.views import HEROES_EN
+
+from .models import HeroPick
+
+INF = float('inf')
+
+# Upstream roadsort lane ids (see UpstreamQueries.LANES) to HeroPick positions
+LANE_POSITIONS = {1: 1, 2: 3, 3: 5, 4: 2, 5: 4}
+POSITION_NAMES = dict(HeroPick.POSITIONS)
+POSITIONS = [position for position, _ in HeroPick.POSITIONS]
+
+
+def hungarian(cost: List[List[float]]) -> List[int]:
+    """Minimum-cost assignment of rows to distinct columns.
+
+    ``cost`` has ``n`` rows of ``m >= n`` columns; returns the column of each
+    row. This is the O(n^2 m) shortest augmenting path form with row and
+    column potentials.
+    """
+    n = len(cost)
+    if not n:
+        return []
+    m = len(cost[0])
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # match[column] = row, 1-based; 0 is free
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        match[0] = row
+        column = 0
+        min_slack = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while match[column]:
+            used[column] = True
+            current_row = match[column]
+            delta, next_column = INF, 0
+            row_cost = cost[current_row - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    slack = row_cost[j - 1] - u[current_row] - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j], way[j] = slack, column
+                    if min_slack[j] < delta:
+                        delta, next_column = min_slack[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            column = next_column
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            assignment[match[j] - 1] = j - 1
+    return assignment
+
+
+class LaneAssigner:
+    """Assigns heroes to the five ``HeroPick.POSITIONS`` by lane fit.
+
+    A hero fits its first listed roadsort lane with ``PRIMARY_FIT``, any
+    other listed lane with ``SECONDARY_FIT``, and everything else with 0.
+    The best assignment of a team is the Hungarian solution over that
+    hero x position matrix. Candidates are scored by how much they raise
+    the team's total fit, memoized per distinct fit row since heroes share
+    only a handful of lane combinations.
+    """
+    PRIMARY_FIT = 1.0
+    SECONDARY_FIT = 0.6
+
+    def __init__(self, metadata: Dict[int, Dict]):
+        self.metadata = metadata
+
+    def fit_row(self, hero_id: int) -> Tuple[float, ...]:
+        fits = dict.fromkeys(POSITIONS, 0.0)
+        lane_ids = self.metadata.get(hero_id, {}).get('lane_ids', [])
+        for index, lane_id in enumerate(lane_ids):
+            position = LANE_POSITIONS.get(lane_id)
+            if position is not None and not fits[position]:
+                fits[position] = self.PRIMARY_FIT if index == 0 else self.SECONDARY_FIT
+        return tuple(fits[position] for position in POSITIONS)
+
+    @staticmethod
+    def _solve(rows: List[Tuple[float, ...]]) -> Tuple[List[int], float]:
+        rows = rows[:len(POSITIONS)]
+        columns = hungarian([[-fit for fit in row] for row in rows])
+        return [POSITIONS[column] for column in columns], sum(row[column] for row, column in zip(rows, columns))
+
+    def assign(self, hero_ids: List[int]) -> List[Dict]:
+        """Best position for each of ``hero_ids`` (at most five are placed)."""
+        hero_ids = hero_ids[:len(POSITIONS)]
+        rows = [self.fit_row(hero_id) for hero_id in hero_ids]
+        positions, _ = self._solve(rows)
+        return [{
+            'hero_id': hero_id,
+            'hero_name': HEROES_EN.get(hero_id, f'Hero {hero_id}'),
+            'position': position,
+            'position_name': POSITION_NAMES[position],
+            'fit': row[POSITIONS.index(position)],
+        } for hero_id, position, row in zip(hero_ids, positions, rows)]
+
+    def candidate_gains(self, team_picks: List[int],
+                        hero_ids: List[int]) -> List[Tuple[float, Optional[int]]]:
+        """``(fit gain, position)`` for adding each of ``hero_ids`` to ``team_picks``."""
+        if len(team_picks) >= len(POSITIONS):
+            return [(0.0, None)] * len(hero_ids)
+        team_rows = [self.fit_row(hero_id) for hero_id in team_picks]
+        _, base_fit = self._solve(team_rows)
+
+        gains = {}
+        results = []
+        for hero_id in hero_ids:
+            row = self.fit_row(hero_id)
+            if row not in gains:
+                positions, total = self._solve(team_rows + [row])
+                gains[row] = (total - base_fit, positions[-1])
+            results.append(gains[row])
+        return results
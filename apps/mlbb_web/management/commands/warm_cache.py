@@ -0,0 +1,45 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.mlbb_api.cache import tiered_cache
+from apps.mlbb_api.snapshot import CacheSnapshot
+from apps.mlbb_web.matrices import hero_matrix_store
+from apps.mlbb_web.services import MLBBAPIService
+
+
+class Command(BaseCommand):
+    help = ('Fetch the hero list, rankings, metadata, counters and synergy data into the cache '
+            'and rebuild the hero matrices. With --snapshot, also write them to the cold-start '
+            'snapshot that new instances read before their cache is warm.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--snapshot', nargs='?', const=settings.MLBB_CACHE_SNAPSHOT, default=None, metavar='PATH',
+            help='Write a snapshot file (defaults to MLBB_CACHE_SNAPSHOT)'
+        )
+
+    def handle(self, *args, **options):
+        # Fetch from upstream rather than reading back the snapshot being replaced
+        tiered_cache.fallback = None
+        service = MLBBAPIService()
+        keys = service.warm_up()
+        matrices = hero_matrix_store.rebuild()
+        entries = {key: entry for key, entry in service.store.get_entries(keys).items()
+                   if entry['value'] and 'data' in entry['value']}
+        self.stdout.write(f'Cached {len(entries)} of {len(keys)} entries; '
+                          f'hero matrices version {matrices.version}')
+
+        path = options['snapshot']
+        if path is None:
+            return
+        if not path:
+            raise CommandError('No snapshot path: pass one or set MLBB_CACHE_SNAPSHOT')
+        if not entries:
+            raise CommandError('Nothing was fetched; the snapshot was not written')
+        version = CacheSnapshot.write(path, entries)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote snapshot {version} with {len(entries)} entries '
+            f'({os.path.getsize(path) / 1024:.0f} KiB) to {path}'
+        ))
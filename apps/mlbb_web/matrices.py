@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.mlbb_api.singleflight import single_flight
+from apps.mlbb_api.views import HEROES_EN
+
+logger = logging.getLogger(__name__)
+
+
+class HeroMatrices:
+    """Dense hero-by-hero matchup tables indexed by hero id.
+
+    ``counter[a][b]`` is the win-rate change listed for ``b`` in ``a``'s
+    ``sub_hero`` counter data (``a`` is strong against ``b``), ``weak[a][b]``
+    the same for ``sub_hero_last``, and ``synergy[a][b]`` the change listed
+    for ``b`` in ``a``'s compatibility data. Pairs without data are 0.0.
+    Tables are flat ``array('d')`` buffers of ``size * size`` entries, so
+    every lookup is a single index operation.
+    """
+    TABLES = ('counter', 'weak', 'synergy')
+    MAGIC = b'MLHM'
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('<4sBHd')
+
+    def __init__(self, size: int, counter: array, weak: array, synergy: array,
+                 built_at: float, version: Optional[str] = None):
+        self.size = size
+        self.counter = counter
+        self.weak = weak
+        self.synergy = synergy
+        self.built_at = built_at
+        self.version = version or self._digest(self._tables_bytes())
+
+    @classmethod
+    def empty(cls, size: int) -> 'HeroMatrices':
+        return cls(size, *(array('d', bytes(8 * size * size)) for _ in cls.TABLES), built_at=time.time())
+
+    def index(self, hero_id: int, other_id: int) -> int:
+        return hero_id * self.size + other_id
+
+    def contains(self, hero_id: int) -> bool:
+        return 0 <= hero_id < self.size
+
+    def lookup(self, table: str, hero_id: int, other_id: int) -> float:
+        if not (self.contains(hero_id) and self.contains(other_id)):
+            return 0.0
+        return getattr(self, table)[hero_id * self.size + other_id]
+
+    def row(self, table: str, hero_id: int) -> memoryview:
+        """Every entry of ``table`` for ``hero_id``, indexed by the other hero's id."""
+        start = hero_id * self.size
+        return memoryview(getattr(self, table))[start:start + self.size]
+
+    def column(self, table: str, other_id: int) -> List[float]:
+        """Every entry of ``table`` against ``other_id``, indexed by hero id."""
+        return getattr(self, table)[other_id::self.size].tolist()
+
+    def _tables_bytes(self) -> bytes:
+        parts = []
+        for name in self.TABLES:
+            table = getattr(self, name)
+            if sys.byteorder == 'big':
+                table = array('d', table)
+                table.byteswap()
+            parts.append(table.tobytes())
+        return b''.join(parts)
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()[:12]
+
+    def to_bytes(self) -> bytes:
+        return self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION, self.size, self.built_at) + self._tables_bytes()
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'HeroMatrices':
+        magic, format_version, size, built_at = cls.HEADER.unpack_from(blob)
+        if magic != cls.MAGIC or format_version != cls.FORMAT_VERSION:
+            raise ValueError('Unsupported hero matrix snapshot')
+        body = memoryview(blob)[cls.HEADER.size:]
+        step = 8 * size * size
+        tables = []
+        for i in range(len(cls.TABLES)):
+            table = array('d')
+            table.frombytes(body[i * step:(i + 1) * step])
+            if sys.byteorder == 'big':
+                table.byteswap()
+            tables.append(table)
+        return cls(size, *tables, built_at=built_at, version=cls._digest(bytes(body)))
+
+
+class HeroMatrixBuilder:
+    """Materializes ``HeroMatrices`` from batched counter and compatibility data."""
+
+    def __init__(self, api_service):
+        self.api_service = api_service
+
+    def build(self, hero_ids: Optional[Iterable[int]] = None) -> Optional[HeroMatrices]:
+        hero_ids = sorted(hero_ids or HEROES_EN)
+        counters = self.api_service.get_hero_counters_batch(hero_ids)
+        compatibility = self.api_service.get_hero_compatibility_batch(hero_ids)
+
+        entries = []
+        for hero_id in hero_ids:
+            for table, key, relations in (('counter', 'strong_against', counters[hero_id]),
+                                          ('weak', 'weak_against', counters[hero_id]),
+                                          ('synergy', 'synergizes_with', compatibility[hero_id])):
+                for relation in relations[key]:
+                    try:
+                        other_id = int(relation['hero_id'])
+                    except (TypeError, ValueError):
+                        continue
+                    if other_id >= 0:
+                        entries.append((table, hero_id, other_id, relation['win_rate_change'] or 0.0))
+        if not entries:
+            return None
+
+        size = max(max(hero_ids), max(entry[2] for entry in entries)) + 1
+        tables = {name: array('d', bytes(8 * size * size)) for name in HeroMatrices.TABLES}
+        for table, hero_id, other_id, value in entries:
+            tables[table][hero_id * size + other_id] = value
+        return HeroMatrices(size, tables['counter'], tables['weak'], tables['synergy'], built_at=time.time())
+
+
+class HeroMatrixStore:
+    """Keeps the current ``HeroMatrices`` in the shared cache and in memory.
+
+    The compact binary snapshot lives in the cache under ``CACHE_KEY`` next to
+    a small version key. Each process decodes a snapshot once and only
+    re-reads the version key every ``LOCAL_RECHECK`` seconds. Snapshots older
+    than ``MLBB_MATRIX_REFRESH`` seconds are rebuilt in the background while
+    the old one keeps serving. A build that fails or finds no data is not
+    retried by any worker for ``FAILURE_BACKOFF`` seconds.
+    """
+    CACHE_KEY = 'mlbb_hero_matrices'
+    VERSION_KEY = 'mlbb_hero_matrices_version'
+    FAILURE_KEY = 'mlbb_hero_matrices_failed'
+    LOCAL_RECHECK = 30
+    REBUILD_LOCK_TIMEOUT = 120
+    FAILURE_BACKOFF = 60
+
+    def __init__(self):
+        self._matrices: Optional[HeroMatrices] = None
+        self._checked_at = 0.0
+
+    def _api_service(self):
+        from apps.mlbb_web.services import MLBBAPIService
+        return MLBBAPIService()
+
+    def get(self) -> HeroMatrices:
+        now = time.time()
+        if self._matrices is not None and now < self._checked_at + self.LOCAL_RECHECK:
+            return self._matrices
+
+        version = cache.get(self.VERSION_KEY)
+        if version is None or self._matrices is None or self._matrices.version != version:
+            blob = cache.get(self.CACHE_KEY) if version is not None else None
+            if blob is not None:
+                self._matrices = HeroMatrices.from_bytes(blob)
+            elif cache.get(self.FAILURE_KEY):
+                # A build failed moments ago; keep serving what we have
+                self._matrices = self._matrices or self._empty()
+            else:
+                self._matrices = single_flight.do(self.CACHE_KEY, self.rebuild)
+
+        if self._matrices.built_at + settings.MLBB_MATRIX_REFRESH < now:
+            self._rebuild_in_background()
+        self._checked_at = now
+        return self._matrices
+
+    def rebuild(self) -> HeroMatrices:
+        matrices = HeroMatrixBuilder(self._api_service()).build()
+        if matrices is None:
+            # Keep serving whatever we had; retry on the next recheck
+            logger.error("Could not build hero matrices: no counter or compatibility data")
+            cache.set(self.FAILURE_KEY, True, self.FAILURE_BACKOFF)
+            return self._matrices or self._empty()
+
+        timeout = settings.MLBB_MATRIX_REFRESH * 4
+        cache.set(self.CACHE_KEY, matrices.to_bytes(), timeout)
+        cache.set(self.VERSION_KEY, matrices.version, timeout)
+        self._matrices = matrices
+        return matrices
+
+    @staticmethod
+    def _empty() -> HeroMatrices:
+        return HeroMatrices.empty(max(HEROES_EN) + 1)
+
+    def _rebuild_in_background(self) -> None:
+        lock_key = f'{self.CACHE_KEY}:rebuild'
+        if cache.get(self.FAILURE_KEY) or not cache.add(lock_key, True, self.REBUILD_LOCK_TIMEOUT):
+            return
+
+        def rebuild():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Background rebuild of hero matrices failed: {str(e)}")
+            finally:
+                cache.delete(lock_key)
+
+        threading.Thread(target=rebuild, daemon=True).start()
+
+
+hero_matrix_store = HeroMatrixStore()
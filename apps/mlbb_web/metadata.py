@@ -0,0 +1,37 @@
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+
+
+class HeroMetadataTable:
+    """Process-local copy of every hero's role, lanes and difficulty.
+
+    The table is fetched with one bulk call and kept in memory for
+    ``MLBB_MATRIX_REFRESH`` seconds, the same refresh period as the hero
+    matrices, so per-hero lookups never touch the cache or upstream. An
+    empty fetch is not kept; the next call tries again.
+    """
+
+    def __init__(self):
+        self._table: Dict[int, Dict] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _api_service(self):
+        from apps.mlbb_web.services import MLBBAPIService
+        return MLBBAPIService()
+
+    def get(self) -> Dict[int, Dict]:
+        if self._table and time.time() < self._loaded_at + settings.MLBB_MATRIX_REFRESH:
+            return self._table
+        with self._lock:
+            if not self._table or time.time() >= self._loaded_at + settings.MLBB_MATRIX_REFRESH:
+                table = self._api_service().get_hero_metadata()
+                if table:
+                    self._table, self._loaded_at = table, time.time()
+        return self._table
+
+
+hero_metadata_table = HeroMetadataTable()
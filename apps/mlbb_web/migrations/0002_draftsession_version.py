@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mlbb_web', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='draftsession',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -26,6 +26,7 @@ class DraftSession(models.Model):
     # Draft order tracking
     turn_order = models.JSONField(default=list)  # Stores the turn sequence
     current_turn_index = models.IntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)  # Bumped on every action, for compare-and-swap
     
     class Meta:
         ordering = ['-updated_at']
@@ -0,0 +1,62 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from django.conf import settings
+
+from .draft_state import DraftState
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationPrecomputer:
+    """Warms the recommendation cache right after a draft action.
+
+    ``schedule`` hands the new state to a small shared thread pool, which
+    computes the recommendations for the next turn and then for the turn
+    after each of the ``top_k`` most likely replies (the top recommendations
+    for the next turn). Results land in the cache under the same draft-state
+    keys ``DraftRecommendationService.get_recommendations`` reads, so the
+    client's next poll is a cache hit.
+    """
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, top_k: Optional[int] = None):
+        self.top_k = top_k
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.MLBB_PRECOMPUTE_WORKERS, thread_name_prefix='draft-precompute'
+                    )
+        return cls._executor
+
+    def schedule(self, state: DraftState, turn_order: List[str], turn_index: int) -> Optional[Future]:
+        top_k = self.top_k if self.top_k is not None else settings.MLBB_PRECOMPUTE_TOP_K
+        if not top_k or turn_index >= len(turn_order):
+            return None
+        return self.executor().submit(self._run, state, list(turn_order), turn_index, top_k)
+
+    def _run(self, state: DraftState, turn_order: List[str], turn_index: int, top_k: int) -> None:
+        from apps.mlbb_web.services import DraftRecommendationService
+        try:
+            service = DraftRecommendationService()
+            current_action = turn_order[turn_index]
+            recommendations = service.get_recommendations(state, current_action)
+            if turn_index + 1 >= len(turn_order):
+                return
+
+            side, action = current_action.split('_')
+            next_action = turn_order[turn_index + 1]
+            for hero in recommendations[:top_k]:
+                service.get_recommendations(state.with_action(side, action, hero['id']), next_action)
+        except Exception as e:
+            logger.error(f"Precomputing recommendations failed: {str(e)}")
+
+
+recommendation_precomputer = RecommendationPrecomputer()
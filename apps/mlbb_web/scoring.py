@@ -0,0 +1,78 @@
+from array import array
+from operator import add
+from typing import Dict, List
+
+from .matrices import HeroMatrices
+
+
+class DraftScoringEngine:
+    """Scores every candidate hero for a draft state in a single pass.
+
+    Each scoring term is built as a whole hero-indexed vector (a row or
+    column of the precomputed matchup tables) and added element-wise, so the
+    cost depends on the number of picks rather than on candidates times
+    picks. Terms are added in the same order as the per-hero formula, which
+    keeps the scores bit-for-bit identical to it:
+
+    * meta: ``(win_rate - 50) * 0.5`` and ``min(pick_rate * 0.1, 5)``
+    * synergy per ally: ``min(synergy[ally][hero] * 0.5, 3)``
+    * counter per enemy: ``min(counter[hero][enemy] * 0.3, 5)``
+    * countered-by per enemy: ``-min(abs(counter[enemy][hero]) * 0.2, 3)``
+    """
+    BASE_SCORE = 50.0
+
+    def __init__(self, matrices: HeroMatrices, rankings: List[Dict]):
+        self.matrices = matrices
+        self.rankings = {}
+        for hero in rankings:
+            self.rankings.setdefault(hero['id'], hero)
+
+    def _row(self, table: str, hero_id: int, size: int) -> List[float]:
+        if not self.matrices.contains(hero_id):
+            return [0.0] * size
+        values = self.matrices.row(table, hero_id).tolist()
+        return values + [0.0] * (size - len(values))
+
+    def _column(self, table: str, hero_id: int, size: int) -> List[float]:
+        if not self.matrices.contains(hero_id):
+            return [0.0] * size
+        values = self.matrices.column(table, hero_id)
+        return values + [0.0] * (size - len(values))
+
+    def _meta_vectors(self, size: int):
+        win = array('d', bytes(8 * size))
+        pick = array('d', bytes(8 * size))
+        for hero_id, hero in self.rankings.items():
+            if 0 <= hero_id < size:
+                win[hero_id] = (hero['win_rate'] - 50) * 0.5
+                pick[hero_id] = min(hero['pick_rate'] * 0.1, 5)
+        return win, pick
+
+    def score_all(self, ally_picks: List[int], enemy_picks: List[int], size: int) -> List[float]:
+        """Draft score of every hero id below ``size``."""
+        win, pick = self._meta_vectors(size)
+        scores = [self.BASE_SCORE] * size
+        scores = list(map(add, scores, win))
+        scores = list(map(add, scores, pick))
+
+        for ally_id in ally_picks:
+            synergy = [min(value * 0.5, 3) for value in self._row('synergy', ally_id, size)]
+            scores = list(map(add, scores, synergy))
+
+        for enemy_id in enemy_picks:
+            counter = [min(value * 0.3, 5) for value in self._column('counter', enemy_id, size)]
+            scores = list(map(add, scores, counter))
+
+        for enemy_id in enemy_picks:
+            countered = [-min(abs(value) * 0.2, 3) for value in self._row('counter', enemy_id, size)]
+            scores = list(map(add, scores, countered))
+
+        return [max(0, min(100, score)) for score in scores]
+
+    def score(self, ally_picks: List[int], enemy_picks: List[int], hero_ids: List[int]) -> List[float]:
+        """Draft scores for ``hero_ids``, in the same order."""
+        if not hero_ids:
+            return []
+        size = max(self.matrices.size, max(hero_ids) + 1)
+        scores = self.score_all(ally_picks, enemy_picks, size)
+        return [scores[hero_id] if hero_id >= 0 else self.BASE_SCORE for hero_id in hero_ids]
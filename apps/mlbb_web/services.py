@@ -1,44 +1,148 @@
 import requests
+import hashlib
+import heapq
 import logging
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from functools import partial
+from operator import add
+from typing import Callable, Dict, List, Optional, Tuple
 from django.conf import settings
-from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 
+from apps.mlbb_api.cache import StaleWhileRevalidateCache, tiered_cache, upstream_cache
+from apps.mlbb_api.endpoints import UpstreamEndpoint, UpstreamQueries, split_by_hero
+from apps.mlbb_api.metrics import cache_metrics
+from apps.mlbb_api.singleflight import single_flight
+from apps.mlbb_api.views import HEROES_EN, MLBBHeaderBuilder
+
+from .draft_state import DraftState, HeroMask
+from .lanes import POSITION_NAMES, LaneAssigner
+from .matrices import HeroMatrices, hero_matrix_store
+from .metadata import hero_metadata_table
+from .scoring import DraftScoringEngine
+from .solver import DraftSolver
+
 logger = logging.getLogger(__name__)
 
 class MLBBAPIService:
-    """Enhanced service for integrating MLBB API data with the draft system"""
+    """Enhanced service for integrating MLBB API data with the draft system
+
+    By default data is fetched in-process through the same upstream client,
+    response cache and payload builders the mlbb_api views use. Setting
+    ``MLBB_WEB_TRANSPORT = 'http'`` calls the public API over HTTP instead.
+    """
     
-    def __init__(self):
+    # Upstream role (sortid) and lane (roadsort) ids, as filtered on by UpstreamQueries
+    ROLE_NAMES = {1: 'Tank', 2: 'Fighter', 3: 'Assassin', 4: 'Mage', 5: 'Marksman', 6: 'Support'}
+    LANE_NAMES = {1: 'Exp Lane', 2: 'Mid Lane', 3: 'Roam', 4: 'Jungle', 5: 'Gold Lane'}
+    # Ranking sizes DraftRecommendationService reads; warm_up fills them for every period and rank
+    WARM_RANK_SIZES = (30, 50)
+    
+    def __init__(self, transport: Optional[str] = None):
         self.base_url = settings.PROD_URL
-        self.cache_timeout = 300  # 5 minutes cache
-        
-    def _get_cached_data(self, cache_key: str, api_url: str) -> Optional[Dict]:
-        """Get data from cache or API with caching"""
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-            
+        self.cache_ttls = settings.MLBB_WEB_CACHE_TTLS
+        self.stale_ttl = settings.MLBB_WEB_STALE_TTL
+        self.negative_ttl = settings.MLBB_WEB_NEGATIVE_TTL
+        self.store = StaleWhileRevalidateCache(tiered_cache, family=self.cache_family)
+        self.transport = transport or settings.MLBB_WEB_TRANSPORT
+        # Set while warm_up runs: stale entries are refetched synchronously
+        self._warming = False
+        
+    def cache_family(self, cache_key: str) -> str:
+        """The ``MLBB_WEB_CACHE_TTLS`` family of ``cache_key``: its longest matching prefix"""
+        families = [family for family in self.cache_ttls if family != 'default' and cache_key.startswith(family)]
+        return max(families, key=len) if families else 'default'
+    
+    def cache_ttl(self, cache_key: str) -> int:
+        return self.cache_ttls[self.cache_family(cache_key)]
+    
+    def _get_cached_data(self, cache_key: str, api_url: str,
+                         query: Callable[[], Tuple[UpstreamEndpoint, Dict]]) -> Optional[Dict]:
+        """Get data from the cache tiers or the API
+        
+        Expired entries are served stale while one background refresh runs;
+        concurrent misses share one fetch, and failed or empty fetches are
+        cached briefly so an outage is not retried on every request.
+        """
+        def fill():
+            data = self._fetch(api_url, query)
+            return data, bool(data) and 'data' in data
+        
+        if self._warming:
+            return self.store.get_or_refill(cache_key, fill, self.cache_ttl(cache_key), self.stale_ttl)
+        return self.store.get_or_fill(cache_key, fill, self.cache_ttl(cache_key),
+                                      self.stale_ttl, self.negative_ttl)
+
+    def _fetch(self, api_url: str, query: Callable[[], Tuple[UpstreamEndpoint, Dict]]) -> Optional[Dict]:
+        """Fetch data through the configured transport"""
         try:
-            response = requests.get(api_url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data and 'data' in data:
-                    cache.set(cache_key, data, self.cache_timeout)
-                    return data
+            if self.transport == 'http':
+                return self._fetch_http(api_url)
+            return self._fetch_inprocess(query)
         except Exception as e:
             logger.error(f"Error fetching data from {api_url}: {str(e)}")
             
         return None
+
+    def _fetch_http(self, api_url: str) -> Optional[Dict]:
+        """Fetch data from our own public API over HTTP"""
+        response = requests.get(api_url, timeout=10)
+        if response.status_code == 200:
+            return response.json()
+        return None
+
+    def _fetch_inprocess(self, query: Callable[[], Tuple[UpstreamEndpoint, Dict]]) -> Optional[Dict]:
+        """Fetch data straight from upstream, skipping the loopback HTTP hop
+        
+        Our own cache decides when to fetch, so this always calls upstream
+        rather than reusing a cached, possibly stale, upstream response.
+        """
+        endpoint, payload = query()
+        response = upstream_cache.fetch(endpoint, payload, MLBBHeaderBuilder.get_lang_header('en'))
+        return response.data if response.ok else None
     
+    def warm_up(self, hero_ids: Optional[List[int]] = None) -> List[str]:
+        """Fetch everything the draft tools read into the cache; returns its keys
+
+        That is the hero list, metadata, rankings for every period and rank
+        and the counter and synergy data of every hero.
+        Entries that are missing or stale are fetched right away rather than
+        in the background; fresh ones are left alone, and an entry whose
+        fetch fails keeps its cached value.
+        """
+        hero_ids = sorted(hero_ids or HEROES_EN)
+        getters = {'mlbb_hero_list_enhanced': self.get_hero_list, 'mlbb_hero_metadata': self.get_hero_metadata}
+        for days in UpstreamQueries.RANK_DAYS:
+            for rank in UpstreamQueries.RANK_VALUES:
+                for size in self.WARM_RANK_SIZES:
+                    getters[f'mlbb_hero_rank_{days}_{rank}_{size}'] = partial(self.get_hero_rankings, days, rank, size)
+        self._warming = True
+        try:
+            for getter in getters.values():
+                getter()
+        finally:
+            self._warming = False
+
+        keys = list(getters)
+        for key_prefix, api_path, query in (
+            ('mlbb_hero_counter_', 'hero-counter', UpstreamQueries.hero_counter_batch),
+            ('mlbb_hero_compatibility_', 'hero-compatibility', UpstreamQueries.hero_compatibility_batch),
+        ):
+            cached = self.store.get_entries([f'{key_prefix}{hero_id}' for hero_id in hero_ids])
+            self._fetch_batches(key_prefix, api_path, [
+                hero_id for hero_id in hero_ids if not self.store.is_fresh(cached.get(f'{key_prefix}{hero_id}'))
+            ], query, 'main_heroid')
+            keys += [f'{key_prefix}{hero_id}' for hero_id in hero_ids]
+        return keys
+
     def get_hero_list(self) -> List[Dict]:
         """Get comprehensive hero list with current stats"""
         cache_key = 'mlbb_hero_list_enhanced'
         api_url = f'{self.base_url}hero-list-new/'
         
-        data = self._get_cached_data(cache_key, api_url)
+        data = self._get_cached_data(cache_key, api_url, UpstreamQueries.hero_list_new)
         if not data or 'data' not in data:
             return []
             
@@ -66,7 +170,18 @@ class MLBBAPIService:
         cache_key = f'mlbb_hero_counter_{hero_id}'
         api_url = f'{self.base_url}hero-counter/{hero_id}/'
         
-        data = self._get_cached_data(cache_key, api_url)
+        data = self._get_cached_data(cache_key, api_url, lambda: UpstreamQueries.hero_counter(hero_id))
+        return self._counters_from(data)
+    
+    def get_hero_compatibility(self, hero_id: int) -> Dict[str, List[Dict]]:
+        """Get hero compatibility/synergy data"""
+        cache_key = f'mlbb_hero_compatibility_{hero_id}'
+        api_url = f'{self.base_url}hero-compatibility/{hero_id}/'
+        
+        data = self._get_cached_data(cache_key, api_url, lambda: UpstreamQueries.hero_compatibility(hero_id))
+        return self._compatibility_from(data)
+    
+    def _counters_from(self, data: Optional[Dict]) -> Dict[str, List[Dict]]:
         if not data or 'data' not in data or not data['data']['records']:
             return {'strong_against': [], 'weak_against': []}
             
@@ -77,12 +192,7 @@ class MLBBAPIService:
             'weak_against': self._process_counter_data(record.get('sub_hero_last', []))
         }
     
-    def get_hero_compatibility(self, hero_id: int) -> Dict[str, List[Dict]]:
-        """Get hero compatibility/synergy data"""
-        cache_key = f'mlbb_hero_compatibility_{hero_id}'
-        api_url = f'{self.base_url}hero-compatibility/{hero_id}/'
-        
-        data = self._get_cached_data(cache_key, api_url)
+    def _compatibility_from(self, data: Optional[Dict]) -> Dict[str, List[Dict]]:
         if not data or 'data' not in data or not data['data']['records']:
             return {'synergizes_with': []}
             
@@ -92,12 +202,91 @@ class MLBBAPIService:
             'synergizes_with': self._process_counter_data(record.get('sub_hero', []))
         }
     
+    def get_hero_counters_batch(self, hero_ids: List[int]) -> Dict[int, Dict[str, List[Dict]]]:
+        """Get counter relationships for several heroes in as few upstream calls as possible
+
+        Heroes the batched calls could not fetch come back empty rather than
+        being fetched one by one.
+        """
+        cached = self._prefetch_batch('mlbb_hero_counter_', 'hero-counter', hero_ids,
+                                      UpstreamQueries.hero_counter_batch, 'main_heroid')
+        return {hero_id: self._counters_from(cached.get(hero_id)) for hero_id in hero_ids}
+
+    def get_hero_compatibility_batch(self, hero_ids: List[int]) -> Dict[int, Dict[str, List[Dict]]]:
+        """Get synergy data for several heroes in as few upstream calls as possible
+
+        Heroes the batched calls could not fetch come back empty rather than
+        being fetched one by one.
+        """
+        cached = self._prefetch_batch('mlbb_hero_compatibility_', 'hero-compatibility', hero_ids,
+                                      UpstreamQueries.hero_compatibility_batch, 'main_heroid')
+        return {hero_id: self._compatibility_from(cached.get(hero_id)) for hero_id in hero_ids}
+
+    def _prefetch_batch(self, key_prefix: str, api_path: str, hero_ids: List[int],
+                        query: Callable[[List[int]], Tuple[UpstreamEndpoint, Dict]],
+                        key_field: str) -> Dict[int, Dict]:
+        """Fill per-hero cache entries that are missing or stale with batched hasAnyOf calls
+
+        Each hero is cached under the same key and in the same shape as a
+        single-hero fetch, so the per-hero getters read it transparently.
+        Missing heroes are fetched right away; stale ones keep being served
+        while a background batch refreshes them, holding each hero's refresh
+        lock so the per-hero getters do not refresh them one by one.
+        Returns the data now available per hero id.
+        """
+        family = self.cache_family(key_prefix)
+        hero_ids = sorted(set(hero_id for hero_id in hero_ids if hero_id is not None))
+        cached = self.store.get_entries([f'{key_prefix}{hero_id}' for hero_id in hero_ids])
+        available = {hero_id: cached[f'{key_prefix}{hero_id}']['value']
+                     for hero_id in hero_ids if f'{key_prefix}{hero_id}' in cached}
+        missing = [hero_id for hero_id in hero_ids if hero_id not in available]
+        stale = [hero_id for hero_id in available if not self.store.is_fresh(cached[f'{key_prefix}{hero_id}'])]
+        cache_metrics.record(family, hits=len(available) - len(stale), stale=len(stale), misses=len(missing))
+
+        available.update(self._fetch_batches(key_prefix, api_path, missing, query, key_field))
+        stale = [hero_id for hero_id in stale if self.store.claim_refresh(f'{key_prefix}{hero_id}')]
+        if stale:
+            def refresh():
+                for hero_id in self._fetch_batches(key_prefix, api_path, stale, query, key_field):
+                    self.store.release_refresh(f'{key_prefix}{hero_id}')
+
+            threading.Thread(target=refresh, daemon=True).start()
+        return available
+
+    def _fetch_batches(self, key_prefix: str, api_path: str, hero_ids: List[int],
+                       query: Callable[[List[int]], Tuple[UpstreamEndpoint, Dict]], key_field: str) -> Dict[int, Dict]:
+        """Fetch and cache ``hero_ids`` in batches; returns the data of the heroes that were cached"""
+        fetched = {}
+        batch_size = UpstreamQueries.BATCH_MAX_IDS
+        for start in range(0, len(hero_ids), batch_size):
+            batch = hero_ids[start:start + batch_size]
+            started = time.monotonic()
+            try:
+                if self.transport == 'http':
+                    ids = ','.join(str(hero_id) for hero_id in batch)
+                    data = self._fetch_http(f'{self.base_url}{api_path}/?ids={ids}')
+                    per_hero = {int(hero_id): value for hero_id, value in data['heroes'].items()} if data else {}
+                else:
+                    data = self._fetch_inprocess(lambda: query(batch))
+                    per_hero = split_by_hero(data, key_field, batch) if data else {}
+            except Exception as e:
+                logger.error(f"Error prefetching {api_path} for {batch}: {str(e)}")
+                continue
+
+            cache_metrics.fill(self.cache_family(key_prefix), time.monotonic() - started, per_hero, bool(per_hero))
+            self.store.set_many(
+                {f'{key_prefix}{hero_id}': value for hero_id, value in per_hero.items()},
+                self.cache_ttl(key_prefix), self.stale_ttl
+            )
+            fetched.update(per_hero)
+        return fetched
+
     def get_hero_details(self, hero_id: int) -> Optional[Dict]:
         """Get detailed hero information"""
         cache_key = f'mlbb_hero_detail_{hero_id}'
         api_url = f'{self.base_url}hero-detail/{hero_id}/'
         
-        data = self._get_cached_data(cache_key, api_url)
+        data = self._get_cached_data(cache_key, api_url, lambda: UpstreamQueries.hero_detail(hero_id))
         if not data or 'data' not in data or not data['data']['records']:
             return None
             
@@ -119,7 +308,9 @@ class MLBBAPIService:
         cache_key = f'mlbb_hero_rank_{days}_{rank}_{size}'
         api_url = f'{self.base_url}hero-rank/?days={days}&rank={rank}&size={size}&sort_field=win_rate&sort_order=desc'
         
-        data = self._get_cached_data(cache_key, api_url)
+        data = self._get_cached_data(
+            cache_key, api_url, lambda: UpstreamQueries.hero_rank(str(days), rank, size, 1, 'win_rate', 'desc')
+        )
         if not data or 'data' not in data or not data['data']['records']:
             return []
             
@@ -144,7 +335,7 @@ class MLBBAPIService:
         cache_key = f'mlbb_hero_position_{role}_{lane}'
         api_url = f'{self.base_url}hero-position/?role={role}&lane={lane}&size=50'
         
-        data = self._get_cached_data(cache_key, api_url)
+        data = self._get_cached_data(cache_key, api_url, lambda: UpstreamQueries.hero_position(role, lane, 50))
         if not data or 'data' not in data or not data['data']['records']:
             return []
             
@@ -165,6 +356,54 @@ class MLBBAPIService:
                 
         return heroes
     
+    def get_hero_metadata(self) -> Dict[int, Dict]:
+        """Get name, roles, lanes and difficulty of every hero keyed by hero id"""
+        cache_key = 'mlbb_hero_metadata'
+        api_url = f'{self.base_url}hero-position/?role=all&lane=all&size=10000'
+        
+        data = self._get_cached_data(cache_key, api_url, UpstreamQueries.hero_metadata)
+        if not data or 'data' not in data or not data['data']['records']:
+            return {}
+        
+        metadata = {}
+        for record in data['data']['records']:
+            record_data = record.get('data', {})
+            hero = record_data.get('hero', {}).get('data', {})
+            try:
+                hero_id = int(record_data.get('hero_id'))
+            except (TypeError, ValueError):
+                continue
+            
+            roles = [self._tag(tag, 'sort', self.ROLE_NAMES) for tag in hero.get('sortid') or []]
+            lanes = [self._tag(tag, 'road_sort', self.LANE_NAMES) for tag in hero.get('roadsort') or []]
+            try:
+                difficulty = int(hero.get('difficulty'))
+            except (TypeError, ValueError):
+                difficulty = None
+            
+            metadata[hero_id] = {
+                'id': hero_id,
+                'name': hero.get('name'),
+                'role': roles[0][1] if roles else None,
+                'roles': [name for _, name in roles],
+                'lane_ids': [lane_id for lane_id, _ in lanes if lane_id is not None],
+                'lanes': [name for _, name in lanes],
+                'difficulty': difficulty,
+            }
+        
+        return metadata
+    
+    @staticmethod
+    def _tag(tag: Dict, prefix: str, names: Dict[int, str]) -> Tuple[Optional[int], Optional[str]]:
+        """``(id, title)`` of a role (``sort``) or lane (``road_sort``) tag, either part inferred from the other"""
+        tag_data = tag.get('data', {}) if isinstance(tag, dict) else {}
+        title = tag_data.get(f'{prefix}_title')
+        try:
+            tag_id = int(tag_data.get(f'{prefix}_id'))
+        except (TypeError, ValueError):
+            tag_id = next((key for key, name in names.items() if title and title.lower() == name.lower()), None)
+        return tag_id, title or names.get(tag_id)
+    
     def _process_counter_data(self, counter_list: List[Dict]) -> List[Dict]:
         """Process counter/compatibility data"""
         processed = []
@@ -209,10 +448,105 @@ class MLBBAPIService:
 
 class DraftRecommendationService:
     """Service for providing draft recommendations"""
+    RECOMMENDATION_KEY_PREFIX = 'mlbb_draft_recs'
+    # Cached MLBB data recommendations are built from, besides the hero matrices
+    SOURCE_KEYS = ('mlbb_hero_rank_1_all_50', 'mlbb_hero_rank_1_all_30', 'mlbb_hero_metadata', 'mlbb_hero_list_enhanced')
     
     def __init__(self):
         self.api_service = MLBBAPIService()
     
+    def get_recommendations(self, state: DraftState, current_action: str) -> List[Dict]:
+        """Pick or ban recommendations for the side acting in ``current_action``
+        
+        Results are shared through the cache by every draft that reaches the
+        same state, so repeated polls of an unchanged draft cost one lookup.
+        """
+        if 'pick' not in current_action and 'ban' not in current_action:
+            return []
+        action_type = 'pick' if 'pick' in current_action else 'ban'
+        ally_picks, enemy_picks = state.teams(current_action.split('_')[0])
+        # Ban scoring only looks at the acting side's own picks to project threats
+        ally_picks = sorted(ally_picks) if action_type == 'pick' or settings.MLBB_BAN_THREAT_WEIGHT else []
+        enemy_picks, bans = sorted(enemy_picks), sorted(state.all_bans)
+        
+        def compute():
+            if action_type == 'pick':
+                return self.get_pick_recommendations(ally_picks, bans, enemy_picks, 'pick'), True
+            return self.get_ban_recommendations(enemy_picks, bans, ally_picks), True
+        
+        return self._get_cached_recommendations(
+            self._recommendation_key(action_type, ally_picks, enemy_picks, bans), compute,
+            f'{self.RECOMMENDATION_KEY_PREFIX}_{action_type}'
+        )
+    
+    def get_lookahead_recommendations(self, state: DraftState, turn_order: List[str],
+                                      turn_index: int, depth: int) -> Dict:
+        """Rank the current move by searching ``depth`` turns of ``turn_order`` ahead
+        
+        Only fully searched results are cached; a search cut short by the
+        time budget is returned but recomputed on the next request.
+        """
+        remaining = ','.join(turn_order[turn_index:])
+        cache_key = self._recommendation_key(
+            f'lookahead{depth}', list(state.picks['blue']), list(state.picks['red']), state.all_bans
+        ) + '_' + hashlib.sha1(remaining.encode()).hexdigest()[:12]
+        
+        def compute():
+            matrices = hero_matrix_store.get()
+            solver = DraftSolver(matrices, self.api_service.get_hero_rankings(size=50))
+            result = solver.solve(state, turn_order, turn_index, depth)
+            heroes = {hero['id']: hero for hero in self.api_service.get_hero_list()}
+            
+            recommendations = []
+            for move in result['moves']:
+                hero_rec = heroes.get(move['hero_id'], {'id': move['hero_id']}).copy()
+                # No value when not even depth 1 finished; the moves keep their greedy order
+                hero_rec['search_score'] = round(move['value'], 3) if move['value'] is not None else None
+                hero_rec['line'] = [
+                    dict(step, hero_name=HEROES_EN.get(step['hero_id'], f"Hero {step['hero_id']}"))
+                    for step in move['line']
+                ]
+                recommendations.append(hero_rec)
+            
+            search = {key: result[key] for key in ('depth', 'nodes', 'elapsed_ms', 'complete')}
+            return {'recommendations': recommendations, 'search': search}, result['complete']
+        
+        return self._get_cached_recommendations(cache_key, compute, f'{self.RECOMMENDATION_KEY_PREFIX}_lookahead')
+    
+    def _get_cached_recommendations(self, cache_key: str, compute: Callable[[], Tuple[object, bool]], family: str):
+        """Return the cached result for ``cache_key`` or compute it once; ``compute`` returns ``(result, cacheable)``"""
+        cached = tiered_cache.get(cache_key)
+        if cached is not None:
+            cache_metrics.hit(family)
+            return cached
+        cache_metrics.miss(family)
+        
+        def fill():
+            started = time.monotonic()
+            result, cacheable = compute()
+            cache_metrics.fill(family, time.monotonic() - started, result, cacheable)
+            if cacheable:
+                tiered_cache.set(cache_key, result, settings.MLBB_RECOMMENDATION_CACHE_TTL)
+            return result
+        
+        return single_flight.do(cache_key, fill, recheck=lambda: tiered_cache.get(cache_key))
+    
+    def _recommendation_key(self, action_type: str, ally_picks: List[int],
+                            enemy_picks: List[int], bans: List[int]) -> str:
+        """Canonical cache key for a draft state and the data it is scored against"""
+        masks = '_'.join(HeroMask.to_hex(HeroMask.from_ids(ids)) for ids in (ally_picks, enemy_picks, bans))
+        return f'{self.RECOMMENDATION_KEY_PREFIX}_{action_type}_{self.data_version()}_{masks}'
+    
+    def data_version(self) -> str:
+        """Version of the hero matrices and cached MLBB data recommendations are built from
+        
+        The data part changes whenever one of ``SOURCE_KEYS`` is refetched, as
+        every write stores a new ``fresh_until``.
+        """
+        entries = self.api_service.store.get_entries(self.SOURCE_KEYS)
+        stamps = ','.join(str(entries[key]['fresh_until']) if key in entries else '-' for key in self.SOURCE_KEYS)
+        return f'{hero_matrix_store.get().version}{hashlib.sha1(stamps.encode()).hexdigest()[:8]}'
+    
     def get_pick_recommendations(self, 
                                current_picks: List[int], 
                                current_bans: List[int], 
@@ -221,45 +555,57 @@ class DraftRecommendationService:
         """Get hero recommendations for current draft state"""
         
         all_heroes = self.api_service.get_hero_list()
-        available_heroes = [h for h in all_heroes 
-                          if h['id'] not in current_picks + current_bans + enemy_picks]
+        taken = HeroMask.from_ids(current_picks + current_bans + enemy_picks)
+        available_heroes = [h for h in all_heroes if not HeroMask.contains(taken, h['id'])]
+        
+        matrices = hero_matrix_store.get()
+        engine = DraftScoringEngine(matrices, self.api_service.get_hero_rankings(size=50))
+        hero_ids = [h['id'] for h in available_heroes]
+        scores = engine.score(current_picks, enemy_picks, hero_ids)
+        
+        # Bias toward heroes that fill lanes the team has not covered yet
+        lane_gains = LaneAssigner(hero_metadata_table.get()).candidate_gains(current_picks, hero_ids)
+        lane_bias = settings.MLBB_LANE_BIAS_WEIGHT
+        if lane_bias:
+            scores = [min(100, score + gain * lane_bias) for score, (gain, _) in zip(scores, lane_gains)]
+        
+        # Top 10 by draft score (highest first); ties keep hero list order
+        top_picks = heapq.nlargest(10, zip(available_heroes, scores, lane_gains), key=lambda item: item[1])
         
         recommendations = []
         
-        for hero in available_heroes:
-            score = self._calculate_draft_score(
-                hero['id'], 
-                current_picks, 
-                enemy_picks, 
-                phase
-            )
-            
+        for hero, score, lane_gain in top_picks:
             hero_rec = hero.copy()
             hero_rec['draft_score'] = score
+            hero_rec['suggested_position'] = lane_gain[1]
             hero_rec['recommendation_reason'] = self._get_recommendation_reason(
-                hero['id'], current_picks, enemy_picks, score
+                hero['id'], current_picks, enemy_picks, score, matrices, lane_gain
             )
             
             recommendations.append(hero_rec)
         
-        # Sort by draft score (highest first)
-        recommendations.sort(key=lambda x: x['draft_score'], reverse=True)
-        
-        return recommendations[:10]  # Top 10 recommendations
+        return recommendations
     
     def get_ban_recommendations(self, 
                               enemy_picks: List[int], 
-                              current_bans: List[int]) -> List[Dict]:
+                              current_bans: List[int],
+                              ally_picks: Optional[List[int]] = None) -> List[Dict]:
         """Get ban recommendations based on enemy team and meta"""
         
         # Get high priority heroes from current meta
         top_heroes = self.api_service.get_hero_rankings(size=30)
-        available_bans = [h for h in top_heroes 
-                         if h['id'] not in current_bans + enemy_picks]
+        taken = HeroMask.from_ids(current_bans + enemy_picks)
+        available_bans = [h for h in top_heroes if not HeroMask.contains(taken, h['id'])]
+        
+        # Both terms depend only on the draft state, so build them once per request
+        matrices = hero_matrix_store.get()
+        enemy_synergy = self._enemy_synergy_index(matrices, enemy_picks)
+        threats = self._enemy_pick_threats(matrices, enemy_picks, ally_picks or [],
+                                           [h['id'] for h in available_bans])
         
         recommendations = []
         
-        for hero in available_bans:
+        for hero, threat in zip(available_bans, threats):
             # Ban score based on pick rate, win rate, and synergy with enemy
             ban_score = (
                 hero['pick_rate'] * 0.4 +  # High pick rate = worth banning
@@ -268,21 +614,41 @@ class DraftRecommendationService:
             )
             
             # Boost score if hero synergizes with enemy team
-            for enemy_id in enemy_picks:
-                compatibility = self.api_service.get_hero_compatibility(enemy_id)
-                for synergy in compatibility['synergizes_with']:
-                    if synergy['hero_id'] == hero['id']:
-                        ban_score += synergy['win_rate_change'] * 2
+            if 0 <= hero['id'] < len(enemy_synergy):
+                ban_score += enemy_synergy[hero['id']] * 2
+            
+            # Boost score if the enemy team would likely pick this hero next
+            ban_score += threat
             
             hero_rec = hero.copy()
             hero_rec['ban_score'] = ban_score
-            hero_rec['ban_reason'] = self._get_ban_reason(hero, enemy_picks)
+            hero_rec['ban_reason'] = self._get_ban_reason(hero, enemy_picks, threat)
             
             recommendations.append(hero_rec)
         
         recommendations.sort(key=lambda x: x['ban_score'], reverse=True)
         return recommendations[:8]  # Top 8 ban recommendations
     
+    def _enemy_synergy_index(self, matrices: HeroMatrices, enemy_picks: List[int]) -> List[float]:
+        """Total synergy every hero id has with the enemy picks"""
+        index = [0.0] * matrices.size
+        for enemy_id in enemy_picks:
+            if matrices.contains(enemy_id):
+                index = list(map(add, index, matrices.row('synergy', enemy_id)))
+        return index
+    
+    def _enemy_pick_threats(self, matrices: HeroMatrices, enemy_picks: List[int],
+                            ally_picks: List[int], hero_ids: List[int]) -> List[float]:
+        """Projected value of each hero as the enemy's next pick, weighted by
+        ``MLBB_BAN_THREAT_WEIGHT`` (all zero when the weight is 0)"""
+        weight = settings.MLBB_BAN_THREAT_WEIGHT
+        if not weight or not hero_ids:
+            return [0.0] * len(hero_ids)
+        engine = DraftScoringEngine(matrices, self.api_service.get_hero_rankings(size=50))
+        # Score candidates as the enemy sees them: their picks are the allies
+        scores = engine.score(enemy_picks, ally_picks, hero_ids)
+        return [max(score - DraftScoringEngine.BASE_SCORE, 0) * weight for score in scores]
+    
     def analyze_team_composition(self, team_picks: List[int]) -> Dict:
         """Analyze team composition and provide insights"""
         if not team_picks:
@@ -290,22 +656,19 @@ class DraftRecommendationService:
         
         roles = {'Tank': 0, 'Fighter': 0, 'Assassin': 0, 'Mage': 0, 'Marksman': 0, 'Support': 0}
         team_synergy = 0
+        metadata = hero_metadata_table.get()
+        matrices = hero_matrix_store.get()
         
         # Analyze role distribution
         for hero_id in team_picks:
-            hero_details = self.api_service.get_hero_details(hero_id)
-            if hero_details and hero_details['role']:
-                role = hero_details['role']
-                if role in roles:
-                    roles[role] += 1
+            role = metadata.get(hero_id, {}).get('role')
+            if role in roles:
+                roles[role] += 1
         
         # Calculate team synergy (simplified)
         for i, hero1_id in enumerate(team_picks):
             for hero2_id in team_picks[i+1:]:
-                compatibility = self.api_service.get_hero_compatibility(hero1_id)
-                for synergy in compatibility['synergizes_with']:
-                    if synergy['hero_id'] == hero2_id:
-                        team_synergy += synergy['win_rate_change']
+                team_synergy += matrices.lookup('synergy', hero1_id, hero2_id)
         
         # Determine strengths and weaknesses
         strengths = []
@@ -327,6 +690,7 @@ class DraftRecommendationService:
         return {
             'roles': roles,
             'synergy': team_synergy,
+            'lane_assignment': LaneAssigner(metadata).assign(team_picks),
             'strengths': strengths,
             'weaknesses': weaknesses,
             'overall_rating': self._calculate_team_rating(roles, team_synergy)
@@ -335,44 +699,16 @@ class DraftRecommendationService:
     def _calculate_draft_score(self, hero_id: int, ally_picks: List[int], 
                              enemy_picks: List[int], phase: str) -> float:
         """Calculate overall draft score for a hero"""
-        score = 50.0  # Base score
-        
-        # Get hero rankings for base meta score
-        rankings = self.api_service.get_hero_rankings(size=50)
-        hero_rank = next((h for h in rankings if h['id'] == hero_id), None)
-        
-        if hero_rank:
-            # Base meta strength (0-25 points)
-            score += (hero_rank['win_rate'] - 50) * 0.5
-            score += min(hero_rank['pick_rate'] * 0.1, 5)
-        
-        # Synergy with allies (0-15 points)
-        for ally_id in ally_picks:
-            compatibility = self.api_service.get_hero_compatibility(ally_id)
-            for synergy in compatibility['synergizes_with']:
-                if synergy['hero_id'] == hero_id:
-                    score += min(synergy['win_rate_change'] * 0.5, 3)
-        
-        # Counter potential against enemies (0-20 points)
-        for enemy_id in enemy_picks:
-            counters = self.api_service.get_hero_counters(hero_id)
-            for counter in counters['strong_against']:
-                if counter['hero_id'] == enemy_id:
-                    score += min(counter['win_rate_change'] * 0.3, 5)
-        
-        # Penalty if easily countered by enemies (-10 to 0 points)
-        for enemy_id in enemy_picks:
-            enemy_counters = self.api_service.get_hero_counters(enemy_id)
-            for counter in enemy_counters['strong_against']:
-                if counter['hero_id'] == hero_id:
-                    score -= min(abs(counter['win_rate_change']) * 0.2, 3)
-        
-        return max(0, min(100, score))  # Clamp between 0-100
+        engine = DraftScoringEngine(hero_matrix_store.get(), self.api_service.get_hero_rankings(size=50))
+        return engine.score(ally_picks, enemy_picks, [hero_id])[0]
     
     def _get_recommendation_reason(self, hero_id: int, ally_picks: List[int], 
-                                 enemy_picks: List[int], score: float) -> str:
+                                 enemy_picks: List[int], score: float,
+                                 matrices: Optional[HeroMatrices] = None,
+                                 lane_gain: Optional[Tuple[float, Optional[int]]] = None) -> str:
         """Generate human-readable recommendation reason"""
         reasons = []
+        matrices = matrices or hero_matrix_store.get()
         
         if score >= 80:
             reasons.append("Excellent meta pick")
@@ -383,25 +719,24 @@ class DraftRecommendationService:
         
         # Check for specific synergies or counters
         for ally_id in ally_picks:
-            compatibility = self.api_service.get_hero_compatibility(ally_id)
-            for synergy in compatibility['synergizes_with']:
-                if synergy['hero_id'] == hero_id and synergy['win_rate_change'] > 3:
-                    reasons.append(f"Great synergy with {synergy['hero_name']}")
-                    break
+            if matrices.lookup('synergy', ally_id, hero_id) > 3:
+                reasons.append(f"Great synergy with {HEROES_EN.get(hero_id, f'Hero {hero_id}')}")
         
         for enemy_id in enemy_picks:
-            counters = self.api_service.get_hero_counters(hero_id)
-            for counter in counters['strong_against']:
-                if counter['hero_id'] == enemy_id and counter['win_rate_change'] > 3:
-                    reasons.append(f"Counters {counter['hero_name']}")
-                    break
+            if matrices.lookup('counter', hero_id, enemy_id) > 3:
+                reasons.append(f"Counters {HEROES_EN.get(enemy_id, f'Hero {enemy_id}')}")
+        
+        if lane_gain and lane_gain[1] is not None and lane_gain[0] >= LaneAssigner.SECONDARY_FIT:
+            reasons.append(f"Fills {POSITION_NAMES[lane_gain[1]]}")
         
         return " | ".join(reasons) if reasons else "Standard pick"
     
-    def _get_ban_reason(self, hero: Dict, enemy_picks: List[int]) -> str:
+    def _get_ban_reason(self, hero: Dict, enemy_picks: List[int], threat: float = 0.0) -> str:
         """Generate ban recommendation reason"""
         reasons = []
         
+        if threat > 5:
+            reasons.append("Likely enemy pick")
         if hero['ban_rate'] > 20:
             reasons.append("Commonly banned")
         if hero['win_rate'] > 55:
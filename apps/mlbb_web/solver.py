@@ -0,0 +1,325 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from operator import add
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .draft_state import ALL_HEROES_MASK, DraftState, HeroMask
+from .matrices import HeroMatrices
+
+INF = float('inf')
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+
+class DraftSolver:
+    """Alpha-beta search over the remaining turns of a draft.
+
+    The solver builds its own hero-pair tables from ``HeroMatrices``, once
+    per matrix version, using the same terms as ``DraftScoringEngine``:
+
+    * ``pair[a][b]`` is the synergy two heroes on the same team give each
+      other.
+    * ``duel[a][b]`` is what hero ``a`` gains facing ``b`` (how hard ``a``
+      counters ``b``, minus how hard ``b`` counters ``a``).
+
+    A leaf is scored as blue's team value minus red's. The team value is the
+    meta score of each pick, plus pair synergy inside the team, plus duel
+    value against the other team. Blue maximizes the score and red minimizes
+    it. Turns need not alternate, so the search is plain minimax rather than
+    negamax.
+
+    Each side keeps a gain vector: what every hero would add if that side
+    picked it next. Applying a pick adds one table row to each vector, so
+    updates are incremental. Each ply only tries the ``top_k`` heroes by
+    gain; for bans, that is the heroes the opponent gains most from. Visited
+    states go into a transposition table keyed on turn index and masks.
+    Depths are searched iteratively until ``time_budget`` runs out, and the
+    last fully searched depth is returned. With ``workers`` above 1, root
+    moves are searched in a process pool.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    _pool = None
+    _pool_lock = threading.Lock()
+    # Matrix version and pair tables of the last matrices seen; rows are shared and never modified
+    _tables: Tuple[Optional[str], Optional[Tuple[List[List[float]], List[List[float]]]]] = (None, None)
+    _tables_lock = threading.Lock()
+
+    def __init__(self, matrices: HeroMatrices, rankings: List[Dict], top_k: Optional[int] = None,
+                 time_budget: Optional[float] = None, workers: Optional[int] = None):
+        started = time.monotonic()
+        self.top_k = top_k if top_k is not None else settings.MLBB_SOLVER_TOP_K
+        self.time_budget = time_budget if time_budget is not None else settings.MLBB_SOLVER_TIME_BUDGET
+        self.workers = workers if workers is not None else settings.MLBB_SOLVER_WORKERS
+        self.size = size = matrices.size
+        self.universe = [hero_id for hero_id in HeroMask.ids(ALL_HEROES_MASK) if hero_id < size]
+
+        self.meta = [0.0] * size
+        seen = set()
+        for hero in rankings:
+            hero_id = hero['id']
+            if 0 <= hero_id < size and hero_id not in seen:
+                seen.add(hero_id)
+                self.meta[hero_id] = (hero['win_rate'] - 50) * 0.5 + min(hero['pick_rate'] * 0.1, 5)
+        self.pair_rows, self.against_rows = self.pair_tables(matrices)
+
+        self.table: Dict[Tuple[int, int, int, int], Tuple[int, float, int, Optional[int]]] = {}
+        self.turn_order: List[str] = []
+        self.deadline = INF
+        self.nodes = 0
+        # Spent before solve() starts its clock; it still counts against the budget
+        self.setup_seconds = time.monotonic() - started
+
+    @classmethod
+    def pair_tables(cls, matrices: HeroMatrices) -> Tuple[List[List[float]], List[List[float]]]:
+        """``pair_rows`` and ``against_rows`` of ``matrices``, built once per matrix version."""
+        version, tables = cls._tables
+        if version != matrices.version:
+            with cls._tables_lock:
+                version, tables = cls._tables
+                if version != matrices.version:
+                    tables = cls._build_pair_tables(matrices)
+                    cls._tables = (matrices.version, tables)
+        return tables
+
+    @staticmethod
+    def _build_pair_tables(matrices: HeroMatrices) -> Tuple[List[List[float]], List[List[float]]]:
+        size = matrices.size
+        synergy = [min(value * 0.5, 3) for value in matrices.synergy]
+        counter = [min(value * 0.3, 5) for value in matrices.counter]
+        countered = [min(abs(value) * 0.2, 3) for value in matrices.counter]
+        # versus[a][b]: what ``a`` scores against ``b`` in DraftScoringEngine
+        versus = [counter[i] - countered[(i % size) * size + i // size] for i in range(size * size)]
+        pair_rows = [
+            [synergy[a * size + b] + synergy[b * size + a] for b in range(size)] for a in range(size)
+        ]
+        # duel[a][b] = versus[a][b] - versus[b][a]; rows store -duel[a][.] which is
+        # what the other side's gains change by once ``a`` is picked
+        against_rows = [
+            [versus[b * size + a] - versus[a * size + b] for b in range(size)] for a in range(size)
+        ]
+        return pair_rows, against_rows
+
+    def __getstate__(self):
+        # Worker processes start from an empty transposition table
+        state = self.__dict__.copy()
+        state['table'] = {}
+        return state
+
+    @classmethod
+    def pool(cls, workers: int) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ProcessPoolExecutor(max_workers=workers)
+        return cls._pool
+
+    # State handling
+
+    def initial_node(self, state: DraftState) -> Tuple[int, int, int, Tuple[List[float], List[float]], float]:
+        """Replay the picks of ``state`` into ``(blue, red, banned, gains, score)``."""
+        gains = (list(self.meta), list(self.meta))
+        blue = red = 0
+        score = 0.0
+        for side, picks in state.picks.items():
+            for hero_id in picks:
+                if 0 <= hero_id < self.size:
+                    blue, red, gains, score = self._pick(side, hero_id, blue, red, gains, score)
+        blue, red = state.pick_masks['blue'], state.pick_masks['red']
+        return blue, red, state.banned_mask, gains, score
+
+    def _pick(self, side: str, hero_id: int, blue: int, red: int,
+              gains: Tuple[List[float], List[float]], score: float):
+        blue_gain, red_gain = gains
+        if side == 'blue':
+            score += blue_gain[hero_id]
+            blue |= 1 << hero_id
+            gains = (list(map(add, blue_gain, self.pair_rows[hero_id])),
+                     list(map(add, red_gain, self.against_rows[hero_id])))
+        else:
+            score -= red_gain[hero_id]
+            red |= 1 << hero_id
+            gains = (list(map(add, blue_gain, self.against_rows[hero_id])),
+                     list(map(add, red_gain, self.pair_rows[hero_id])))
+        return blue, red, gains, score
+
+    def _apply(self, turn: str, hero_id: int, blue: int, red: int, banned: int,
+               gains: Tuple[List[float], List[float]], score: float):
+        side, action = turn.split('_')
+        if action == 'ban':
+            return blue, red, banned | 1 << hero_id, gains, score
+        blue, red, gains, score = self._pick(side, hero_id, blue, red, gains, score)
+        return blue, red, banned, gains, score
+
+    def _moves(self, turn: str, taken: int, gains: Tuple[List[float], List[float]],
+               first: Optional[int] = None) -> List[int]:
+        side, action = turn.split('_')
+        blue_gain, red_gain = gains
+        if action == 'ban':
+            # Deny the heroes the other side would gain most from
+            gain = red_gain if side == 'blue' else blue_gain
+        else:
+            gain = blue_gain if side == 'blue' else red_gain
+        available = [hero_id for hero_id in self.universe if not taken >> hero_id & 1]
+        moves = heapq.nlargest(self.top_k, available, key=gain.__getitem__)
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    # Search
+
+    def _search(self, index: int, depth: int, blue: int, red: int, banned: int,
+                gains: Tuple[List[float], List[float]], score: float, alpha: float, beta: float) -> float:
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.monotonic() > self.deadline:
+            raise SearchTimeout()
+        if depth == 0 or index >= len(self.turn_order):
+            return score
+
+        key = (index, blue, red, banned)
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, value, flag, first = entry
+            if entry_depth >= depth:
+                if flag == self.EXACT:
+                    return value
+                if flag == self.LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        turn = self.turn_order[index]
+        moves = self._moves(turn, blue | red | banned, gains, first)
+        if not moves:
+            return score
+
+        maximizing = turn.startswith('blue')
+        original_alpha, original_beta = alpha, beta
+        best, best_move = (-INF if maximizing else INF), None
+        for hero_id in moves:
+            child = self._apply(turn, hero_id, blue, red, banned, gains, score)
+            value = self._search(index + 1, depth - 1, *child, alpha, beta)
+            if maximizing:
+                if value > best:
+                    best, best_move = value, hero_id
+                alpha = max(alpha, value)
+            else:
+                if value < best:
+                    best, best_move = value, hero_id
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = self.UPPER
+        elif best >= original_beta:
+            flag = self.LOWER
+        else:
+            flag = self.EXACT
+        self.table[key] = (depth, best, flag, best_move)
+        return best
+
+    def _principal_variation(self, index: int, blue: int, red: int, banned: int,
+                             gains: Tuple[List[float], List[float]], score: float) -> List[Dict]:
+        line = []
+        while index < len(self.turn_order):
+            entry = self.table.get((index, blue, red, banned))
+            if entry is None or entry[3] is None:
+                break
+            turn, hero_id = self.turn_order[index], entry[3]
+            line.append({'turn': turn, 'hero_id': hero_id})
+            blue, red, banned, gains, score = self._apply(turn, hero_id, blue, red, banned, gains, score)
+            index += 1
+        return line
+
+    def search_root_move(self, index: int, depth: int, node, hero_id: int) -> Tuple[float, List[Dict]]:
+        """Exact value of playing ``hero_id`` at ``index``, searched ``depth`` plies deep."""
+        turn = self.turn_order[index]
+        child = self._apply(turn, hero_id, *node)
+        value = self._search(index + 1, depth - 1, *child, -INF, INF)
+        return value, [{'turn': turn, 'hero_id': hero_id}] + self._principal_variation(index + 1, *child)
+
+    def solve(self, state: DraftState, turn_order: List[str], turn_index: int,
+              depth: int, limit: int = 10) -> Dict:
+        """Rank the moves for ``turn_order[turn_index]`` by searching ``depth`` plies ahead.
+
+        Returns ``{'moves': [{'hero_id', 'value', 'line'}], 'depth', 'nodes',
+        'elapsed_ms', 'complete'}``. ``value`` is from the moving side's point
+        of view (higher is better) and ``depth`` is the deepest fully searched
+        ply count.
+        """
+        started = time.monotonic()
+        self.turn_order = list(turn_order)
+        self.deadline = started + self.time_budget - self.setup_seconds
+        self.nodes = 0
+        if turn_index >= len(self.turn_order):
+            return {'moves': [], 'depth': 0, 'nodes': 0, 'elapsed_ms': 0.0, 'complete': True}
+
+        node = self.initial_node(state)
+        blue, red, banned, gains, score = node
+        turn = self.turn_order[turn_index]
+        sign = 1 if turn.startswith('blue') else -1
+        root_moves = self._moves(turn, blue | red | banned, gains)
+        depth = max(1, min(depth, len(self.turn_order) - turn_index))
+
+        # Greedy order by immediate gain until a depth completes
+        results = [{'hero_id': hero_id, 'value': None, 'line': [{'turn': turn, 'hero_id': hero_id}]}
+                   for hero_id in root_moves]
+        completed = 0
+        for current in range(1, depth + 1):
+            try:
+                searched = self._search_root(turn_index, current, node, root_moves)
+            except SearchTimeout:
+                break
+            results = [{'hero_id': hero_id, 'value': value * sign, 'line': line}
+                       for hero_id, (value, line) in zip(root_moves, searched)]
+            results.sort(key=lambda move: move['value'], reverse=True)
+            root_moves = [move['hero_id'] for move in results]
+            completed = current
+
+        return {
+            'moves': results[:limit],
+            'depth': completed,
+            'nodes': self.nodes,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+            'complete': completed == depth,
+        }
+
+    def _search_root(self, index: int, depth: int, node, root_moves: List[int]) -> List[Tuple[float, List[Dict]]]:
+        if self.workers > 1 and len(root_moves) > 1:
+            pool = self.pool(self.workers)
+            futures = [pool.submit(_search_root_move, self, index, depth, node, hero_id)
+                       for hero_id in root_moves]
+            results = []
+            for future in futures:
+                try:
+                    value, line, nodes = future.result(timeout=max(self.deadline - time.monotonic(), 0) + 1)
+                except FutureTimeoutError:
+                    raise SearchTimeout()
+                if value is None:
+                    raise SearchTimeout()
+                self.nodes += nodes
+                results.append((value, line))
+            return results
+        return [self.search_root_move(index, depth, node, hero_id) for hero_id in root_moves]
+
+
+def _search_root_move(solver: DraftSolver, index: int, depth: int, node, hero_id: int):
+    """Process-pool entry point; reports a timeout as a ``None`` value."""
+    solver.nodes = 0
+    try:
+        value, line = solver.search_root_move(index, depth, node, hero_id)
+    except SearchTimeout:
+        return None, [], solver.nodes
+    return value, line, solver.nodes
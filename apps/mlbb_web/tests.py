@@ -1,3 +1,1298 @@
-from django.test import TestCase
+import json
+import os
+import random
+from itertools import permutations
+import tempfile
+import threading
+import time
+from array import array
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+
+from apps.mlbb_api.bundle import HeroBundleFetcher
+from apps.mlbb_api.cache import (LocalLRUCache, StaleWhileRevalidateCache, TieredCache, UpstreamResponseCache,
+                                 tiered_cache, upstream_cache)
+from apps.mlbb_api.client import UpstreamClient, UpstreamResponse
+from apps.mlbb_api.endpoints import UpstreamEndpoint, UpstreamEndpointRegistry, split_by_hero
+from apps.mlbb_api.metrics import CacheMetrics
+from apps.mlbb_api.singleflight import SingleFlight
+from apps.mlbb_api.snapshot import CacheSnapshot
+from apps.mlbb_api.views import HEROES_EN
+
+from .events import CacheEventBackend, DraftEvent
+from .draft_state import ALL_HEROES_MASK, DraftState, HeroMask
+from .matrices import HeroMatrices, HeroMatrixBuilder, HeroMatrixStore
+from .lanes import LANE_POSITIONS, LaneAssigner, hungarian
+from .metadata import HeroMetadataTable
+from .precompute import RecommendationPrecomputer
+from .scoring import DraftScoringEngine
+from .services import DraftRecommendationService, MLBBAPIService
+from .solver import DraftSolver, SearchTimeout
+from .models import DraftSession, HeroBan, HeroPick, Team
+from .views import MLBBWebService
+
+TURN_ORDER = [
+    'blue_ban', 'red_ban', 'blue_ban', 'red_ban',
+    'blue_pick', 'red_pick',
+    'blue_ban', 'red_ban',
+    'red_pick', 'blue_pick',
+    'red_pick', 'blue_pick', 'blue_pick', 'red_pick'
+]
+
+
+def create_draft() -> DraftSession:
+    draft = DraftSession.objects.create(name='Stress', turn_order=TURN_ORDER)
+    Team.objects.create(draft_session=draft, side='blue', name='Blue Team')
+    Team.objects.create(draft_session=draft, side='red', name='Red Team')
+    return draft
+
+
+@override_settings(MLBB_PRECOMPUTE_TOP_K=0)
+class DraftActionConcurrencyTests(TransactionTestCase):
+    """Parallel draft_action requests must never corrupt the draft"""
+    THREADS = 16
+
+    def fire(self, draft, bodies):
+        """POST every body to draft_action at the same moment; return the status codes"""
+        barrier = threading.Barrier(len(bodies))
+        statuses = []
+        lock = threading.Lock()
+
+        def act(body):
+            try:
+                barrier.wait()
+                response = Client().post(
+                    f'/draft/{draft.id}/action/', json.dumps(body), content_type='application/json'
+                )
+                with lock:
+                    statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=act, args=(body,)) for body in bodies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return Counter(statuses)
+
+    def assert_consistent(self, draft):
+        draft.refresh_from_db()
+        picks = list(HeroPick.objects.filter(team__draft_session=draft).values_list('team__side', 'pick_order', 'hero_id'))
+        bans = list(HeroBan.objects.filter(team__draft_session=draft).values_list('team__side', 'ban_order', 'hero_id'))
+
+        self.assertEqual(draft.current_turn_index, len(picks) + len(bans))
+        self.assertEqual(draft.version, draft.current_turn_index)
+        hero_ids = [hero_id for _, _, hero_id in picks + bans]
+        self.assertEqual(len(hero_ids), len(set(hero_ids)))
+        for rows in (picks, bans):
+            for side in ('blue', 'red'):
+                orders = sorted(order for row_side, order, _ in rows if row_side == side)
+                self.assertEqual(orders, list(range(1, len(orders) + 1)))
+
+    def test_same_version_has_one_winner(self):
+        draft = create_draft()
+        bodies = [{'action': 'ban', 'hero_id': hero_id, 'version': 0} for hero_id in range(1, self.THREADS + 1)]
+
+        statuses = self.fire(draft, bodies)
+
+        self.assertEqual(statuses[200], 1)
+        self.assertEqual(statuses[409], self.THREADS - 1)
+        self.assert_consistent(draft)
+
+    def test_unversioned_actions_stay_consistent(self):
+        draft = create_draft()
+        bodies = [{'action': 'ban', 'hero_id': hero_id} for hero_id in range(1, self.THREADS + 1)]
+
+        statuses = self.fire(draft, bodies)
+
+        self.assertGreaterEqual(statuses[200], 1)
+        self.assertEqual(statuses[200] + statuses[409] + statuses[400], self.THREADS)
+        self.assert_consistent(draft)
+        self.assertEqual(draft.current_turn_index, statuses[200])
+
+    def test_duplicate_hero_is_rejected(self):
+        draft = create_draft()
+        bodies = [{'action': 'ban', 'hero_id': 1}] * self.THREADS
+
+        statuses = self.fire(draft, bodies)
+
+        self.assertEqual(statuses[200], 1)
+        self.assert_consistent(draft)
+        self.assertEqual(HeroBan.objects.filter(team__draft_session=draft, hero_id=1).count(), 1)
+
+    def test_malformed_action_is_rejected(self):
+        draft = create_draft()
+        for body in ({'action': 'ban'}, {'action': 'ban', 'hero_id': 'x'}, {'action': 'ban', 'hero_id': -1},
+                     {'action': 'ban', 'hero_id': 10 ** 6}, {'action': 'ban', 'hero_id': 1, 'version': 'x'}):
+            response = Client().post(f'/draft/{draft.id}/action/', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assert_consistent(draft)
+        self.assertEqual(draft.current_turn_index, 0)
+
+
+def play(draft, actions):
+    """Store ``actions`` (hero ids, one per turn) straight into ``draft``"""
+    counts = Counter()
+    for turn, hero_id in zip(draft.turn_order, actions):
+        team = draft.teams.get(side=turn.split('_')[0])
+        counts[turn] += 1
+        if turn.endswith('pick'):
+            HeroPick.objects.create(team=team, hero_id=hero_id, hero_name=f'Hero {hero_id}', pick_order=counts[turn])
+        else:
+            HeroBan.objects.create(team=team, hero_id=hero_id, hero_name=f'Hero {hero_id}', ban_order=counts[turn])
+    draft.current_turn_index = draft.version = len(actions)
+    draft.save()
+
+
+@override_settings(MLBB_PRECOMPUTE_TOP_K=0)
+class DraftReadTestCase(TestCase):
+    """An empty and a half-played draft, with upstream calls patched out"""
+
+    def setUp(self):
+        # No upstream in tests: every hero data lookup comes back empty
+        for name in ('post', 'fetch'):
+            patcher = mock.patch.object(upstream_cache, name, return_value=UpstreamResponse(503))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.empty = create_draft()
+        self.played = create_draft()
+        play(self.played, range(1, 12))
+
+
+class DraftQueryBudgetTests(DraftReadTestCase):
+    """Draft read paths run a fixed number of queries, however far the draft is"""
+
+    def assert_budget(self, queries, method, path, drafts=None, **kwargs):
+        for draft in drafts or (self.empty, self.played):
+            with self.assertNumQueries(queries):
+                response = getattr(self.client, method)(path.format(id=draft.id), **kwargs)
+            self.assertEqual(response.status_code, 200)
+
+    def test_draft_data(self):
+        self.assert_budget(4, 'get', '/draft/{id}/data/')
+
+    def test_draft_data_content(self):
+        data = self.client.get(f'/draft/{self.played.id}/data/').json()
+
+        self.assertEqual(data['draft']['current_action'], 'blue_pick')
+        self.assertEqual([pick['hero_id'] for pick in data['blue_team']['picks']], [5, 10])
+        self.assertEqual([ban['hero_id'] for ban in data['red_team']['bans']], [2, 4, 8])
+
+    def test_draft_session(self):
+        self.assert_budget(4, 'get', '/draft/{id}/')
+
+    def test_save_template(self):
+        self.assert_budget(5, 'post', '/draft/{id}/save-template/', data={'name': 'Template'})
+
+    def test_get_recommendations(self):
+        self.assert_budget(2, 'get', '/draft/{id}/recommendations/')
+
+    def test_draft_analytics(self):
+        # analytics.html reads per-role counts, which an empty team does not have
+        self.assert_budget(4, 'get', '/draft/{id}/analytics/', drafts=[self.played])
+
+
+class DraftAnalyticsTests(DraftReadTestCase):
+    """Analytics lists the picks from the hero metadata table, without a detail call per hero"""
+
+    def test_picks_come_from_metadata(self):
+        metadata = {hero_id: {'id': hero_id, 'name': f'Name {hero_id}', 'role': 'Mage', 'difficulty': 3}
+                    for hero_id in range(1, 12)}
+        with mock.patch('apps.mlbb_web.views.hero_metadata_table.get', return_value=metadata), \
+                mock.patch.object(MLBBAPIService, 'get_hero_details') as get_hero_details:
+            response = self.client.get(f'/draft/{self.played.id}/analytics/')
+
+        self.assertEqual(response.status_code, 200)
+        get_hero_details.assert_not_called()
+        self.assertEqual([hero['name'] for hero in response.context['blue_heroes']], ['Name 5', 'Name 10'])
+        self.assertContains(response, 'Name 11')
+
+
+class RecommendationCacheKeyTests(DraftReadTestCase):
+    """Cached recommendations are keyed by the rankings and metadata they were scored against"""
+
+    def test_refetched_rankings_change_the_key(self):
+        service = DraftRecommendationService()
+        key = service._recommendation_key('pick', [1], [2], [3])
+        self.assertEqual(service._recommendation_key('pick', [1], [2], [3]), key)
+
+        service.api_service.store.set('mlbb_hero_rank_1_all_50', {'data': {'records': []}}, 60, 60)
+        self.assertNotEqual(service._recommendation_key('pick', [1], [2], [3]), key)
+
+    def test_equal_states_share_one_computation(self):
+        cache.clear()
+        tiered_cache.local.clear()
+        service = DraftRecommendationService()
+        recommendations = [{'id': 7, 'draft_score': 61.5}]
+        with mock.patch.object(DraftRecommendationService, 'get_pick_recommendations',
+                               return_value=recommendations) as compute:
+            first = service.get_recommendations(DraftState([5, 10], [6], [1, 3], [2]), 'blue_pick')
+            # Same picks and bans reached in another order, from another draft and service
+            second = DraftRecommendationService().get_recommendations(DraftState([10, 5], [6], [3], [2, 1]), 'blue_pick')
+            # The other side to move is a different state
+            DraftRecommendationService().get_recommendations(DraftState([5, 10], [6], [1, 3], [2]), 'red_pick')
+
+        self.assertEqual(first, recommendations)
+        self.assertEqual(second, recommendations)
+        self.assertEqual(compute.call_count, 2)
+
+
+class DraftConditionalPollingTests(DraftReadTestCase):
+    """Polls of an unchanged draft are answered with a 304 after one lookup"""
+
+    def test_draft_data_not_modified(self):
+        path = f'/draft/{self.played.id}/data/'
+        etag = self.client.get(path)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_draft_data_etag_changes_with_action(self):
+        path = f'/draft/{self.empty.id}/data/'
+        etag = self.client.get(path)['ETag']
+        self.client.post(f'/draft/{self.empty.id}/action/', json.dumps({'action': 'ban', 'hero_id': 1}),
+                         content_type='application/json')
+
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_draft_data_since(self):
+        data = self.client.get(f'/draft/{self.played.id}/data/?since=8').json()
+
+        self.assertEqual(data['since'], 8)
+        self.assertEqual(
+            [(action['turn_index'], action['team'], action['action'], action['hero_id']) for action in data['actions']],
+            [(8, 'red', 'pick', 9), (9, 'blue', 'pick', 10), (10, 'red', 'pick', 11)]
+        )
+        self.assertEqual(data['draft']['current_turn_index'], 11)
+
+    def test_draft_data_since_out_of_range(self):
+        for since in ('12', '-1', 'x'):
+            response = self.client.get(f'/draft/{self.played.id}/data/?since={since}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_recommendations_not_modified(self):
+        path = f'/draft/{self.played.id}/recommendations/'
+        etag = self.client.get(path)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_recommendations_change_with_rankings(self):
+        path = f'/draft/{self.played.id}/recommendations/'
+        etag = self.client.get(path)['ETag']
+
+        MLBBAPIService().store.set('mlbb_hero_rank_1_all_30', {'data': {'records': []}}, 60, 60)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class DraftEventStreamTests(DraftReadTestCase):
+    """Draft actions are pushed to viewers of the draft's event stream"""
+
+    def post_action(self, draft, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/draft/{draft.id}/action/', json.dumps(body), content_type='application/json')
+
+    async def test_action_is_pushed(self):
+        response = await self.async_client.get(f'/draft/{self.played.id}/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            await sync_to_async(self.post_action)(self.played, {'action': 'pick', 'hero_id': 20, 'position': 4})
+
+            action = (await anext(stream)).decode()
+            recommendations = (await anext(stream)).decode()
+        finally:
+            await stream.aclose()
+
+        self.assertTrue(action.startswith('id: 12\nevent: action\n'))
+        data = json.loads(action.split('data: ', 1)[1])
+        self.assertEqual(data['since'], 11)
+        self.assertEqual(data['actions'], [{
+            'turn_index': 11, 'team': 'blue', 'action': 'pick', 'hero_id': 20,
+            'hero_name': 'Lolita', 'position': 4, 'pick_order': 3
+        }])
+        self.assertEqual(data['draft']['current_action'], 'blue_pick')
+        self.assertTrue(recommendations.startswith('event: recommendations\n'))
+
+    async def test_cache_backend_delivers_unseen_events(self):
+        backend = CacheEventBackend()
+        subscription = backend.subscribe(self.played.id)
+        self.assertEqual(await subscription.get(0), [])
+
+        backend.publish(DraftEvent(self.played.id, 'action', {'n': 1}, 1))
+        backend.publish(DraftEvent(self.played.id, 'action', {'n': 2}, 2))
+        backend.publish(DraftEvent(self.empty.id, 'action', {'n': 3}, 1))
+
+        self.assertEqual([event.data['n'] for event in await subscription.get(1)], [1, 2])
+        self.assertEqual(await subscription.get(0), [])
+
+    async def test_cache_backend_orders_events_by_draft_version(self):
+        await cache.aclear()
+        backend = CacheEventBackend()
+        subscription = backend.subscribe(self.played.id)
+        self.assertEqual(await subscription.get(0), [])
+
+        # Two publishers racing: the one holding the older version writes the hint last
+        backend.publish(DraftEvent(self.played.id, 'action', {'n': 2}, 2))
+        backend.publish(DraftEvent(self.played.id, 'action', {'n': 1}, 1))
+        self.assertEqual([event.data['n'] for event in await subscription.get(1)], [1])
+        self.assertEqual([event.data['n'] for event in await subscription.get(1)], [2])
+
+        with self.assertRaises(ValueError):
+            backend.publish(DraftEvent(self.played.id, 'action', {'n': 3}))
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get(f'/draft/{self.played.id}/events/')
+
+        self.assertEqual(response.status_code, 501)
+
+
+class CacheSnapshotTests(TestCase):
+    """Keys missing from the cache are read from the cold-start snapshot"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'mlbb.snapshot')
+
+    def test_round_trip(self):
+        entries = {'a': {'value': {'data': [1, 2]}, 'fresh_until': 5.0}, 'b': {'value': {'data': 'x'}, 'fresh_until': 6.0}}
+        version = CacheSnapshot.write(self.path, entries)
+
+        snapshot = CacheSnapshot(self.path)
+        self.assertTrue(snapshot.load())
+        self.assertEqual(snapshot.version, version)
+        self.assertEqual(snapshot.get('a'), entries['a'])
+        self.assertIsNone(snapshot.get('missing'))
+        self.assertEqual(CacheSnapshot.write(self.path, entries), version)
+
+    def test_missing_or_foreign_file_is_ignored(self):
+        self.assertFalse(CacheSnapshot(self.path).load())
+        with open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(b'not a snapshot')
+        self.assertFalse(CacheSnapshot(self.path).load())
+
+    def test_tiered_cache_falls_back_to_snapshot(self):
+        CacheSnapshot.write(self.path, {'a': 1, 'b': 2})
+        tiered = TieredCache(LocalLRUCache(16, 30), fallback=CacheSnapshot(self.path))
+        tiered.set('b', 3)
+
+        self.assertEqual(tiered.get('a'), 1)
+        self.assertEqual(tiered.get_many(['a', 'b', 'c']), {'a': 1, 'b': 3})
+
+
+class CacheMetricsTests(TestCase):
+    """Cache lookups and fills are counted per key family"""
+
+    def setUp(self):
+        cache.clear()
+        self.metrics = CacheMetrics(flush_interval=60)
+        self.store = StaleWhileRevalidateCache(family=lambda key: key.split(':')[0], metrics=self.metrics)
+
+    def test_lookups_and_fills(self):
+        self.store.get_or_fill('rank:1', lambda: ({'data': 1}, True), 60, 60)
+        self.store.get_or_fill('rank:1', lambda: ({'data': 1}, True), 60, 60)
+        self.store.get_or_fill('counter:1', lambda: (None, False), 60, 60)
+
+        summary = self.metrics.summary()
+
+        self.assertEqual({name: summary['rank'][name] for name in ('hits', 'misses', 'fills')},
+                         {'hits': 1, 'misses': 1, 'fills': 1})
+        self.assertEqual(summary['rank']['hit_ratio'], 0.5)
+        self.assertGreater(summary['rank']['avg_payload_bytes'], 0)
+        self.assertEqual((summary['counter']['misses'], summary['counter']['fill_failures']), (1, 1))
+
+    def test_payload_size_is_sampled(self):
+        metrics = CacheMetrics(flush_interval=60, size_every=2)
+        with mock.patch.object(CacheMetrics, 'payload_size', return_value=100) as payload_size:
+            for _ in range(3):
+                metrics.fill('rank', 0.01, {'data': 1}, True)
+            metrics.fill('rank', 0.01, None, False)
+            unsized = CacheMetrics(flush_interval=60, size_every=0)
+            unsized.fill('counter', 0.01, {'data': 1}, True)
+            unsized.flush()
+
+        summary = metrics.summary()
+        self.assertEqual(payload_size.call_count, 2)
+        self.assertEqual((summary['rank']['fills'], summary['rank']['sized_fills']), (3, 2))
+        self.assertEqual(summary['rank']['avg_payload_bytes'], 100)
+        self.assertIsNone(summary['counter']['avg_payload_bytes'])
+
+    def test_workers_share_totals(self):
+        other = CacheMetrics(flush_interval=60)
+        self.metrics.hit('rank')
+        other.hit('rank')
+        other.flush()
+
+        self.assertEqual(self.metrics.summary()['rank']['hits'], 2)
+        self.metrics.reset()
+        self.assertEqual(self.metrics.summary(), {})
+
+    def test_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/cache-metrics/').status_code, 403)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        self.assertEqual(self.client.get('/api/cache-metrics/').status_code, 200)
+
+
+class HeroPageCacheTests(TestCase):
+    """Hero pages render a cached model built once from the fetched data"""
+
+    def setUp(self):
+        cache.clear()
+        self.data = {'data': {'records': [{'data': {
+            'main_heroid': 5, 'main_hero': {'data': {'name': 'Nana', 'head': 'nana.png'}},
+            'main_hero_appearance_rate': 0.0123, 'main_hero_ban_rate': 0.2, 'main_hero_win_rate': 0.5432,
+            'sub_hero': [{'heroid': 20, 'hero': {'data': {'name': 'Lolita', 'head': 'lolita.png'}},
+                          'increase_win_rate': 0.0215}],
+        }}]}}
+        patcher = mock.patch.object(MLBBWebService, 'get_json', return_value=self.data)
+        self.get_json = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rates_are_scaled_once(self):
+        pages = [self.client.get('/hero-rank/?days=7&rank=mythic').content.decode() for _ in range(3)]
+
+        self.assertEqual(self.get_json.call_count, 1)
+        self.assertEqual(pages[0], pages[2])
+        self.assertIn('54.32%', pages[2])
+        self.assertIn('Lolita: 2.15%', pages[2])
+        self.assertEqual(self.data['data']['records'][0]['data']['main_hero_win_rate'], 0.5432)
+
+    def test_models_are_keyed_by_query(self):
+        self.client.get('/hero-rank/?days=7')
+        self.client.get('/hero-rank/?days=7&rank=all')
+        self.client.get('/hero-rank/?days=30')
+
+        self.assertEqual(self.get_json.call_count, 2)
+
+    def test_missing_data_is_not_found(self):
+        self.get_json.return_value = None
+
+        self.assertEqual(self.client.get('/hero-rank/').status_code, 404)
+
+
+class HeroMatrixBuilderTests(TestCase):
+    """Batched counter and synergy lists become dense tables that survive the cache round trip"""
+
+    def test_build_and_round_trip(self):
+        def relations(*pairs):
+            return [{'hero_id': hero_id, 'win_rate_change': change} for hero_id, change in pairs]
+
+        api_service = mock.Mock()
+        api_service.get_hero_counters_batch.return_value = {
+            1: {'strong_against': relations((2, 4.5), ('x', 9)), 'weak_against': relations((3, -2.0))},
+            2: {'strong_against': [], 'weak_against': relations((1, None))},
+        }
+        api_service.get_hero_compatibility_batch.return_value = {
+            1: {'synergizes_with': relations((140, 1.25))},
+            2: {'synergizes_with': []},
+        }
+
+        matrices = HeroMatrixBuilder(api_service).build([1, 2])
+        copy = HeroMatrices.from_bytes(matrices.to_bytes())
+
+        for built in (matrices, copy):
+            self.assertEqual(built.size, 141)
+            self.assertEqual(built.lookup('counter', 1, 2), 4.5)
+            self.assertEqual(built.lookup('weak', 1, 3), -2.0)
+            self.assertEqual(built.lookup('weak', 2, 1), 0.0)
+            self.assertEqual(built.lookup('synergy', 1, 140), 1.25)
+            self.assertEqual(built.lookup('counter', 2, 1), 0.0)
+            self.assertEqual(built.column('counter', 2)[:3], [0.0, 4.5, 0.0])
+        self.assertEqual(copy.version, matrices.version)
+
+
+class HeroMatrixFailureTests(TestCase):
+    """A failing upstream costs one round of batched calls, not one call per hero"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(MLBBAPIService, '_fetch_inprocess', return_value=None)
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_build_backs_off(self):
+        matrices = HeroMatrixStore().get()
+        # Three batches of counters and three of compatibility, no per-hero fallback
+        self.assertEqual(self.fetch.call_count, 6)
+
+        # Another worker, or this one after LOCAL_RECHECK, does not rebuild
+        self.assertEqual(HeroMatrixStore().get().version, matrices.version)
+        self.assertEqual(self.fetch.call_count, 6)
+
+
+class CacheWarmUpTests(TestCase):
+    """warm_up refetches stale entries but only replaces them with good data"""
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.local.clear()
+        self.service = MLBBAPIService()
+        self.hero_list = {'data': {'records': []}}
+        # Already past its TTL, still inside the stale window
+        self.service.store.set('mlbb_hero_list_enhanced', self.hero_list, -1, 60)
+
+    def entry(self):
+        return self.service.store.get_entries(['mlbb_hero_list_enhanced'])['mlbb_hero_list_enhanced']
+
+    def test_failed_refetch_keeps_stale_entry(self):
+        with mock.patch.object(MLBBAPIService, '_fetch_inprocess', return_value=None):
+            self.service.warm_up([1])
+        self.assertEqual(self.entry()['value'], self.hero_list)
+
+    def test_refetch_replaces_stale_entry(self):
+        refreshed = {'data': {'records': [], 'total': 0}}
+        with mock.patch.object(MLBBAPIService, '_fetch_inprocess', return_value=refreshed):
+            self.service.warm_up([1])
+        self.assertEqual(self.entry()['value'], refreshed)
+        self.assertTrue(self.service.store.is_fresh(self.entry()))
+
+
+class HeroBundleTests(TestCase):
+    """A bundle returns the parts that were fetched and reports the rest"""
+
+    def fetch_part(self, query, hero_id, headers):
+        if query == HeroBundleFetcher.PARTS['rate']:
+            raise ConnectionError('upstream reset')
+        if query == HeroBundleFetcher.PARTS['counter']:
+            return UpstreamResponse(503, text='Unavailable')
+        return UpstreamResponse(200, data={'hero_id': hero_id})
+
+    def setUp(self):
+        patcher = mock.patch.object(HeroBundleFetcher, '_fetch_part', side_effect=self.fetch_part)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_partial_results(self):
+        response = self.client.get('/api/hero-bundle/7/?parts=detail,counter,rate')
+
+        self.assertEqual(response.status_code, 200)
+        bundle = response.json()
+        self.assertEqual(bundle['parts'], {'detail': {'hero_id': 7}})
+        self.assertEqual(bundle['errors']['counter']['status'], 503)
+        self.assertEqual(bundle['errors']['rate']['status'], 500)
+
+    def test_unknown_parts_are_rejected(self):
+        response = self.client.get('/api/hero-bundle/7/?parts=detail,lore')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lore', response.json()['error'])
+        self.assertIn('skill_combo', response.json()['details'])
+
+
+def hero_matrices(counter=(), synergy=()):
+    """``HeroMatrices`` for every hero id, zero except the ``(a, b, value)`` entries given"""
+    size = max(HEROES_EN) + 1
+    tables = {name: array('d', bytes(8 * size * size)) for name in HeroMatrices.TABLES}
+    for table, entries in (('counter', counter), ('synergy', synergy)):
+        for hero_id, other_id, value in entries:
+            tables[table][hero_id * size + other_id] = value
+    return HeroMatrices(size, tables['counter'], tables['weak'], tables['synergy'], built_at=0)
+
+
+class DraftSolverTests(TestCase):
+    """Deeper searches see the replies a greedy pick walks into"""
+
+    # Hero 1 has the best meta score but hero 2 hard-counters it; hero 3 is a safe second best
+    RANKINGS = [{'id': 1, 'win_rate': 60, 'pick_rate': 0}, {'id': 3, 'win_rate': 58, 'pick_rate': 0}]
+
+    def solve(self, depth):
+        solver = DraftSolver(hero_matrices(counter=[(2, 1, 20)]), self.RANKINGS, time_budget=10, workers=0)
+        return solver.solve(DraftState(), ['blue_pick', 'red_pick'], 0, depth)
+
+    def test_lookahead_avoids_countered_pick(self):
+        greedy, searched = self.solve(1), self.solve(2)
+
+        self.assertEqual(greedy['moves'][0]['hero_id'], 1)
+        self.assertEqual((searched['depth'], searched['complete']), (2, True))
+        self.assertEqual(searched['moves'][0]['hero_id'], 3)
+        self.assertEqual(searched['moves'][0]['line'], [{'turn': 'blue_pick', 'hero_id': 3},
+                                                        {'turn': 'red_pick', 'hero_id': 1}])
+
+    def test_search_cut_short_at_depth_1_keeps_greedy_order(self):
+        cache.clear()
+        tiered_cache.local.clear()
+        service = DraftRecommendationService()
+        with mock.patch('apps.mlbb_web.services.hero_matrix_store.get', return_value=hero_matrices(counter=[(2, 1, 20)])), \
+                mock.patch.object(service.api_service, 'get_hero_rankings', return_value=self.RANKINGS), \
+                mock.patch.object(DraftSolver, '_search_root', side_effect=SearchTimeout):
+            result = service.get_lookahead_recommendations(DraftState(), ['blue_pick', 'red_pick'], 0, 2)
+
+        self.assertEqual((result['search']['depth'], result['search']['complete']), (0, False))
+        self.assertEqual([move['id'] for move in result['recommendations'][:2]], [1, 3])
+        self.assertTrue(all(move['search_score'] is None for move in result['recommendations']))
+
+    def test_pair_tables_are_built_once_per_version(self):
+        matrices = hero_matrices(synergy=[(1, 3, 4)])
+        first = DraftSolver(matrices, [])
+        self.assertIs(DraftSolver(HeroMatrices.from_bytes(matrices.to_bytes()), []).pair_rows, first.pair_rows)
+
+        changed = DraftSolver(hero_matrices(synergy=[(1, 3, 2)]), [])
+        self.assertIsNot(changed.pair_rows, first.pair_rows)
+        self.assertEqual((first.pair_rows[1][3], changed.pair_rows[1][3]), (2, 1))
+
+
+class DraftScoringEngineTests(TestCase):
+    """The vectorized engine scores exactly like the per-hero formula it replaced"""
+
+    def setUp(self):
+        rng = random.Random(9)
+        heroes = range(1, 21)
+        # Per hero, the heroes it is strong against and synergizes with, with win rate changes
+        self.strong_against = {hero_id: {other_id: round(rng.uniform(-4, 18), 4)
+                                         for other_id in rng.sample(heroes, 6) if other_id != hero_id}
+                               for hero_id in heroes}
+        self.synergizes_with = {hero_id: {other_id: round(rng.uniform(-2, 9), 4)
+                                          for other_id in rng.sample(heroes, 6) if other_id != hero_id}
+                                for hero_id in heroes}
+        self.rankings = [{'id': hero_id, 'win_rate': round(rng.uniform(44, 58), 2), 'pick_rate': round(rng.uniform(0, 80), 2)}
+                         for hero_id in rng.sample(heroes, 14)]
+        # Only the first ranking of a hero counts
+        self.rankings.append({'id': self.rankings[0]['id'], 'win_rate': 99, 'pick_rate': 99})
+
+    def baseline_score(self, hero_id, ally_picks, enemy_picks):
+        """DraftRecommendationService._calculate_draft_score as it was before the engine"""
+        score = 50.0
+        hero_rank = next((h for h in self.rankings if h['id'] == hero_id), None)
+        if hero_rank:
+            score += (hero_rank['win_rate'] - 50) * 0.5
+            score += min(hero_rank['pick_rate'] * 0.1, 5)
+        for ally_id in ally_picks:
+            for other_id, change in self.synergizes_with[ally_id].items():
+                if other_id == hero_id:
+                    score += min(change * 0.5, 3)
+        for enemy_id in enemy_picks:
+            for other_id, change in self.strong_against[hero_id].items():
+                if other_id == enemy_id:
+                    score += min(change * 0.3, 5)
+        for enemy_id in enemy_picks:
+            for other_id, change in self.strong_against[enemy_id].items():
+                if other_id == hero_id:
+                    score -= min(abs(change) * 0.2, 3)
+        return max(0, min(100, score))
+
+    def test_scores_match_baseline(self):
+        matrices = hero_matrices(
+            counter=[(a, b, change) for a, row in self.strong_against.items() for b, change in row.items()],
+            synergy=[(a, b, change) for a, row in self.synergizes_with.items() for b, change in row.items()],
+        )
+        ally_picks, enemy_picks = [3, 7], [4, 9, 12]
+        candidates = [hero_id for hero_id in range(1, 21) if hero_id not in ally_picks + enemy_picks]
+
+        scores = DraftScoringEngine(matrices, self.rankings).score(ally_picks, enemy_picks, candidates)
+
+        self.assertEqual(scores, [self.baseline_score(hero_id, ally_picks, enemy_picks) for hero_id in candidates])
+
+
+class ScriptedUpstream(BaseHTTPRequestHandler):
+    """Answers each POST with the next ``(status, body, delay)`` of the server's script"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status, body, delay = self.server.script.pop(0)
+        self.server.requests += 1
+        time.sleep(delay)
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamClientTests(TestCase):
+    """Transient upstream failures are retried; the rest map to 502 and 504"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedUpstream)
+        self.server.script, self.server.requests = [], 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.endpoint = UpstreamEndpoint('test', '1', {})
+        self.endpoint.url = f'http://127.0.0.1:{self.server.server_port}/1'
+        self.client = UpstreamClient(max_retries=2, backoff_factor=0, timeouts={'default': (1, 0.3)})
+
+    def post(self, *script):
+        self.server.script = list(script)
+        return self.client.post(self.endpoint, {})
+
+    def test_transient_failure_is_retried(self):
+        response = self.post((503, b'busy', 0), (200, b'{"data": 1}', 0))
+
+        self.assertEqual((response.status_code, response.data), (200, {'data': 1}))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_retries_are_bounded(self):
+        response = self.post(*[(503, b'busy', 0)] * 3)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_timeout_maps_to_504(self):
+        response = self.post(*[(200, b'{}', 0.5)] * 3)
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_connection_failure_and_bad_json_map_to_502(self):
+        self.assertEqual(self.post((200, b'not json', 0)).status_code, 502)
+
+        self.endpoint.url = 'http://127.0.0.1:1/1'
+        self.assertEqual(UpstreamClient(max_retries=0).post(self.endpoint, {}).status_code, 502)
+
+
+class SlowUpstreamClient:
+    """Counts calls; each waits for ``release`` and answers with the next response"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def post(self, endpoint, payload, headers=None):
+        self.calls += 1
+        self.release.wait(5)
+        return self.responses.pop(0)
+
+
+class UpstreamResponseCacheTests(TestCase):
+    """Stale responses are served at once while a single background call refreshes them"""
+
+    def setUp(self):
+        cache.clear()
+        self.client_ = SlowUpstreamClient(UpstreamResponse(200, data={'v': 1}), UpstreamResponse(200, data={'v': 2}))
+        self.upstream = UpstreamResponseCache(self.client_, ttls={'default': 60}, stale_ttl=60)
+        self.endpoint = UpstreamEndpoint('test', '1', {})
+        self.key = self.upstream.make_key('1', {}, 'en')
+
+    def expire(self):
+        entry = self.upstream.store.get_entries([self.key])[self.key]
+        self.upstream.store.set(self.key, entry['value'], -1, 60)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_stale_entry_is_refreshed_once_in_background(self):
+        self.assertEqual(self.upstream.post(self.endpoint, {}).data, {'v': 1})
+        self.assertEqual(self.upstream.post(self.endpoint, {}).data, {'v': 1})
+        self.assertEqual(self.client_.calls, 1)
+
+        self.expire()
+        self.client_.release.clear()
+        # Every caller gets the stale response without waiting for the one refresh
+        self.assertEqual([self.upstream.post(self.endpoint, {}).data for _ in range(5)], [{'v': 1}] * 5)
+        self.wait_for(lambda: self.client_.calls == 2)
+        self.client_.release.set()
+
+        self.wait_for(lambda: self.upstream.store.is_fresh(self.upstream.store.get_entries([self.key]).get(self.key)))
+        self.assertEqual(self.upstream.post(self.endpoint, {}).data, {'v': 2})
+        self.assertEqual(self.client_.calls, 2)
+
+    def test_failed_refresh_keeps_stale_entry(self):
+        self.client_.responses[1] = UpstreamResponse(503, text='down')
+        self.upstream.post(self.endpoint, {})
+        self.expire()
+
+        self.assertEqual(self.upstream.post(self.endpoint, {}).data, {'v': 1})
+        self.wait_for(lambda: not self.client_.responses)
+        # The refresh lock is held after a failure, so the next call does not retry at once
+        self.assertEqual(self.upstream.post(self.endpoint, {}).data, {'v': 1})
+        self.assertEqual(self.client_.calls, 2)
+
+
+class SingleFlightTests(TestCase):
+    """Concurrent calls for one key share a single execution"""
+
+    THREADS = 8
+
+    def run_concurrently(self, flight, fn):
+        """Call ``flight.do`` from several threads while the first call is still running"""
+        started, release = threading.Event(), threading.Event()
+        outcomes = []
+
+        def leader_fn():
+            started.set()
+            release.wait(5)
+            return fn()
+
+        def call():
+            try:
+                outcomes.append(flight.do('key', leader_fn))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(self.THREADS)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_calls_are_coalesced(self):
+        calls = []
+        outcomes = self.run_concurrently(SingleFlight(distributed=False), lambda: calls.append(1) or {'v': 1})
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(outcomes, [{'v': 1}] * self.THREADS)
+        self.assertTrue(all(outcome is outcomes[0] for outcome in outcomes))
+
+    def test_error_is_shared(self):
+        def fail():
+            raise ConnectionError('upstream reset')
+
+        outcomes = self.run_concurrently(SingleFlight(distributed=False), fail)
+
+        self.assertEqual(len(outcomes), self.THREADS)
+        self.assertTrue(all(isinstance(outcome, ConnectionError) for outcome in outcomes))
+
+    def test_other_process_result_is_awaited(self):
+        cache.clear()
+        flight = SingleFlight(distributed=True, wait_timeout=2)
+        # Another worker holds the lock and has just stored its result
+        cache.add('key:inflight', True, 5)
+        fn = mock.Mock(return_value='fetched')
+
+        self.assertEqual(flight.do('key', fn, recheck=lambda: 'stored'), 'stored')
+        fn.assert_not_called()
+
+
+@override_settings(MLBB_URL='https://upstream.test/')
+class UpstreamEndpointRegistryTests(TestCase):
+    """The base path is decrypted once and compiled into every endpoint URL"""
+
+    def setUp(self):
+        patcher = mock.patch('apps.mlbb_api.endpoints.BasePathProvider.get_base_path', return_value='api/base')
+        self.get_base_path = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = UpstreamEndpointRegistry()
+        self.registry.register('rank', '101', {'pageSize': 20, 'filters': []})
+
+    def test_resolves_once_on_first_use(self):
+        self.assertEqual(self.registry['rank'].url, 'https://upstream.test/api/base/101')
+        self.assertEqual(self.registry['rank'].url, 'https://upstream.test/api/base/101')
+        self.assertEqual(self.get_base_path.call_count, 1)
+
+        # Endpoints registered later are compiled against the resolved base
+        self.assertEqual(self.registry.register('late', '202', {}).url, 'https://upstream.test/api/base/202')
+
+    def test_startup_failure_surfaces_on_first_use(self):
+        self.get_base_path.side_effect = ValueError('bad key')
+        self.registry.try_resolve()
+        self.assertFalse(self.registry.resolved)
+
+        with self.assertRaises(ValueError):
+            self.registry['rank']
+        self.get_base_path.side_effect = None
+        self.assertEqual(self.registry['rank'].url, 'https://upstream.test/api/base/101')
+
+    def test_payloads_do_not_share_the_template(self):
+        payload = self.registry['rank'].payload(pageSize=5)
+        payload['filters'].append({'field': 'hero_id'})
+
+        self.assertEqual(payload['pageSize'], 5)
+        self.assertEqual(self.registry['rank'].payload(), {'pageSize': 20, 'filters': []})
+
+
+class MLBBAPIServiceTransportTests(TestCase):
+    """Hero data is read from upstream in process unless the HTTP transport is configured"""
+
+    DETAIL = {'data': {'records': [{'data': {'hero': {'data': {'heroid': 7, 'heroname': 'Alucard'}}}}]}}
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.local.clear()
+        self.endpoint = UpstreamEndpoint('hero_detail', '1', {})
+        patcher = mock.patch('apps.mlbb_web.services.UpstreamQueries.hero_detail', return_value=(self.endpoint, {'q': 7}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_inprocess_skips_the_loopback_request(self):
+        with mock.patch.object(upstream_cache, 'fetch', return_value=UpstreamResponse(200, data=self.DETAIL)) as fetch, \
+                mock.patch('apps.mlbb_web.services.requests.get') as get:
+            hero = MLBBAPIService(transport='inprocess').get_hero_details(7)
+
+        self.assertEqual((hero['id'], hero['name']), (7, 'Alucard'))
+        fetch.assert_called_once_with(self.endpoint, {'q': 7}, {'Content-Type': 'application/json'})
+        get.assert_not_called()
+
+    def test_http_transport_calls_the_public_api(self):
+        response = mock.Mock(status_code=200, json=mock.Mock(return_value=self.DETAIL))
+        with mock.patch.object(upstream_cache, 'fetch') as fetch, \
+                mock.patch('apps.mlbb_web.services.requests.get', return_value=response) as get:
+            hero = MLBBAPIService(transport='http').get_hero_details(7)
+
+        self.assertEqual(hero['name'], 'Alucard')
+        self.assertTrue(get.call_args.args[0].endswith('hero-detail/7/'))
+        fetch.assert_not_called()
+
+
+def counter_record(hero_id):
+    return {'data': {'main_heroid': hero_id, 'sub_hero': []}}
+
+
+class HeroBatchTests(TestCase):
+    """Batch endpoints make one hasAnyOf upstream query and answer per hero"""
+
+    def setUp(self):
+        # Skip base path decryption; upstream_cache.post is patched anyway
+        patcher = mock.patch.object(UpstreamEndpointRegistry, '__getitem__', lambda self, name: self._endpoints[name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_split_by_hero(self):
+        data = {'data': {'records': [counter_record(5), counter_record(1), counter_record(9),
+                                     {'data': {'main_heroid': None}}, counter_record(5)]}}
+
+        split = split_by_hero(data, 'main_heroid', [1, 5, 23])
+
+        self.assertEqual(split[1], {'data': {'records': [counter_record(1)]}})
+        self.assertEqual(split[5], {'data': {'records': [counter_record(5), counter_record(5)]}})
+        self.assertEqual(split[23], {'data': {'records': []}})
+        self.assertNotIn(9, split)
+
+    def test_one_upstream_call_per_batch(self):
+        data = {'data': {'records': [counter_record(1), counter_record(5)]}}
+        with mock.patch.object(upstream_cache, 'post', return_value=UpstreamResponse(200, data=data)) as post:
+            response = self.client.get('/api/hero-counter/?ids=5,1,1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['heroes'], {'1': {'data': {'records': [counter_record(1)]}},
+                                                     '5': {'data': {'records': [counter_record(5)]}}})
+        payload = post.call_args.args[1]
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(payload['pageSize'], 2)
+        self.assertIn({'field': 'main_heroid', 'operator': 'hasAnyOf', 'value': [1, 5]}, payload['filters'])
+
+    def test_invalid_ids_are_rejected(self):
+        with mock.patch.object(upstream_cache, 'post') as post:
+            for ids in ('', 'x', ','.join(str(hero_id) for hero_id in range(1, 60))):
+                self.assertEqual(self.client.get(f'/api/hero-counter/?ids={ids}').status_code, 400)
+        post.assert_not_called()
+
+
+class DraftStateTests(TestCase):
+    """Picks and bans as ordered tuples plus hero bitmasks"""
+
+    def test_hero_mask(self):
+        mask = HeroMask.from_ids([3, 129, 1])
+
+        self.assertEqual(HeroMask.ids(mask), [1, 3, 129])
+        self.assertTrue(HeroMask.contains(mask, 129))
+        self.assertFalse(HeroMask.contains(mask, 2))
+        self.assertFalse(HeroMask.contains(mask, -1))
+        self.assertEqual(HeroMask.to_hex(HeroMask.from_ids([0, 4])), '11')
+
+    def test_state_masks(self):
+        state = DraftState(blue_picks=[5, 10], red_picks=[6], blue_bans=[1], red_bans=[2])
+
+        self.assertTrue(state.is_taken(10) and state.is_taken(2))
+        self.assertFalse(state.is_taken(7))
+        self.assertEqual(state.available_mask & state.taken_mask, 0)
+        self.assertEqual(state.available_mask | state.taken_mask, ALL_HEROES_MASK)
+        self.assertEqual(state.teams('red'), ([6], [5, 10]))
+
+    def test_key_ignores_order_but_tuples_keep_it(self):
+        state = DraftState(blue_picks=[5, 10])
+        reordered = DraftState(blue_picks=[10, 5])
+
+        self.assertEqual(state, reordered)
+        self.assertEqual(len({state, reordered}), 1)
+        self.assertEqual(state.picks['blue'], (5, 10))
+        self.assertNotEqual(state, DraftState(red_picks=[5, 10]))
+
+    def test_with_action_leaves_state_untouched(self):
+        state = DraftState(blue_picks=[5])
+        next_state = state.with_action('red', 'ban', 7)
+
+        self.assertFalse(state.is_taken(7))
+        self.assertEqual(next_state.bans['red'], (7,))
+        self.assertEqual(next_state.picks['blue'], (5,))
+
+    def test_from_draft(self):
+        draft = create_draft()
+        play(draft, range(1, 12))
+
+        with self.assertNumQueries(1):
+            state = DraftState.from_draft(draft)
+
+        self.assertEqual(state.picks, {'blue': (5, 10), 'red': (6, 9, 11)})
+        self.assertEqual(state.bans, {'blue': (1, 3, 7), 'red': (2, 4, 8)})
+
+
+@override_settings(MLBB_BAN_THREAT_WEIGHT=0)
+class BanRecommendationTests(TestCase):
+    """Ban scores read enemy synergy from the matrices instead of per-enemy compatibility calls"""
+
+    RANKINGS = [{'id': hero_id, 'pick_rate': pick_rate, 'win_rate': win_rate, 'ban_rate': ban_rate}
+                for hero_id, pick_rate, win_rate, ban_rate in ((7, 10, 52, 5), (8, 30, 50, 40), (9, 5, 54, 1), (11, 8, 49, 2))]
+
+    def test_enemy_synergy_boosts_ban_score(self):
+        service = DraftRecommendationService()
+        matrices = hero_matrices(synergy=[(4, 7, 3.0), (9, 7, 1.5), (4, 8, -2.0)])
+        with mock.patch('apps.mlbb_web.services.hero_matrix_store.get', return_value=matrices), \
+                mock.patch.object(service.api_service, 'get_hero_rankings', return_value=self.RANKINGS), \
+                mock.patch.object(service.api_service, 'get_hero_compatibility') as get_hero_compatibility:
+            bans = service.get_ban_recommendations([4, 9], [11])
+
+        get_hero_compatibility.assert_not_called()
+        scores = {ban['id']: ban['ban_score'] for ban in bans}
+        self.assertEqual(set(scores), {7, 8})
+        # pick_rate * 0.4 + win_rate * 0.3 + ban_rate * 0.3 + 2 * synergy with each enemy pick
+        self.assertAlmostEqual(scores[7], 10 * 0.4 + 52 * 0.3 + 5 * 0.3 + 2 * (3.0 + 1.5))
+        self.assertAlmostEqual(scores[8], 30 * 0.4 + 50 * 0.3 + 40 * 0.3 + 2 * -2.0)
+        self.assertEqual([ban['id'] for ban in bans], [8, 7])
+
+
+class TeamCompositionTests(TestCase):
+    """Roles and synergy come from the in-memory metadata table and hero matrices"""
+
+    METADATA = {1: {'role': 'Tank', 'lane_ids': [3]}, 2: {'role': 'Marksman', 'lane_ids': [5]},
+                3: {'role': 'Mage', 'lane_ids': [2]}}
+
+    def test_roles_and_synergy(self):
+        service = DraftRecommendationService()
+        matrices = hero_matrices(synergy=[(1, 2, 4.0), (3, 1, 1.5)])
+        with mock.patch('apps.mlbb_web.services.hero_metadata_table.get', return_value=self.METADATA), \
+                mock.patch('apps.mlbb_web.services.hero_matrix_store.get', return_value=matrices), \
+                mock.patch.object(service.api_service, 'get_hero_details') as get_hero_details:
+            analysis = service.analyze_team_composition([1, 2, 3, 99])
+
+        get_hero_details.assert_not_called()
+        self.assertEqual({role: count for role, count in analysis['roles'].items() if count},
+                         {'Tank': 1, 'Marksman': 1, 'Mage': 1})
+        # Only pairs in pick order count: (1, 2) and (1, 3), not (3, 1)
+        self.assertEqual(analysis['synergy'], 4.0)
+        self.assertIn('Good tankiness and initiation', analysis['strengths'])
+        self.assertNotIn('Balanced role distribution', analysis['strengths'])
+
+    @override_settings(MLBB_MATRIX_REFRESH=60)
+    def test_metadata_table_is_fetched_once(self):
+        table = HeroMetadataTable()
+        api_service = mock.Mock()
+        api_service.get_hero_metadata.side_effect = [{}, self.METADATA, {}]
+        with mock.patch.object(table, '_api_service', return_value=api_service):
+            # An empty fetch is not kept
+            self.assertEqual(table.get(), {})
+            self.assertEqual(table.get(), self.METADATA)
+            self.assertEqual(table.get(), self.METADATA)
+
+        self.assertEqual(api_service.get_hero_metadata.call_count, 2)
+
+
+class LaneAssignmentTests(TestCase):
+    """Picks are placed by the best total lane fit, not greedily"""
+
+    def test_hungarian_matches_brute_force(self):
+        rng = random.Random(15)
+        for rows, columns in ((1, 5), (3, 5), (5, 5), (4, 6)):
+            cost = [[rng.randint(-9, 9) for _ in range(columns)] for _ in range(rows)]
+            assignment = hungarian(cost)
+
+            self.assertEqual(len(set(assignment)), rows)
+            best = min(sum(cost[row][column] for row, column in enumerate(choice))
+                       for choice in permutations(range(columns), rows))
+            self.assertEqual(sum(cost[row][column] for row, column in enumerate(assignment)), best)
+
+    def test_flexible_hero_makes_room(self):
+        gold, mid = LANE_POSITIONS[5], LANE_POSITIONS[2]
+        # Hero 1 prefers gold lane but can play mid; hero 2 only plays gold lane
+        assigner = LaneAssigner({1: {'lane_ids': [5, 2]}, 2: {'lane_ids': [5]}})
+
+        placed = {entry['hero_id']: (entry['position'], entry['fit']) for entry in assigner.assign([1, 2])}
+
+        self.assertEqual(placed, {1: (mid, LaneAssigner.SECONDARY_FIT), 2: (gold, LaneAssigner.PRIMARY_FIT)})
+
+    def test_candidate_gains(self):
+        assigner = LaneAssigner({1: {'lane_ids': [5]}, 2: {'lane_ids': [5, 2]}, 3: {'lane_ids': [5]}})
+
+        gains = assigner.candidate_gains([1], [2, 3])
+
+        self.assertAlmostEqual(gains[0][0], LaneAssigner.SECONDARY_FIT)
+        self.assertEqual(gains[0][1], LANE_POSITIONS[2])
+        self.assertEqual(gains[1][0], 0.0)
+        self.assertEqual(assigner.candidate_gains([1, 2, 3, 4, 5], [6]), [(0.0, None)])
+
+
+class RecommendationPrecomputerTests(TestCase):
+    """After an action, the next turn and the replies to its top recommendations are precomputed"""
+
+    def setUp(self):
+        patcher = mock.patch.object(DraftRecommendationService, 'get_recommendations',
+                                    return_value=[{'id': 7}, {'id': 8}, {'id': 9}])
+        self.get_recommendations = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.state = DraftState([], [], [1, 3], [2, 4])
+
+    def test_next_turn_and_likely_replies(self):
+        RecommendationPrecomputer(top_k=2).schedule(self.state, TURN_ORDER, 4).result(5)
+
+        self.assertEqual([call.args for call in self.get_recommendations.call_args_list], [
+            (self.state, 'blue_pick'),
+            (self.state.with_action('blue', 'pick', 7), 'red_pick'),
+            (self.state.with_action('blue', 'pick', 8), 'red_pick'),
+        ])
+
+    def test_nothing_to_precompute(self):
+        self.assertIsNone(RecommendationPrecomputer(top_k=0).schedule(self.state, TURN_ORDER, 4))
+        self.assertIsNone(RecommendationPrecomputer(top_k=2).schedule(self.state, TURN_ORDER, len(TURN_ORDER)))
+
+        RecommendationPrecomputer(top_k=2).schedule(self.state, TURN_ORDER, len(TURN_ORDER) - 1).result(5)
+        self.assertEqual(self.get_recommendations.call_count, 1)
+
+
+class TieredCacheTests(TestCase):
+    """A bounded per-process LRU in front of the shared cache"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lru_evicts_least_recently_used(self):
+        local = LocalLRUCache(max_entries=2, ttl=60)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+
+        self.assertEqual((local.get('a'), local.get('b'), local.get('c')), (1, None, 3))
+
+    def test_lru_entries_expire(self):
+        local = LocalLRUCache(max_entries=2, ttl=60)
+        local.set('a', 1, timeout=1)
+        with mock.patch('apps.mlbb_api.cache.time.monotonic', return_value=time.monotonic() + 2):
+            self.assertIsNone(local.get('a'))
+
+    def test_shared_hits_are_promoted(self):
+        tiered = TieredCache(LocalLRUCache(max_entries=4, ttl=60), cache)
+        cache.set('key', {'v': 1})
+
+        self.assertEqual(tiered.get('key'), {'v': 1})
+        # Served by the local tier from now on, even if the shared copy goes away
+        cache.delete('key')
+        self.assertEqual(tiered.get('key'), {'v': 1})
+        self.assertEqual(tiered.get_many(['key', 'other']), {'key': {'v': 1}})
+
+    def test_writes_reach_both_tiers(self):
+        local = LocalLRUCache(max_entries=4, ttl=60)
+        tiered = TieredCache(local, cache)
+        tiered.set_many({'a': 1, 'b': 2})
+        tiered.set('c', 3)
+
+        self.assertEqual([local.get(key) for key in 'abc'], [1, 2, 3])
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2, 'c': 3})
+        tiered.delete('a')
+        self.assertEqual((local.get('a'), cache.get('a')), (None, None))
+
+
+class MLBBDataCacheTests(TestCase):
+    """Failed fetches are cached briefly and stale data is served while it refreshes"""
+
+    DETAIL = MLBBAPIServiceTransportTests.DETAIL
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.local.clear()
+
+    @override_settings(MLBB_WEB_NEGATIVE_TTL=30)
+    def test_failures_are_negatively_cached(self):
+        service = MLBBAPIService(transport='inprocess')
+        with mock.patch.object(MLBBAPIService, '_fetch_inprocess', return_value=None) as fetch:
+            self.assertIsNone(service.get_hero_details(7))
+            self.assertIsNone(service.get_hero_details(7))
+        self.assertEqual(fetch.call_count, 1)
+
+    @override_settings(MLBB_WEB_NEGATIVE_TTL=0)
+    def test_failures_are_retried_without_negative_ttl(self):
+        service = MLBBAPIService(transport='inprocess')
+        with mock.patch.object(MLBBAPIService, '_fetch_inprocess', return_value=None) as fetch:
+            service.get_hero_details(7)
+            service.get_hero_details(7)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_stale_data_is_served_while_refreshing(self):
+        service = MLBBAPIService(transport='inprocess')
+        service.store.set('mlbb_hero_detail_7', self.DETAIL, -1, 60)
+        refreshed = threading.Event()
+
+        def fetch(query):
+            refreshed.set()
+            return None
+
+        with mock.patch.object(MLBBAPIService, '_fetch_inprocess', side_effect=fetch):
+            self.assertEqual(service.get_hero_details(7)['name'], 'Alucard')
+            self.assertTrue(refreshed.wait(5))
+            # The failed refresh left the stale entry in place
+            self.assertEqual(service.get_hero_details(7)['name'], 'Alucard')
+
+
+class InprocessRefillTests(TestCase):
+    """Service cache fills call upstream rather than reusing the upstream response cache"""
+
+    OLD = MLBBAPIServiceTransportTests.DETAIL
+    NEW = {'data': {'records': [{'data': {'hero': {'data': {'heroid': 7, 'heroname': 'Alucard II'}}}}]}}
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.local.clear()
+        endpoint = UpstreamEndpoint('hero_detail', '1', {})
+        patcher = mock.patch('apps.mlbb_web.services.UpstreamQueries.hero_detail', return_value=(endpoint, {'q': 7}))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = MLBBAPIService(transport='inprocess')
+        # The upstream layer holds a stale copy of the old response
+        self.upstream_key = upstream_cache.make_key('1', {'q': 7}, 'en')
+        upstream_cache.store.set(self.upstream_key, UpstreamResponse(200, data=self.OLD), -1, 60)
+
+    def use_upstream(self, *responses):
+        upstream = SlowUpstreamClient(*responses)
+        patcher = mock.patch.object(upstream_cache, 'client', upstream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return upstream
+
+    def test_fill_does_not_store_a_stale_upstream_response_as_fresh(self):
+        upstream = self.use_upstream(UpstreamResponse(200, data=self.NEW))
+
+        self.assertEqual(self.service.get_hero_details(7)['name'], 'Alucard II')
+        self.assertEqual(upstream.calls, 1)
+        # The upstream layer got the new response too
+        self.assertEqual(upstream_cache.store.get_entries([self.upstream_key])[self.upstream_key]['value'].data, self.NEW)
+
+    def test_failed_refill_is_retried_upstream(self):
+        upstream = self.use_upstream(UpstreamResponse(503, text='down'), UpstreamResponse(200, data=self.NEW))
+        self.service.store.set('mlbb_hero_detail_7', self.OLD, -1, 60)
+        self.service._warming = True
+
+        # The failure is not answered from the upstream layer's stale copy...
+        self.assertEqual(self.service.get_hero_details(7)['name'], 'Alucard')
+        self.assertFalse(self.service.store.is_fresh(self.service.store.get_entries(['mlbb_hero_detail_7'])['mlbb_hero_detail_7']))
+        # ...and the next refill calls upstream again
+        self.assertEqual(self.service.get_hero_details(7)['name'], 'Alucard II')
+        self.assertEqual(upstream.calls, 2)
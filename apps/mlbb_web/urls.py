@@ -24,6 +24,7 @@ urlpatterns.extend([
     path('draft/<int:draft_id>/data/', views.draft_data, name='draft_data'),
     path('draft/<int:draft_id>/save-template/', views.save_template, name='save_template'),
     path('draft/<int:draft_id>/recommendations/', views.get_recommendations, name='get_recommendations'),
+    path('draft/<int:draft_id>/events/', views.draft_events_stream, name='draft_events'),
     path('draft/<int:draft_id>/analytics/', views.draft_analytics, name='draft_analytics'),
     path('api/heroes/', views.get_heroes_api, name='get_heroes_api'),
     path('api/hero/<int:hero_id>/details/', views.get_hero_details_api, name='get_hero_details_api'),
@@ -0,0 +1,150 @@
+import hashlib
+import json
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+from apps.mlbb_api.cache import StaleWhileRevalidateCache, tiered_cache
+from apps.mlbb_api.views import HEROES_EN
+
+
+class HeroPageModels:
+    """Builds the render-ready models of the hero rank, position and detail pages.
+
+    Every builder returns new objects and leaves its input untouched, so the
+    upstream data it reads can be shared with other caches.
+    """
+    MAIN_RATES = ('main_hero_appearance_rate', 'main_hero_ban_rate', 'main_hero_win_rate')
+    SUB_HERO_RATES = ('hero_appearance_rate', 'hero_win_rate', 'increase_win_rate')
+    RELATION_TYPES = ('assist', 'strong', 'weak')
+
+    @staticmethod
+    def has_records(data: Optional[Dict]) -> bool:
+        return bool(data) and 'data' in data and 'records' in data['data']
+
+    @staticmethod
+    def percent(rate: Optional[float], digits: Optional[int] = None) -> Optional[float]:
+        if rate is None:
+            return None
+        return rate * 100 if digits is None else round(rate * 100, digits)
+
+    @staticmethod
+    def scaled(record: Dict, fields, digits: Optional[int] = None) -> Dict:
+        """``record`` with its ``fields`` rates turned into percentages"""
+        return {**record, **{field: HeroPageModels.percent(record[field], digits) for field in fields if field in record}}
+
+    @staticmethod
+    def hero_name(hero_id: int) -> str:
+        return HEROES_EN.get(hero_id, 'Unknown') if hero_id != 0 else 'Unknown'
+
+    @staticmethod
+    def hero_rank(data: Dict) -> Dict:
+        """One row per hero with just what hero-rank.html shows; missing fields render blank"""
+        records = []
+        for record in data['data']['records']:
+            record = record['data']
+            main_hero = record.get('main_hero', {}).get('data', {})
+            records.append({
+                'hero_id': record.get('main_heroid'),
+                'name': main_hero.get('name', ''),
+                'head': main_hero.get('head', ''),
+                'appearance_rate': HeroPageModels.percent(record.get('main_hero_appearance_rate')),
+                'ban_rate': HeroPageModels.percent(record.get('main_hero_ban_rate')),
+                'win_rate': HeroPageModels.percent(record.get('main_hero_win_rate')),
+                'sub_heroes': [{
+                    'hero_id': sub_hero.get('heroid'),
+                    'name': sub_hero.get('hero', {}).get('data', {}).get('name', ''),
+                    'head': sub_hero.get('hero', {}).get('data', {}).get('head', ''),
+                    'increase_win_rate': HeroPageModels.percent(sub_hero['increase_win_rate']),
+                } for sub_hero in record['sub_hero']],
+            })
+        return {'records': records}
+
+    @staticmethod
+    def hero_position(data: Optional[Dict]) -> Dict:
+        """One row per hero with just what hero-position.html shows, relations as hero names"""
+        records = []
+        for record in (data['data']['records'] or []) if data else []:
+            hero = record['data'].get('hero', {}).get('data', {})
+            relation = record['data']['relation']
+            records.append({
+                'name': hero.get('name', ''),
+                'smallmap': hero.get('smallmap', ''),
+                'lanes': [{'title': lane['data'].get('road_sort_title', ''), 'icon': lane['data'].get('road_sort_icon', '')}
+                          for lane in hero.get('roadsort', [])],
+                'roles': [{'title': role['data'].get('sort_title', ''), 'icon': role['data'].get('sort_icon', '')}
+                          for role in hero.get('sortid', [])],
+                **{relation_type: [HeroPageModels.hero_name(hero_id)
+                                   for hero_id in relation[relation_type]['target_hero_id']]
+                   for relation_type in HeroPageModels.RELATION_TYPES},
+            })
+        return {'records': records}
+
+    @staticmethod
+    def hero_detail(detail: Dict, stats: Dict, counter: Dict, compatibility: Dict) -> Dict:
+        record = detail['data']['records'][0]['data']
+        hero = record['hero']['data']
+        skills = [{**skill, 'skilllist': [
+            {('skillcd_cost' if key == 'skillcd&cost' else key): value for key, value in skill_detail.items()}
+            for skill_detail in skill['skilllist']
+        ]} for skill in hero['heroskilllist']]
+        plans = [{**plan, 'battleskill': {
+            ('data' if key == '__data' else key): value for key, value in plan['battleskill'].items()
+        }} for plan in hero['recommendmasterplan']]
+
+        return {
+            'data': {**record, 'hero': {**record['hero'], 'data': {
+                **hero, 'heroskilllist': skills, 'recommendmasterplan': plans
+            }}},
+            'stats': {'data': {'records': [
+                {**stats_record, 'data': HeroPageModels.scaled(stats_record['data'], HeroPageModels.MAIN_RATES)}
+                for stats_record in stats['data']['records']
+            ]}},
+            'counter': HeroPageModels.sub_hero_tables(counter),
+            'compatibility': HeroPageModels.sub_hero_tables(compatibility),
+        }
+
+    @staticmethod
+    def sub_hero_tables(data: Dict) -> Dict:
+        """Only the sub-hero lists of each record, with rates as percentages to two places"""
+        return {'data': {'records': [{'data': {
+            key: [HeroPageModels.scaled(sub_hero, HeroPageModels.SUB_HERO_RATES, 2) for sub_hero in record['data'][key]]
+            for key in ('sub_hero', 'sub_hero_last')
+        }} for record in data['data']['records']]}}
+
+
+class HeroPageCache:
+    """Caches hero page models, keyed by page and query parameters.
+
+    A model is built once per entry, from data fetched by the caller, and
+    every request renders that same model, which is never modified. Entries
+    are served stale while one background refresh rebuilds them, and pages
+    whose data could not be fetched are cached for ``MLBB_WEB_NEGATIVE_TTL``
+    seconds, like the MLBB data behind the draft tools.
+    """
+    KEY_PREFIX = 'mlbb_page'
+
+    def __init__(self):
+        self.store = StaleWhileRevalidateCache(tiered_cache, family=self.cache_family)
+
+    def cache_key(self, page: str, params: Dict) -> str:
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        return f'{self.KEY_PREFIX}_{page}_{digest}'
+
+    @staticmethod
+    def cache_family(cache_key: str) -> str:
+        return cache_key.rsplit('_', 1)[0]
+
+    def get(self, page: str, params: Dict, build: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """The model of ``page`` for ``params``, calling ``build`` when it must be (re)built"""
+        def fill():
+            model = build()
+            return model, model is not None
+
+        ttls = settings.MLBB_WEB_CACHE_TTLS
+        ttl = ttls.get(f'{self.KEY_PREFIX}_{page}', ttls['default'])
+        return self.store.get_or_fill(self.cache_key(page, params), fill, ttl,
+                                      settings.MLBB_WEB_STALE_TTL, settings.MLBB_WEB_NEGATIVE_TTL)
+
+
+hero_page_cache = HeroPageCache()
@@ -3,15 +3,29 @@ import os
 import json
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag, urlencode
+from asgiref.sync import sync_to_async
 from functools import wraps
 from typing import Dict
 
+from apps.mlbb_api.bundle import hero_bundle_fetcher
+from apps.mlbb_api.views import MLBBHeaderBuilder
+
 from .models import DraftSession, Team, HeroPick, HeroBan, DraftTemplate, DraftNote
+from .draft_state import DraftState, LoadedDraft
+from .events import DraftEvent, draft_events
+from .metadata import hero_metadata_table
+from .precompute import recommendation_precomputer
 from .services import MLBBAPIService, DraftRecommendationService
+from .view_models import HeroPageModels, hero_page_cache
 
 PROD_URL = settings.PROD_URL
 
@@ -35,6 +49,8 @@ HERO_NAME_DICT = {
     13: "Clint", 12: "Bruno", 11: "Bane", 10: "Franco", 9: "Akai", 8: "Karina", 7: "Alucard", 6: "Tigreal",
     5: "Nana", 4: "Alice", 3: "Saber", 2: "Balmond", 1: "Miya"
 }
+# Hero ids are small positive ints; draft actions outside this range are rejected
+MAX_HERO_ID = max(HERO_NAME_DICT)
 
 def web_availability_required(view_func):
     @wraps(view_func)
@@ -59,42 +75,13 @@ class MLBBWebService:
         return response.json()
 
     @staticmethod
-    def multiply_rates(record, fields):
-        for field in fields:
-            if field in record:
-                record[field] *= 100
-
-    @staticmethod
-    def round_rates(record, fields):
-        for field in fields:
-            if field in record:
-                record[field] = round(record[field] * 100, 2)
-
-    @staticmethod
-    def map_hero_ids(record, relation_types):
-        for relation_type in relation_types:
-            for i, hero_id in enumerate(record['data']['relation'][relation_type]['target_hero_id']):
-                record['data']['relation'][relation_type]['target_hero_id'][i] = (
-                    HERO_NAME_DICT.get(hero_id, 'Unknown') if hero_id != 0 else 'Unknown'
-                )
-
-    @staticmethod
-    def rename_skill_fields(skilllist):
-        for skill in skilllist:
-            for skill_detail in skill['skilllist']:
-                if 'skillcd&cost' in skill_detail:
-                    skill_detail['skillcd_cost'] = skill_detail.pop('skillcd&cost')
-
-    @staticmethod
-    def rename_recommendmasterplan_fields(planlist):
-        for plan in planlist:
-            if '__data' in plan['battleskill']:
-                plan['battleskill']['data'] = plan['battleskill'].pop('__data')
-
-    @staticmethod
-    def process_sub_hero_rates(sub_hero_list):
-        for sub_hero in sub_hero_list:
-            MLBBWebService.round_rates(sub_hero, ['hero_appearance_rate', 'hero_win_rate', 'increase_win_rate'])
+    def get_hero_bundle(hero_id, parts):
+        """Fetch several hero collections concurrently, keyed by part name."""
+        if settings.MLBB_WEB_TRANSPORT == 'http':
+            data = MLBBWebService.get_json(f'{PROD_URL}hero-bundle/{hero_id}/?parts={",".join(parts)}')
+            return data['parts'] if data else {}
+        # Shared with the bundle cache: read only, see HeroPageModels
+        return hero_bundle_fetcher.fetch(hero_id, MLBBHeaderBuilder.get_lang_header('en'), parts)['parts']
 
 def favicon_view(request):
     favicon_path = os.path.join(settings.BASE_DIR, 'staticfiles', 'favicon.ico')
@@ -113,100 +100,57 @@ class MLBBWebViews:
     @staticmethod
     @web_availability_required
     def hero_rank_web(request):
-        days = request.GET.get('days', '1')
-        rank = request.GET.get('rank', 'all')
-        size = request.GET.get('size', '20')
-        index = request.GET.get('index', '1')
-        sort_field = request.GET.get('sort_field', 'win_rate')
-        sort_order = request.GET.get('sort_order', 'desc')
-
-        url = f'{PROD_URL}hero-rank/?days={days}&rank={rank}&size={size}&index={index}&sort_field={sort_field}&sort_order={sort_order}'
-        data = MLBBWebService.get_json(url)
-        if not data or 'data' not in data or 'records' not in data['data']:
+        params = {
+            'days': request.GET.get('days', '1'),
+            'rank': request.GET.get('rank', 'all'),
+            'size': request.GET.get('size', '20'),
+            'index': request.GET.get('index', '1'),
+            'sort_field': request.GET.get('sort_field', 'win_rate'),
+            'sort_order': request.GET.get('sort_order', 'desc'),
+        }
+
+        def build():
+            data = MLBBWebService.get_json(f'{PROD_URL}hero-rank/?{urlencode(params)}')
+            return HeroPageModels.hero_rank(data) if HeroPageModels.has_records(data) else None
+
+        model = hero_page_cache.get('hero_rank', params, build)
+        if model is None:
             return JsonResponse({'error': 'Data not found'}, status=404)
 
-        for record in data['data']['records']:
-            MLBBWebService.multiply_rates(record['data'], [
-                'main_hero_appearance_rate', 'main_hero_ban_rate', 'main_hero_win_rate'
-            ])
-            for sub_hero in record['data']['sub_hero']:
-                sub_hero['increase_win_rate'] *= 100
-
-        return render(request, 'mlbb_web/hero-rank.html', {
-            'data': data,
-            'days': days,
-            'rank': rank,
-            'size': size,
-            'index': index,
-            'sort_field': sort_field,
-            'sort_order': sort_order
-        })
+        return render(request, 'mlbb_web/hero-rank.html', {'records': model['records'], **params})
 
     @staticmethod
     @web_availability_required
     def hero_position_web(request):
-        role = request.GET.get('role', 'all')
-        lane = request.GET.get('lane', 'all')
-        size = request.GET.get('size', '21')
-        index = request.GET.get('index', '1')
-
-        url = f'{PROD_URL}hero-position/?role={role}&lane={lane}&size={size}&index={index}'
-        data = MLBBWebService.get_json(url)
-        if data and data['data']['records'] is not None:
-            for record in data['data']['records']:
-                MLBBWebService.map_hero_ids(record, ['assist', 'strong', 'weak'])
-
-        return render(request, 'mlbb_web/hero-position.html', {
-            'data': data,
-            'role': role,
-            'lane': lane,
-            'size': size,
-            'index': index
-        })
+        params = {
+            'role': request.GET.get('role', 'all'),
+            'lane': request.GET.get('lane', 'all'),
+            'size': request.GET.get('size', '21'),
+            'index': request.GET.get('index', '1'),
+        }
+
+        def build():
+            data = MLBBWebService.get_json(f'{PROD_URL}hero-position/?{urlencode(params)}')
+            return HeroPageModels.hero_position(data) if data else None
+
+        model = hero_page_cache.get('hero_position', params, build) or HeroPageModels.hero_position(None)
+        return render(request, 'mlbb_web/hero-position.html', {'records': model['records'], **params})
 
     @staticmethod
     @web_availability_required
     def hero_detail_web(request, hero_id):
-        # Hero detail
-        data_hero_detail = MLBBWebService.get_json(f'{PROD_URL}hero-detail/{hero_id}/')
-        if not data_hero_detail or 'data' not in data_hero_detail or 'records' not in data_hero_detail['data']:
-            return JsonResponse({'error': 'Data not found'}, status=404)
-        records_data_hero_detail = data_hero_detail['data']['records'][0]['data']
-
-        MLBBWebService.rename_skill_fields(records_data_hero_detail['hero']['data']['heroskilllist'])
-        MLBBWebService.rename_recommendmasterplan_fields(records_data_hero_detail['hero']['data']['recommendmasterplan'])
-
-        # Hero stats
-        data_hero_detail_stats = MLBBWebService.get_json(f'{PROD_URL}hero-detail-stats/{hero_id}/')
-        if not data_hero_detail_stats or 'data' not in data_hero_detail_stats or 'records' not in data_hero_detail_stats['data']:
-            return JsonResponse({'error': 'Data not found'}, status=404)
-        for record_stats in data_hero_detail_stats['data']['records']:
-            MLBBWebService.multiply_rates(record_stats['data'], [
-                'main_hero_appearance_rate', 'main_hero_ban_rate', 'main_hero_win_rate'
-            ])
-
-        # Hero counter
-        data_hero_counter = MLBBWebService.get_json(f'{PROD_URL}hero-counter/{hero_id}/')
-        if not data_hero_counter or 'data' not in data_hero_counter or 'records' not in data_hero_counter['data']:
-            return JsonResponse({'error': 'Data not found'}, status=404)
-        for record in data_hero_counter['data']['records']:
-            MLBBWebService.process_sub_hero_rates(record['data']['sub_hero'])
-            MLBBWebService.process_sub_hero_rates(record['data']['sub_hero_last'])
-
-        # Hero compatibility
-        data_hero_compatibility = MLBBWebService.get_json(f'{PROD_URL}hero-compatibility/{hero_id}/')
-        if not data_hero_compatibility or 'data' not in data_hero_compatibility or 'records' not in data_hero_compatibility['data']:
+        def build():
+            bundle = MLBBWebService.get_hero_bundle(hero_id, ['detail', 'detail_stats', 'counter', 'compatibility'])
+            parts = [bundle.get(part) for part in ('detail', 'detail_stats', 'counter', 'compatibility')]
+            if not all(HeroPageModels.has_records(part) for part in parts):
+                return None
+            return HeroPageModels.hero_detail(*parts)
+
+        model = hero_page_cache.get('hero_detail', {'hero_id': hero_id}, build)
+        if model is None:
             return JsonResponse({'error': 'Data not found'}, status=404)
-        for record in data_hero_compatibility['data']['records']:
-            MLBBWebService.process_sub_hero_rates(record['data']['sub_hero'])
-            MLBBWebService.process_sub_hero_rates(record['data']['sub_hero_last'])
 
-        return render(request, 'mlbb_web/hero-detail.html', {
-            'data': records_data_hero_detail,
-            'stats': data_hero_detail_stats,
-            'counter': data_hero_counter,
-            'compatibility': data_hero_compatibility
-        })
+        return render(request, 'mlbb_web/hero-detail.html', model)
 
 # Draft System Views
 def draft_home(request):
@@ -257,7 +201,8 @@ def create_draft(request):
 
 def draft_session(request, draft_id):
     """Main draft session interface with API integration"""
-    draft = get_object_or_404(DraftSession, id=draft_id)
+    loaded = LoadedDraft.load(draft_id)
+    draft = loaded.draft
     
     # Check access permissions
     if not request.user.is_authenticated and draft.session_key != request.session.session_key:
@@ -267,13 +212,8 @@ def draft_session(request, draft_id):
         messages.error(request, 'You do not have access to this draft session.')
         return redirect('draft_home')
     
-    blue_team = draft.teams.get(side='blue')
-    red_team = draft.teams.get(side='red')
-    
     # Get current state
-    current_action = 'completed' if draft.is_completed else (
-        draft.turn_order[draft.current_turn_index] if draft.current_turn_index < len(draft.turn_order) else 'completed'
-    )
+    current_action = loaded.current_action
     
     # Initialize API services
     api_service = MLBBAPIService()
@@ -284,33 +224,21 @@ def draft_session(request, draft_id):
     heroes_dict = {hero['id']: hero for hero in heroes_data}
     
     # Get current picks and bans
-    blue_picks = [p.hero_id for p in blue_team.picks.all()]
-    red_picks = [p.hero_id for p in red_team.picks.all()]
-    all_bans = [b.hero_id for b in HeroBan.objects.filter(team__draft_session=draft)]
+    state = loaded.state
     
     # Get recommendations if draft is not completed
     recommendations = []
     if not draft.is_completed and current_action != 'completed':
-        if 'pick' in current_action:
-            current_team_picks = blue_picks if 'blue' in current_action else red_picks
-            enemy_picks = red_picks if 'blue' in current_action else blue_picks
-            recommendations = recommendation_service.get_pick_recommendations(
-                current_team_picks, all_bans, enemy_picks, 'pick'
-            )
-        elif 'ban' in current_action:
-            enemy_picks = red_picks if 'blue' in current_action else blue_picks
-            recommendations = recommendation_service.get_ban_recommendations(
-                enemy_picks, all_bans
-            )
+        recommendations = recommendation_service.get_recommendations(state, current_action)
     
     # Analyze team compositions
-    blue_analysis = recommendation_service.analyze_team_composition(blue_picks)
-    red_analysis = recommendation_service.analyze_team_composition(red_picks)
+    blue_analysis = recommendation_service.analyze_team_composition(list(state.picks['blue']))
+    red_analysis = recommendation_service.analyze_team_composition(list(state.picks['red']))
     
     context = {
         'draft': draft,
-        'blue_team': blue_team,
-        'red_team': red_team,
+        'blue_team': loaded.teams['blue'],
+        'red_team': loaded.teams['red'],
         'current_action': current_action,
         'heroes': HERO_NAME_DICT,
         'heroes_data': heroes_dict,
@@ -341,10 +269,25 @@ def draft_action(request, draft_id):
     
     data = json.loads(request.body)
     action_type = data.get('action')  # 'pick' or 'ban'
-    hero_id = int(data.get('hero_id'))
+    try:
+        hero_id = int(data.get('hero_id'))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'hero_id must be an integer'}, status=400)
+    if not 0 < hero_id <= MAX_HERO_ID:
+        return JsonResponse({'error': f'hero_id must be between 1 and {MAX_HERO_ID}'}, status=400)
     hero_name = data.get('hero_name', HERO_NAME_DICT.get(hero_id, f'Hero {hero_id}'))
     position = data.get('position')  # Only for picks
     
+    # Clients send the version they last saw so a double click cannot act twice
+    expected_version = data.get('version')
+    if expected_version is not None:
+        try:
+            expected_version = int(expected_version)
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'version must be an integer'}, status=400)
+        if expected_version != draft.version:
+            return draft_conflict_response(draft)
+    
     if draft.current_turn_index >= len(draft.turn_order):
         return JsonResponse({'error': 'Draft is completed'}, status=400)
     
@@ -361,70 +304,161 @@ def draft_action(request, draft_id):
     team = draft.teams.get(side=team_side)
     
     # Check if hero is already picked or banned
-    all_picks = HeroPick.objects.filter(team__draft_session=draft, hero_id=hero_id)
-    all_bans = HeroBan.objects.filter(team__draft_session=draft, hero_id=hero_id)
+    state = DraftState.from_draft(draft)
     
-    if all_picks.exists() or all_bans.exists():
+    if state.is_taken(hero_id):
         return JsonResponse({'error': 'Hero is already picked or banned'}, status=400)
     
+    next_turn_index = draft.current_turn_index + 1
+    advance = {
+        'current_turn_index': next_turn_index,
+        'version': F('version') + 1,
+        'updated_at': timezone.now(),
+    }
+    # Check if draft is completed
+    if next_turn_index >= len(draft.turn_order):
+        advance.update(is_completed=True, current_phase='completed')
+    
     try:
-        if action_type == 'pick':
-            pick_order = team.picks.count() + 1
-            HeroPick.objects.create(
-                team=team,
-                hero_id=hero_id,
-                hero_name=hero_name,
-                position=position,
-                pick_order=pick_order
-            )
-        else:  # ban
-            ban_order = team.bans.count() + 1
-            HeroBan.objects.create(
-                team=team,
-                hero_id=hero_id,
-                hero_name=hero_name,
-                ban_order=ban_order
-            )
-        
-        # Advance to next turn
-        draft.current_turn_index += 1
-        
-        # Check if draft is completed
-        if draft.current_turn_index >= len(draft.turn_order):
-            draft.is_completed = True
-            draft.current_phase = 'completed'
-        
-        draft.save()
-        
-        return JsonResponse({
-            'success': True,
-            'next_turn': draft.turn_order[draft.current_turn_index] if draft.current_turn_index < len(draft.turn_order) else 'completed',
-            'is_completed': draft.is_completed,
-            'progress': {
-                'total_turns': len(draft.turn_order),
-                'current_turn': draft.current_turn_index if not draft.is_completed else len(draft.turn_order)
+        with transaction.atomic():
+            # Compare-and-swap: only a request that saw the current version and
+            # turn may advance it; everyone else acted on a stale draft
+            advanced = DraftSession.objects.filter(
+                id=draft.id, version=draft.version, current_turn_index=draft.current_turn_index
+            ).update(**advance)
+            if not advanced:
+                return draft_conflict_response(draft)
+            
+            if action_type == 'pick':
+                row = HeroPick.objects.create(
+                    team=team,
+                    hero_id=hero_id,
+                    hero_name=hero_name,
+                    position=position,
+                    pick_order=len(state.picks[team_side]) + 1
+                )
+            else:  # ban
+                row = HeroBan.objects.create(
+                    team=team,
+                    hero_id=hero_id,
+                    hero_name=hero_name,
+                    ban_order=len(state.bans[team_side]) + 1
+                )
+            
+            turn_index = draft.current_turn_index
+            draft.current_turn_index, draft.version = next_turn_index, draft.version + 1
+            draft.is_completed = next_turn_index >= len(draft.turn_order)
+            next_state = state.with_action(team_side, action_type, hero_id)
+            
+            # Once the action is stored, push it to live viewers in the same
+            # shape as a ?since= delta from draft_data
+            event = {
+                'draft': draft_summary(draft),
+                'since': turn_index,
+                'actions': [action_entry(turn_index, team_side, action_type, row)],
+                'state': next_state.to_dict()
             }
-        })
-    
+            transaction.on_commit(lambda: draft_events.publish(draft.id, 'action', event, draft.version))
+            
+            # Warm the cache for the next turn and its likely replies once the action is stored
+            if not draft.is_completed:
+                transaction.on_commit(lambda: recommendation_precomputer.schedule(
+                    next_state, draft.turn_order, next_turn_index
+                ))
+    except IntegrityError:
+        return draft_conflict_response(draft)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+    
+    is_completed = next_turn_index >= len(draft.turn_order)
+    return JsonResponse({
+        'success': True,
+        'next_turn': draft.turn_order[next_turn_index] if not is_completed else 'completed',
+        'is_completed': is_completed,
+        'version': draft.version,
+        'progress': {
+            'total_turns': len(draft.turn_order),
+            'current_turn': next_turn_index if not is_completed else len(draft.turn_order)
+        }
+    })
+
+def draft_conflict_response(draft):
+    """409 for an action that lost the race to another action on the same turn"""
+    return JsonResponse({
+        'error': 'The draft was updated by another action, reload and try again',
+        'version': DraftSession.objects.filter(id=draft.id).values_list('version', flat=True).first()
+    }, status=409)
+
+def draft_etag(*parts) -> str:
+    """Strong ETag over the values a draft response is derived from"""
+    return quote_etag('-'.join(str(part) for part in parts))
+
+def etag_matches(request, etag: str) -> bool:
+    return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+def not_modified_response(etag: str):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+def draft_summary(draft) -> Dict:
+    """The ``draft`` part of draft_data responses and live action events"""
+    return {
+        'id': draft.id,
+        'name': draft.name,
+        'is_completed': draft.is_completed,
+        'current_turn_index': draft.current_turn_index,
+        'version': draft.version,
+        'total_turns': len(draft.turn_order),
+        'current_action': draft.turn_order[draft.current_turn_index] if draft.current_turn_index < len(draft.turn_order) else 'completed'
+    }
+
+def action_entry(turn_index: int, side: str, action: str, row) -> Dict:
+    """One pick or ban of a ?since= delta or live action event"""
+    entry = {'turn_index': turn_index, 'team': side, 'action': action,
+             'hero_id': row.hero_id, 'hero_name': row.hero_name}
+    if action == 'pick':
+        entry.update(position=row.position, pick_order=row.pick_order)
+    else:
+        entry.update(ban_order=row.ban_order)
+    return entry
 
 def draft_data(request, draft_id):
-    """Get current draft data as JSON"""
-    draft = get_object_or_404(DraftSession, id=draft_id)
+    """Get current draft data as JSON
     
-    blue_team = draft.teams.get(side='blue')
-    red_team = draft.teams.get(side='red')
+    Every action bumps the draft version, so an idle poller sending back the
+    ETag is answered with a 304 after the session lookup alone. With
+    ``?since=<turn_index>`` only the actions from that turn on are returned.
+    """
+    draft = get_object_or_404(DraftSession, id=draft_id)
+    etag = draft_etag('draft', draft.version)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    since = request.GET.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return JsonResponse({'error': 'since must be an integer'}, status=400)
+        if not 0 <= since <= draft.current_turn_index:
+            return JsonResponse({'error': f'since must be between 0 and {draft.current_turn_index}'}, status=400)
+    
+    loaded = LoadedDraft(draft)
+    summary = draft_summary(draft)
+    
+    if since is not None:
+        actions = [action_entry(*action) for action in loaded.actions(since)]
+        response = JsonResponse({'draft': summary, 'since': since, 'actions': actions, 'state': loaded.state.to_dict()})
+        response['ETag'] = etag
+        return response
+    
+    blue_team, red_team = loaded.teams['blue'], loaded.teams['red']
+    blue_picks, red_picks = loaded.picks['blue'], loaded.picks['red']
+    blue_bans, red_bans = loaded.bans['blue'], loaded.bans['red']
     
     data = {
-        'draft': {
-            'id': draft.id,
-            'name': draft.name,
-            'is_completed': draft.is_completed,
-            'current_turn_index': draft.current_turn_index,
-            'total_turns': len(draft.turn_order),
-            'current_action': draft.turn_order[draft.current_turn_index] if draft.current_turn_index < len(draft.turn_order) else 'completed'
-        },
+        'draft': summary,
         'blue_team': {
             'name': blue_team.name,
             'picks': [{
@@ -432,12 +466,12 @@ def draft_data(request, draft_id):
                 'hero_name': pick.hero_name,
                 'position': pick.position,
                 'pick_order': pick.pick_order
-            } for pick in blue_team.picks.all()],
+            } for pick in blue_picks],
             'bans': [{
                 'hero_id': ban.hero_id,
                 'hero_name': ban.hero_name,
                 'ban_order': ban.ban_order
-            } for ban in blue_team.bans.all()]
+            } for ban in blue_bans]
         },
         'red_team': {
             'name': red_team.name,
@@ -446,21 +480,25 @@ def draft_data(request, draft_id):
                 'hero_name': pick.hero_name,
                 'position': pick.position,
                 'pick_order': pick.pick_order
-            } for pick in red_team.picks.all()],
+            } for pick in red_picks],
             'bans': [{
                 'hero_id': ban.hero_id,
                 'hero_name': ban.hero_name,
                 'ban_order': ban.ban_order
-            } for ban in red_team.bans.all()]
-        }
+            } for ban in red_bans]
+        },
+        'state': loaded.state.to_dict()
     }
     
-    return JsonResponse(data)
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    return response
 
 def save_template(request, draft_id):
     """Save current draft as template"""
     if request.method == 'POST':
-        draft = get_object_or_404(DraftSession, id=draft_id)
+        loaded = LoadedDraft.load(draft_id)
+        draft = loaded.draft
         
         # Check access permissions
         if not request.user.is_authenticated and draft.session_key != request.session.session_key:
@@ -470,9 +508,6 @@ def save_template(request, draft_id):
         description = request.POST.get('description', '')
         is_public = request.POST.get('is_public') == 'on'
         
-        blue_team = draft.teams.get(side='blue')
-        red_team = draft.teams.get(side='red')
-        
         template = DraftTemplate.objects.create(
             name=template_name,
             description=description,
@@ -483,20 +518,20 @@ def save_template(request, draft_id):
                 'hero_id': pick.hero_id,
                 'hero_name': pick.hero_name,
                 'position': pick.position
-            } for pick in blue_team.picks.all()],
+            } for pick in loaded.picks['blue']],
             red_picks=[{
                 'hero_id': pick.hero_id,
                 'hero_name': pick.hero_name,
                 'position': pick.position
-            } for pick in red_team.picks.all()],
+            } for pick in loaded.picks['red']],
             blue_bans=[{
                 'hero_id': ban.hero_id,
                 'hero_name': ban.hero_name
-            } for ban in blue_team.bans.all()],
+            } for ban in loaded.bans['blue']],
             red_bans=[{
                 'hero_id': ban.hero_id,
                 'hero_name': ban.hero_name
-            } for ban in red_team.bans.all()]
+            } for ban in loaded.bans['red']]
         )
         
         messages.success(request, f'Template "{template_name}" saved successfully!')
@@ -504,6 +539,26 @@ def save_template(request, draft_id):
     
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+def recommendations_payload(draft, depth=None) -> Dict:
+    """Recommendations for the current turn of an ongoing draft"""
+    state = DraftState.from_draft(draft)
+    
+    current_action = draft.turn_order[draft.current_turn_index] if draft.current_turn_index < len(draft.turn_order) else 'completed'
+    
+    recommendation_service = DraftRecommendationService()
+    response = {
+        'current_action': current_action,
+        'phase': 'pick' if 'pick' in current_action else 'ban'
+    }
+    
+    if depth is not None:
+        response.update(recommendation_service.get_lookahead_recommendations(
+            state, draft.turn_order, draft.current_turn_index, depth
+        ))
+    else:
+        response['recommendations'] = recommendation_service.get_recommendations(state, current_action)
+    return response
+
 def get_recommendations(request, draft_id):
     """Get real-time draft recommendations"""
     draft = get_object_or_404(DraftSession, id=draft_id)
@@ -517,64 +572,92 @@ def get_recommendations(request, draft_id):
     if draft.is_completed:
         return JsonResponse({'recommendations': []})
     
-    blue_team = draft.teams.get(side='blue')
-    red_team = draft.teams.get(side='red')
-    
-    blue_picks = [p.hero_id for p in blue_team.picks.all()]
-    red_picks = [p.hero_id for p in red_team.picks.all()]
-    all_bans = [b.hero_id for b in HeroBan.objects.filter(team__draft_session=draft)]
-    
-    current_action = draft.turn_order[draft.current_turn_index] if draft.current_turn_index < len(draft.turn_order) else 'completed'
-    
-    recommendation_service = DraftRecommendationService()
-    recommendations = []
-    
-    if 'pick' in current_action:
-        current_team_picks = blue_picks if 'blue' in current_action else red_picks
-        enemy_picks = red_picks if 'blue' in current_action else blue_picks
-        recommendations = recommendation_service.get_pick_recommendations(
-            current_team_picks, all_bans, enemy_picks, 'pick'
-        )
-    elif 'ban' in current_action:
-        enemy_picks = red_picks if 'blue' in current_action else blue_picks
-        recommendations = recommendation_service.get_ban_recommendations(
-            enemy_picks, all_bans
-        )
+    depth = request.GET.get('depth')
+    if depth is not None:
+        try:
+            depth = int(depth)
+        except ValueError:
+            return JsonResponse({'error': 'depth must be an integer'}, status=400)
+        if not 1 <= depth <= settings.MLBB_SOLVER_MAX_DEPTH:
+            return JsonResponse({'error': f'depth must be between 1 and {settings.MLBB_SOLVER_MAX_DEPTH}'}, status=400)
+    
+    # Recommendations only change with the draft or the matrices and MLBB data they are scored from
+    etag = draft_etag('recs', draft.version, DraftRecommendationService().data_version(), depth or 0)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    
+    response = recommendations_payload(draft, depth)
+    complete = response.get('search', {}).get('complete', True)
+    response = JsonResponse(response)
+    if complete:
+        # A search cut short by the time budget may do better next poll
+        response['ETag'] = etag
+    return response
+
+async def draft_events_stream(request, draft_id):
+    """Stream draft actions, and recommendations for users with access, as Server-Sent Events
+    
+    Needs the ASGI server; under WSGI a stream would tie up a worker, so the
+    client is told to keep polling instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live updates are not available, poll /data/ instead'}, status=501)
     
-    return JsonResponse({
-        'recommendations': recommendations,
-        'current_action': current_action,
-        'phase': 'pick' if 'pick' in current_action else 'ban'
-    })
+    try:
+        draft = await DraftSession.objects.aget(id=draft_id)
+    except DraftSession.DoesNotExist:
+        raise Http404
+    if draft.is_completed:
+        # 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    session_key = request.session.session_key
+    can_recommend = draft.session_key == session_key or (user.is_authenticated and draft.user_id == user.id)
+    subscription = draft_events.subscribe(draft.id)
+    
+    def load_recommendations():
+        current = DraftSession.objects.get(id=draft.id)
+        return None if current.is_completed else recommendations_payload(current)
+    
+    async def stream():
+        try:
+            while True:
+                events = await subscription.get(settings.MLBB_DRAFT_EVENTS_KEEPALIVE)
+                if not events:
+                    yield ': keep-alive\n\n'
+                    continue
+                for event in events:
+                    yield event.to_sse()
+                if events[-1].data['draft']['is_completed']:
+                    return
+                if can_recommend:
+                    # Every viewer asks for the same draft state, so all but the first hit the cache
+                    recommendations = await sync_to_async(load_recommendations)()
+                    if recommendations is not None:
+                        yield DraftEvent(draft.id, 'recommendations', recommendations).to_sse()
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 def draft_analytics(request, draft_id):
     """Get draft analytics and team composition analysis"""
-    draft = get_object_or_404(DraftSession, id=draft_id)
-    
-    blue_team = draft.teams.get(side='blue')
-    red_team = draft.teams.get(side='red')
-    
-    blue_picks = [p.hero_id for p in blue_team.picks.all()]
-    red_picks = [p.hero_id for p in red_team.picks.all()]
+    loaded = LoadedDraft.load(draft_id)
+    draft = loaded.draft
+    blue_picks, red_picks = loaded.state.teams('blue')
     
     recommendation_service = DraftRecommendationService()
     blue_analysis = recommendation_service.analyze_team_composition(blue_picks)
     red_analysis = recommendation_service.analyze_team_composition(red_picks)
     
-    # Get detailed hero information
-    api_service = MLBBAPIService()
-    
-    blue_heroes = []
-    for hero_id in blue_picks:
-        hero_details = api_service.get_hero_details(hero_id)
-        if hero_details:
-            blue_heroes.append(hero_details)
-    
-    red_heroes = []
-    for hero_id in red_picks:
-        hero_details = api_service.get_hero_details(hero_id)
-        if hero_details:
-            red_heroes.append(hero_details)
+    # Name, role and difficulty of each pick, from the in-memory metadata table
+    metadata = hero_metadata_table.get()
+    blue_heroes = [metadata[hero_id] for hero_id in blue_picks if hero_id in metadata]
+    red_heroes = [metadata[hero_id] for hero_id in red_picks if hero_id in metadata]
     
     # Calculate matchup predictions (simplified)
     matchup_score = 50  # Neutral
@@ -589,6 +672,8 @@ def draft_analytics(request, draft_id):
             'name': draft.name,
             'is_completed': draft.is_completed
         },
+        'blue_team': loaded.teams['blue'],
+        'red_team': loaded.teams['red'],
         'blue_analysis': blue_analysis,
         'red_analysis': red_analysis,
         'blue_heroes': blue_heroes,